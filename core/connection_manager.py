@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+CONNECTION MANAGER - CONEXIONES CENTRALIZADAS A ORO, CRM Y DW
+=============================================================
+Un único punto para abrir conexiones a las tres bases del ETL:
+
+- Credenciales desde el entorno (ORO_DB_*, CRM_DB_*, DW_DB_*), leídas
+  recién cuando se pide la primera conexión a esa base.
+- Pool por base con tope de conexiones simultáneas: getconn() espera a
+  que se libere una en lugar de abrir conexiones sin límite.
+- Health check (SELECT 1) de las conexiones que estuvieron ociosas más
+  de health_check_interval segundos; las rotas se reemplazan.
+- Settings de sesión por base (options -c al conectar) y perfiles que se
+  aplican al tomar la conexión y se revierten con RESET ALL al devolverla
+  (p.ej. load: synchronous_commit=off, work_mem mayor).
+- Métricas por conexión: veces tomada, segundos en uso, health checks.
+
+Las conexiones de vida larga (builders, extractores paralelos) se piden
+con connect(): mismas credenciales y settings, fuera del pool.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+import logging
+
+# Base lógica -> prefijo de las variables de entorno
+DATABASES = {"oro": "ORO_DB", "crm": "CRM_DB", "dw": "DW_DB"}
+
+
+@dataclass
+class ConnectionUsage:
+    """Uso de una conexión del pool"""
+
+    database: str
+    created_at: float = field(default_factory=time.time)
+    acquisitions: int = 0
+    seconds_in_use: float = 0.0
+    health_checks: int = 0
+    last_released: float = field(default_factory=time.monotonic)
+    acquired_at: Optional[float] = None
+    profile: Optional[str] = None
+
+
+class ConnectionManager:
+    """Pools de conexiones psycopg2 por base de datos"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        conn_config = self.config.get("connections", {})
+        self.pool_max = conn_config.get("pool_max", 8)
+        self.acquire_timeout = conn_config.get("acquire_timeout", 300)
+        self.health_check_interval = conn_config.get("health_check_interval", 30)
+        self.connect_timeout = conn_config.get("connect_timeout", 120)
+        self.settings: Dict[str, Dict[str, Any]] = conn_config.get("settings", {})
+        self.profiles: Dict[str, Dict[str, Any]] = conn_config.get("profiles", {})
+
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[Any]] = {db: [] for db in DATABASES}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._usage: Dict[int, ConnectionUsage] = {}
+        self._closed_usage: List[ConnectionUsage] = []
+        self._dedicated: Dict[str, int] = {db: 0 for db in DATABASES}
+        self._replaced: Dict[str, int] = {db: 0 for db in DATABASES}
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def connect(self, database: str, profile: Optional[str] = None):
+        """
+        Conexión dedicada (fuera del pool); la cierra quien la pidió
+
+        Args:
+            database: 'oro', 'crm' o 'dw'
+            profile: Perfil de sesión de connections.profiles
+        """
+        conn = self._new_connection(database)
+        if profile:
+            self._apply_profile(conn, profile)
+        with self._lock:
+            self._dedicated[database] += 1
+        return conn
+
+    def getconn(
+        self, database: str, profile: Optional[str] = None, autocommit: bool = True
+    ):
+        """
+        Toma una conexión del pool (espera si todas están en uso)
+
+        Debe devolverse con putconn(), idealmente en un finally.
+        """
+        self._check_database(database)
+        if not self._slot(database).acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(
+                f"Sin conexiones libres a {database} tras {self.acquire_timeout}s "
+                f"(connections.pool_max={self.pool_max})"
+            )
+
+        try:
+            conn = self._checkout(database)
+            conn.autocommit = autocommit
+            if profile:
+                self._apply_profile(conn, profile)
+        except Exception:
+            self._slot(database).release()
+            raise
+
+        with self._lock:
+            usage = self._usage[id(conn)]
+            usage.acquisitions += 1
+            usage.acquired_at = time.monotonic()
+            usage.profile = profile
+        return conn
+
+    def putconn(self, conn):
+        """Devuelve una conexión al pool (las cerradas o rotas se descartan)"""
+        with self._lock:
+            usage = self._usage.get(id(conn))
+        if usage is None:
+            # No es del pool (conexión dedicada): se cierra sin más
+            conn.close()
+            return
+
+        ahora = time.monotonic()
+        reutilizable = not conn.closed
+        if reutilizable:
+            try:
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+                if usage.profile:
+                    conn.autocommit = True
+                    with conn.cursor() as cursor:
+                        cursor.execute("RESET ALL")
+            except psycopg2.Error:
+                reutilizable = False
+
+        with self._lock:
+            if usage.acquired_at is not None:
+                usage.seconds_in_use += ahora - usage.acquired_at
+            usage.acquired_at = None
+            usage.profile = None
+            usage.last_released = ahora
+            if reutilizable:
+                self._idle[usage.database].append(conn)
+            else:
+                self._closed_usage.append(self._usage.pop(id(conn)))
+        if not reutilizable:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+        self._slot(usage.database).release()
+
+    @contextmanager
+    def acquire(
+        self, database: str, profile: Optional[str] = None, autocommit: bool = True
+    ) -> Iterator[Any]:
+        """Conexión del pool dentro de un bloque with"""
+        conn = self.getconn(database, profile=profile, autocommit=autocommit)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas por base y por conexión (serializables)"""
+        with self._lock:
+            usos = list(self._usage.values()) + self._closed_usage
+            resultado = {}
+            for db in DATABASES:
+                del_db = [u for u in usos if u.database == db]
+                if not del_db and not self._dedicated[db]:
+                    continue
+                resultado[db] = {
+                    "pooled_connections": len(del_db),
+                    "dedicated_connections": self._dedicated[db],
+                    "replaced_unhealthy": self._replaced[db],
+                    "acquisitions": sum(u.acquisitions for u in del_db),
+                    "seconds_in_use": round(sum(u.seconds_in_use for u in del_db), 3),
+                    "connections": [
+                        {
+                            "acquisitions": u.acquisitions,
+                            "seconds_in_use": round(u.seconds_in_use, 3),
+                            "health_checks": u.health_checks,
+                        }
+                        for u in del_db
+                    ],
+                }
+            return resultado
+
+    def close_all(self):
+        """Cierra las conexiones ociosas del pool"""
+        with self._lock:
+            ociosas = [conn for conns in self._idle.values() for conn in conns]
+            for conns in self._idle.values():
+                conns.clear()
+            for conn in ociosas:
+                self._closed_usage.append(self._usage.pop(id(conn)))
+        for conn in ociosas:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _check_database(self, database: str):
+        if database not in DATABASES:
+            raise ValueError(
+                f"Base desconocida: {database} (use {', '.join(DATABASES)})"
+            )
+
+    def _slot(self, database: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if database not in self._slots:
+                self._slots[database] = threading.BoundedSemaphore(self.pool_max)
+            return self._slots[database]
+
+    def _checkout(self, database: str):
+        """Conexión ociosa sana o una nueva"""
+        while True:
+            with self._lock:
+                conn = self._idle[database].pop() if self._idle[database] else None
+                usage = self._usage.get(id(conn)) if conn is not None else None
+            if conn is None:
+                conn = self._new_connection(database)
+                with self._lock:
+                    self._usage[id(conn)] = ConnectionUsage(database=database)
+                return conn
+
+            ociosa = time.monotonic() - usage.last_released
+            if ociosa < self.health_check_interval and not conn.closed:
+                return conn
+            if self._healthy(conn, usage):
+                return conn
+
+            self.logger.warning(f"⚠️  Conexión a {database} rota; se reemplaza")
+            with self._lock:
+                self._replaced[database] += 1
+                self._closed_usage.append(self._usage.pop(id(conn)))
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    def _healthy(self, conn, usage: ConnectionUsage) -> bool:
+        usage.health_checks += 1
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _new_connection(self, database: str):
+        """psycopg2.connect con credenciales del entorno y settings de la base"""
+        self._check_database(database)
+        prefijo = DATABASES[database]
+        host = os.getenv(f"{prefijo}_HOST")
+        if not host:
+            raise ValueError(f"Falta la variable de entorno {prefijo}_HOST")
+
+        settings = self.settings.get(database, {}) or {}
+        options = " ".join(f"-c {clave}={valor}" for clave, valor in settings.items())
+
+        params = dict(
+            host=host,
+            port=int(os.getenv(f"{prefijo}_PORT", "5432")),
+            dbname=os.getenv(f"{prefijo}_NAME"),
+            user=os.getenv(f"{prefijo}_USER"),
+            password=os.getenv(f"{prefijo}_PASS"),
+            connect_timeout=self.connect_timeout,
+        )
+        if options:
+            params["options"] = options
+        return psycopg2.connect(**params)
+
+    def _apply_profile(self, conn, profile: str):
+        """SET de sesión del perfil (se revierte con RESET ALL en putconn)"""
+        if profile not in self.profiles:
+            raise ValueError(f"Perfil de conexión desconocido: {profile}")
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                for clave, valor in self.profiles[profile].items():
+                    cursor.execute("SELECT set_config(%s, %s, false)", (clave, str(valor)))
+        finally:
+            conn.autocommit = autocommit
+
+
+_manager: Optional[ConnectionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager(config: Dict[str, Any] = None) -> ConnectionManager:
+    """
+    ConnectionManager del proceso (lo comparten orquestador y builders)
+
+    La primera llamada con config lo crea; las siguientes lo reutilizan.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ConnectionManager(config)
+        return _manager
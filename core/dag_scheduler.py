@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+DAG SCHEDULER - EJECUCIÓN DE TAREAS POR GRAFO DE DEPENDENCIAS
+=============================================================
+Cada tarea declara las tareas de las que depende. Las tareas cuyas
+dependencias ya terminaron se ejecutan en paralelo en un pool de hilos;
+una tarea cuya dependencia falló se omite. Al final se puede obtener la
+ruta crítica: la cadena de tareas que determinó la duración total.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+
+@dataclass
+class TaskNode:
+    """Tarea del grafo"""
+
+    name: str
+    func: Callable[[], Any]
+    upstream: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TaskResult:
+    """Resultado de una tarea (tiempos en segundos desde el inicio del run)"""
+
+    name: str
+    status: str  # 'success', 'failed', 'skipped'
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    value: Any = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+
+class DAGScheduler:
+    """Ejecutor de un grafo acíclico de tareas sobre un pool de hilos"""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+        self.logger = logging.getLogger(__name__)
+        self.tasks: Dict[str, TaskNode] = {}
+        self.results: Dict[str, TaskResult] = {}
+
+    def add_task(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        upstream: Optional[Iterable[str]] = None,
+    ) -> TaskNode:
+        """Registra una tarea; upstream son nombres de otras tareas del grafo"""
+        if name in self.tasks:
+            raise ValueError(f"Tarea duplicada en el grafo: {name}")
+        node = TaskNode(name=name, func=func, upstream=list(upstream or []))
+        self.tasks[name] = node
+        return node
+
+    def topological_order(self) -> List[str]:
+        """Orden topológico estable (orden de registro entre independientes)"""
+        for node in self.tasks.values():
+            faltantes = [dep for dep in node.upstream if dep not in self.tasks]
+            if faltantes:
+                raise ValueError(
+                    f"{node.name} depende de tareas inexistentes: {faltantes}"
+                )
+
+        orden: List[str] = []
+        visitando: set = set()
+        visitadas: set = set()
+
+        def visitar(name: str, camino: List[str]):
+            if name in visitadas:
+                return
+            if name in visitando:
+                raise ValueError(f"Ciclo en el grafo: {' -> '.join(camino + [name])}")
+            visitando.add(name)
+            for dep in self.tasks[name].upstream:
+                visitar(dep, camino + [name])
+            visitando.discard(name)
+            visitadas.add(name)
+            orden.append(name)
+
+        for name in self.tasks:
+            visitar(name, [])
+        return orden
+
+    def run(self) -> Dict[str, TaskResult]:
+        """
+        Ejecuta el grafo completo
+
+        Returns:
+            Resultado por tarea, en orden topológico
+        """
+        orden = self.topological_order()
+        pendientes = list(orden)
+        self.results = {}
+        inicio = time.perf_counter()
+
+        def ejecutar(node: TaskNode) -> TaskResult:
+            started = time.perf_counter() - inicio
+            try:
+                value = node.func()
+                status, error = "success", None
+            except Exception as e:
+                self.logger.error(f"   ❌ Tarea {node.name} falló: {e}")
+                value, status, error = None, "failed", str(e)
+            return TaskResult(
+                name=node.name,
+                status=status,
+                started_at=started,
+                finished_at=time.perf_counter() - inicio,
+                value=value,
+                error=error,
+            )
+
+        en_curso: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pendientes or en_curso:
+                # Lanzar las tareas cuyas dependencias ya terminaron
+                for name in list(pendientes):
+                    deps = self.tasks[name].upstream
+                    if not all(dep in self.results for dep in deps):
+                        continue
+                    pendientes.remove(name)
+
+                    fallidas = [
+                        dep for dep in deps if self.results[dep].status != "success"
+                    ]
+                    if fallidas:
+                        ahora = time.perf_counter() - inicio
+                        self.results[name] = TaskResult(
+                            name=name,
+                            status="skipped",
+                            started_at=ahora,
+                            finished_at=ahora,
+                            error=f"dependencias sin completar: {fallidas}",
+                        )
+                        self.logger.warning(f"   ⏭️  {name} omitida ({fallidas})")
+                    else:
+                        en_curso[executor.submit(ejecutar, self.tasks[name])] = name
+
+                if not en_curso:
+                    continue
+
+                terminados, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for future in terminados:
+                    result = future.result()
+                    self.results[result.name] = result
+                    del en_curso[future]
+
+        return {name: self.results[name] for name in orden}
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        Ruta crítica del último run
+
+        Parte de la tarea que terminó al final y retrocede por la
+        dependencia que terminó más tarde (la que la hizo esperar).
+
+        Returns:
+            (tareas de la ruta en orden de ejecución, segundos de la ruta)
+        """
+        # Las tareas omitidas no consumieron tiempo
+        ejecutadas = {
+            name: r for name, r in self.results.items() if r.status != "skipped"
+        }
+        if not ejecutadas:
+            return [], 0.0
+
+        actual = max(ejecutadas.values(), key=lambda r: r.finished_at)
+        ruta = [actual.name]
+        while True:
+            deps = [
+                ejecutadas[dep]
+                for dep in self.tasks[actual.name].upstream
+                if dep in ejecutadas
+            ]
+            if not deps:
+                break
+            actual = max(deps, key=lambda r: r.finished_at)
+            ruta.append(actual.name)
+
+        ruta.reverse()
+        duracion = ejecutadas[ruta[-1]].finished_at - ejecutadas[ruta[0]].started_at
+        return ruta, duracion
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumen serializable del último run (tareas y ruta crítica)"""
+        ruta, duracion = self.critical_path()
+        total = max((r.finished_at for r in self.results.values()), default=0.0)
+        return {
+            "tasks": [
+                {
+                    "name": r.name,
+                    "status": r.status,
+                    "started_at": round(r.started_at, 3),
+                    "duration": round(r.duration, 3),
+                    "error": r.error,
+                }
+                for r in self.results.values()
+            ],
+            "critical_path": ruta,
+            "critical_path_seconds": round(duracion, 3),
+            "wall_seconds": round(total, 3),
+            "task_seconds": round(sum(r.duration for r in self.results.values()), 3),
+        }
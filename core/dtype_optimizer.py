@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+DTYPE OPTIMIZER - COMPACTACIÓN DE TIPOS ANTES DE LA CARGA
+=========================================================
+Los builders entregan las facts con claves int64, montos float64 y
+textos en columnas object. Entre la construcción y la carga cada columna
+se lleva al tipo más compacto que declara su esquema:
+
+- clave: int32 (Int32 si admite NULL)
+- dinero: int64 en centavos (punto fijo, escala 2 como NUMERIC(., 2))
+- categoria: category (textos con pocos valores distintos)
+- texto: string respaldado por pyarrow
+
+Las columnas en centavos quedan listadas en df.attrs["centavos"]; el
+CopyLoader y el writer de parquet las convierten a decimal de Arrow sin
+pasar por float ni por texto en Python.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import logging
+
+from transformers import dinero
+
+# Atributo del DataFrame con las columnas guardadas en centavos
+ATTR_CENTAVOS = "centavos"
+
+# Tabla -> columna -> tipo compacto (las columnas no listadas se infieren)
+ESQUEMAS: Dict[str, Dict[str, str]] = {
+    "fact_ventas": {
+        "fecha_id": "clave",
+        "cliente_id": "clave",
+        "producto_id": "clave",
+        "orden_id": "clave",
+        "usuario_id": "clave",
+        "almacen_id": "clave",
+        "impuesto_id": "clave",
+        "sk_promocion": "clave",
+        "precio_unitario": "dinero",
+        "subtotal": "dinero",
+        "descuento": "dinero",
+        "impuesto": "dinero",
+        "envio": "dinero",
+        "total": "dinero",
+        "costo_unitario": "dinero",
+        "costo_total": "dinero",
+        "margen": "dinero",
+        "line_item_id_externo": "clave",
+    },
+    "fact_inventario": {
+        "fecha_id": "clave",
+        "producto_id": "clave",
+        "almacen_id": "clave",
+        "tipo_movimiento_id": "clave",
+        "proveedor_id": "clave",
+        "usuario_id": "clave",
+        "costo_unitario": "dinero",
+        "costo_total": "dinero",
+        "documento": "texto",
+        "observaciones": "categoria",
+    },
+    "fact_transacciones": {
+        "fecha_id": "clave",
+        "cuenta_id": "clave",
+        "centro_costo_id": "clave",
+        "tipo_transaccion_id": "clave",
+        "usuario_id": "clave",
+        "numero_asiento": "texto",
+        "tipo_movimiento": "categoria",
+        "monto": "dinero",
+        "documento_referencia": "texto",
+        "descripcion": "texto",
+        "orden_id": "clave",
+        "movimiento_inventario_id": "clave",
+        "periodo_id": "clave",
+    },
+    "fact_balance": {
+        "periodo_id": "clave",
+        "cuenta_id": "clave",
+        "centro_costo_id": "clave",
+        "saldo_inicial": "dinero",
+        "debitos": "dinero",
+        "creditos": "dinero",
+        "saldo_final": "dinero",
+        "fecha_id": "clave",
+    },
+    "fact_estado_resultados": {
+        "periodo_id": "clave",
+        "cuenta_id": "clave",
+        "centro_costo_id": "clave",
+        "ingresos": "dinero",
+        "costos": "dinero",
+        "gastos": "dinero",
+        "utilidad_bruta": "dinero",
+        "utilidad_neta": "dinero",
+        "fecha_id": "clave",
+    },
+}
+
+_INT32_MAX = np.iinfo(np.int32).max
+_INT32_MIN = np.iinfo(np.int32).min
+
+
+@dataclass
+class OptimizationReport:
+    """Memoria de un DataFrame antes y después de compactar"""
+
+    table_name: str
+    rows: int
+    bytes_before: int
+    bytes_after: int
+    dtypes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def reduction(self) -> float:
+        if self.bytes_before <= 0:
+            return 0.0
+        return 1 - self.bytes_after / self.bytes_before
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "table": self.table_name,
+            "rows": self.rows,
+            "mb_before": round(self.bytes_before / 1024**2, 2),
+            "mb_after": round(self.bytes_after / 1024**2, 2),
+            "reduction": round(self.reduction, 3),
+        }
+
+
+class DtypeOptimizer:
+    """Compacta los tipos de un DataFrame según el esquema de su tabla"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        loading = self.config.get("loading", {})
+        # Solo el camino COPY (Arrow) sabe escribir columnas en centavos
+        self.enabled = loading.get("optimize_dtypes", False) and loading.get(
+            "use_copy", False
+        )
+        # Textos sin esquema: category si distintos/filas <= este valor
+        self.max_category_ratio = loading.get("category_max_ratio", 0.5)
+
+    def optimize(
+        self, table_name: str, df: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, OptimizationReport]:
+        """
+        Compacta df columna por columna
+
+        Las columnas convertidas reemplazan a las originales en un
+        DataFrame nuevo; las que no cambian se comparten sin copiarse.
+
+        Returns:
+            (DataFrame compacto, reporte de memoria)
+        """
+        bytes_before = int(df.memory_usage(index=False, deep=True).sum())
+        esquema = ESQUEMAS.get(table_name, {})
+
+        columnas = {}
+        centavos: List[str] = list(df.attrs.get(ATTR_CENTAVOS, []))
+        for col in df.columns:
+            serie = df[col]
+            tipo = esquema.get(col) or self._inferir(col, serie)
+            if col in centavos:
+                tipo = None  # ya compactada
+
+            if tipo == "clave":
+                serie = self._a_clave(serie)
+            elif tipo == "dinero":
+                serie = a_centavos(serie)
+                centavos.append(col)
+            elif tipo == "categoria":
+                serie = serie.astype("category")
+            elif tipo == "texto":
+                serie = serie.astype("string[pyarrow]")
+            columnas[col] = serie
+
+        compacto = pd.DataFrame(columnas, index=df.index, copy=False)
+        compacto.attrs = {**df.attrs, ATTR_CENTAVOS: centavos}
+
+        report = OptimizationReport(
+            table_name=table_name,
+            rows=len(df),
+            bytes_before=bytes_before,
+            bytes_after=int(compacto.memory_usage(index=False, deep=True).sum()),
+            dtypes={col: str(dtype) for col, dtype in compacto.dtypes.items()},
+        )
+        return compacto, report
+
+    def _inferir(self, col: str, serie: pd.Series) -> Optional[str]:
+        """Tipo para columnas fuera del esquema (None = se deja igual)"""
+        if col.endswith("_id") and pd.api.types.is_numeric_dtype(serie):
+            return "clave"
+        if pd.api.types.is_string_dtype(serie) and len(serie) > 0:
+            muestra = serie.dropna()
+            if len(muestra) == 0 or not isinstance(muestra.iloc[0], str):
+                return None
+            if muestra.nunique() / len(serie) <= self.max_category_ratio:
+                return "categoria"
+            return "texto"
+        return None
+
+    def _a_clave(self, serie: pd.Series) -> pd.Series:
+        """int32 si el rango lo permite (Int32 con NULLs); si no, igual"""
+        if not pd.api.types.is_numeric_dtype(serie) or len(serie) == 0:
+            return serie
+        minimo, maximo = serie.min(), serie.max()
+        if pd.isna(minimo) or minimo < _INT32_MIN or maximo > _INT32_MAX:
+            return serie
+        if serie.isna().any():
+            return serie.astype("Int32")
+        return serie.astype(np.int32)
+
+
+def a_centavos(serie: pd.Series) -> pd.Series:
+    """
+    Montos -> int64 en centavos, redondeando como NUMERIC(., 2)
+
+    Mismo redondeo que transformers.dinero; los NULL se conservan (Int64).
+    """
+    valores = pd.to_numeric(serie, errors="coerce")
+    nulos = valores.isna().to_numpy()
+    centavos = dinero.a_centavos(valores.fillna(0))
+    if nulos.any():
+        resultado = pd.array(centavos, dtype="Int64")
+        resultado[nulos] = pd.NA
+        return pd.Series(resultado, index=serie.index, name=serie.name)
+    return pd.Series(centavos, index=serie.index, name=serie.name)
+
+
+def centavos_a_decimal(serie: pd.Series) -> pa.Array:
+    """
+    Columna en centavos -> decimal128 de Arrow con escala 2
+
+    El entero se castea a decimal de escala 0 y los mismos buffers se
+    reinterpretan con escala 2: 1234 -> 12.34 sin aritmética.
+    """
+    enteros = pa.array(serie, from_pandas=True).cast(pa.decimal128(19, 0))
+    return pa.Array.from_buffers(
+        pa.decimal128(19, 2), len(enteros), enteros.buffers(), enteros.null_count
+    )
+
+
+def restaurar_montos(df: pd.DataFrame) -> pd.DataFrame:
+    """Centavos -> float (para consumidores que no leen df.attrs)"""
+    centavos = df.attrs.get(ATTR_CENTAVOS, [])
+    if not centavos:
+        return df
+    restaurado = df.assign(
+        **{
+            col: df[col].astype("Float64").astype(float) / 100
+            for col in centavos
+            if col in df.columns
+        }
+    )
+    restaurado.attrs = {**df.attrs, ATTR_CENTAVOS: []}
+    return restaurado
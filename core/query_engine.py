@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+QUERY ENGINE - CONSULTAS LOCALES SOBRE LOS PARQUET DEL ETL
+==========================================================
+Consultas analíticas (ventas por mes, margen por producto) sobre
+data/outputs/parquet sin tocar el DW de producción:
+
+- SQL con DuckDB (dependencia opcional): cada dimensión y cada dataset
+  particionado se expone como una vista con hive_partitioning, así que
+  los filtros por anio/mes descartan directorios completos y el resto de
+  predicados se empujan a los row groups.
+- scan() con pyarrow.dataset: proyección, filtros (pushdown y poda de
+  particiones) y agregación con Table.group_by, sin dependencias extra.
+
+Los resultados se cachean en disco con una clave que incluye la consulta
+y el mtime/tamaño de cada archivo parquet: si el ETL reescribe una tabla
+la clave cambia y la consulta se vuelve a ejecutar.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import logging
+
+try:
+    import duckdb
+except ImportError:  # SQL opcional; scan() funciona solo con pyarrow
+    duckdb = None
+
+# Filtro estilo pyarrow: (columna, operador, valor)
+Filtro = Tuple[str, str, Any]
+
+
+class QueryEngine:
+    """Consultas sobre los parquet de salida, con caché por mtime"""
+
+    def __init__(self, config: Dict[str, Any] = None, root: Optional[Path] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        query_config = self.config.get("query", {})
+        self.root = Path(
+            root
+            or self.config.get("paths", {}).get(
+                "output_parquet", "../data/outputs/parquet"
+            )
+        )
+        self.cache_enabled = query_config.get("cache_enabled", True)
+        self.cache_dir = Path(query_config.get("cache_dir", "../data/cache/query"))
+
+    # ------------------------------------------------------------------
+    # Catálogo
+    # ------------------------------------------------------------------
+
+    def tables(self) -> Dict[str, Path]:
+        """
+        Tablas disponibles: dimensiones (archivo) y facts (directorio)
+
+        Si una tabla tiene directorio y también <tabla>.parquet (archivo de
+        una corrida sin particionado), manda el directorio: es el dataset
+        que escribe ParquetDatasetWriter.
+        """
+        if not self.root.exists():
+            return {}
+        tablas = {}
+        for path in sorted(self.root.iterdir()):
+            if path.is_dir() and any(path.rglob("*.parquet")):
+                tablas[path.name] = path
+            elif path.suffix == ".parquet":
+                tablas.setdefault(path.stem, path)
+        return tablas
+
+    def dataset(self, table_name: str) -> ds.Dataset:
+        """Dataset de Arrow de la tabla (particiones Hive si es directorio)"""
+        tablas = self.tables()
+        if table_name not in tablas:
+            raise KeyError(
+                f"Tabla {table_name} no encontrada en {self.root} "
+                f"(disponibles: {', '.join(tablas) or 'ninguna'})"
+            )
+        path = tablas[table_name]
+        if path.is_dir():
+            return ds.dataset(path, format="parquet", partitioning="hive")
+        return ds.dataset(path, format="parquet")
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def sql(self, query: str, use_cache: bool = True) -> pd.DataFrame:
+        """
+        Ejecuta SQL con DuckDB sobre todas las tablas del directorio
+
+        Raises:
+            RuntimeError: Si DuckDB no está instalado
+        """
+        if duckdb is None:
+            raise RuntimeError(
+                "Las consultas SQL requieren DuckDB (pip install duckdb); "
+                "sin él use scan() o query --table"
+            )
+
+        tablas = self.tables()
+        clave = self._cache_key({"sql": query}, tablas.values())
+        cacheado = self._cache_get(clave) if use_cache else None
+        if cacheado is not None:
+            return cacheado
+
+        conn = duckdb.connect(database=":memory:")
+        try:
+            for nombre, path in tablas.items():
+                origen = (
+                    f"read_parquet('{(path / '**' / '*.parquet').as_posix()}', "
+                    f"hive_partitioning = true)"
+                    if path.is_dir()
+                    else f"read_parquet('{path.as_posix()}')"
+                )
+                conn.execute(f'CREATE VIEW "{nombre}" AS SELECT * FROM {origen}')
+            resultado = conn.execute(query).fetch_df()
+        finally:
+            conn.close()
+
+        self._cache_put(clave, resultado)
+        return resultado
+
+    def scan(
+        self,
+        table_name: str,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[Sequence[Filtro]] = None,
+        group_by: Optional[Sequence[str]] = None,
+        aggregations: Optional[Sequence[Tuple[str, str]]] = None,
+        use_cache: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Lee una tabla con pyarrow, empujando filtros y proyección al dataset
+
+        Args:
+            table_name: Nombre de la dimensión o fact
+            columns: Columnas a leer (None = todas)
+            filters: Condiciones AND, p.ej. [("anio", "=", 2024), ("mes", ">=", 3)];
+                sobre columnas de partición descartan directorios completos
+            group_by: Columnas de agrupación
+            aggregations: (columna, función) de pyarrow, p.ej. ("total", "sum")
+
+        Returns:
+            DataFrame con el resultado
+        """
+        parametros = {
+            "table": table_name,
+            "columns": list(columns or []),
+            "filters": [list(map(repr, f)) for f in filters or []],
+            "group_by": list(group_by or []),
+            "aggregations": [list(a) for a in aggregations or []],
+        }
+        dataset = self.dataset(table_name)
+        clave = self._cache_key(parametros, dataset.files)
+        cacheado = self._cache_get(clave) if use_cache else None
+        if cacheado is not None:
+            return cacheado
+
+        expresion = pq.filters_to_expression(list(filters)) if filters else None
+        leer = list(columns) if columns else None
+        if group_by or aggregations:
+            # Al agregar solo se leen las columnas de grupo y de las funciones
+            leer = list(
+                dict.fromkeys([*(group_by or []), *(c for c, _ in aggregations or [])])
+            )
+
+        tabla = dataset.to_table(columns=leer, filter=expresion)
+        if group_by or aggregations:
+            tabla = tabla.group_by(list(group_by or [])).aggregate(
+                list(aggregations or [])
+            )
+
+        resultado = tabla.to_pandas()
+        self._cache_put(clave, resultado)
+        return resultado
+
+    # ------------------------------------------------------------------
+    # Caché
+    # ------------------------------------------------------------------
+
+    def _cache_key(self, parametros: Dict[str, Any], files) -> str:
+        """Hash de la consulta y del mtime/tamaño de cada archivo leído"""
+        firma = []
+        for path in files:
+            path = Path(path)
+            archivos = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+            for archivo in archivos:
+                estado = archivo.stat()
+                firma.append((archivo.as_posix(), estado.st_mtime_ns, estado.st_size))
+        contenido = json.dumps([parametros, sorted(firma)], sort_keys=True)
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:32]
+
+    def _cache_get(self, clave: str) -> Optional[pd.DataFrame]:
+        if not self.cache_enabled:
+            return None
+        archivo = self.cache_dir / f"{clave}.parquet"
+        if not archivo.exists():
+            return None
+        self.logger.debug(f"Resultado desde caché: {archivo.name}")
+        return pq.read_table(archivo).to_pandas()
+
+    def _cache_put(self, clave: str, resultado: pd.DataFrame):
+        if not self.cache_enabled:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pandas(resultado, preserve_index=False),
+                self.cache_dir / f"{clave}.parquet",
+            )
+        except (OSError, pa.ArrowException) as e:
+            # La caché es una optimización: si falla, solo se pierde el atajo
+            self.logger.warning(f"⚠️  No se pudo cachear el resultado: {e}")
+
+    def clear_cache(self) -> int:
+        """Elimina los resultados cacheados; retorna cuántos había"""
+        if not self.cache_dir.exists():
+            return 0
+        archivos = list(self.cache_dir.glob("*.parquet"))
+        for archivo in archivos:
+            archivo.unlink()
+        return len(archivos)
+
+
+def parse_filter(texto: str) -> Filtro:
+    """
+    'columna op valor' -> filtro de pyarrow
+
+    Operadores: =, ==, !=, <, <=, >, >=. Los valores numéricos se
+    convierten a int o float; el resto queda como texto.
+    """
+    for operador in ("<=", ">=", "!=", "==", "=", "<", ">"):
+        if operador in texto:
+            columna, valor = (parte.strip() for parte in texto.split(operador, 1))
+            break
+    else:
+        raise ValueError(f"Filtro inválido (use 'columna op valor'): {texto}")
+
+    valor = valor.strip("'\"")
+    for tipo in (int, float):
+        try:
+            valor = tipo(valor)
+            break
+        except ValueError:
+            continue
+    return columna, "=" if operador == "==" else operador, valor
+
+
+def parse_aggregation(texto: str) -> Tuple[str, str]:
+    """'sum:total' -> ('total', 'sum')"""
+    funcion, _, columna = texto.partition(":")
+    if not columna:
+        raise ValueError(f"Agregación inválida (use 'funcion:columna'): {texto}")
+    return columna.strip(), funcion.strip()
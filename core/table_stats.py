@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+TABLE STATS - CONTEOS DE FILAS COMPARTIDOS ENTRE FASES
+======================================================
+La carga, la validación y la reconciliación necesitan las filas de cada
+dimensión y fact. En lugar de un SELECT COUNT(*) por tabla y por fase,
+el servicio las obtiene una vez y las deja en caché:
+
+- exact: una sola consulta UNION ALL con un COUNT(*) por tabla; PostgreSQL
+  ejecuta las ramas con Parallel Append en sus workers paralelos.
+- fast: pg_class.reltuples después de ANALYZE (estimación por muestreo,
+  sin recorrer las facts completas).
+
+Una fase que necesita el número exacto (reconciliación con el origen)
+pide exact=True y solo recuenta las tablas cuya caché es una estimación.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import logging
+
+
+@dataclass
+class TableCount:
+    """Filas de una tabla del DW"""
+
+    table_name: str
+    rows: Optional[int]
+    exact: bool
+    collected_at: datetime = field(default_factory=datetime.now)
+    error: Optional[str] = None
+
+
+class TableStatsService:
+    """Conteos de filas por tabla con caché entre fases del ETL"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        stats_config = self.config.get("table_stats", {})
+        self.mode = stats_config.get("mode", "exact")
+        if self.mode not in ("exact", "fast"):
+            raise ValueError(f"table_stats.mode desconocido: {self.mode}")
+        self.parallel_workers = stats_config.get("parallel_workers", 4)
+        self.analyze = stats_config.get("analyze", True)
+
+        self._cache: Dict[str, TableCount] = {}
+        self._lock = threading.Lock()
+
+    def counts(
+        self,
+        conn,
+        tables: Iterable[str],
+        exact: Optional[bool] = None,
+        refresh: bool = False,
+    ) -> Dict[str, TableCount]:
+        """
+        Filas de cada tabla, desde la caché cuando es posible
+
+        Args:
+            conn: Conexión psycopg2 al DW
+            tables: Tablas a contar
+            exact: Forzar conteo exacto (None = según table_stats.mode)
+            refresh: Ignorar la caché (p.ej. recién terminada la carga)
+
+        Returns:
+            Dict tabla -> TableCount, en el orden de tables
+        """
+        tables = list(dict.fromkeys(tables))
+        exact = self.mode == "exact" if exact is None else exact
+
+        with self._lock:
+            faltantes = [
+                t
+                for t in tables
+                if refresh
+                or t not in self._cache
+                or self._cache[t].error is not None
+                or (exact and not self._cache[t].exact)
+            ]
+            if faltantes:
+                nuevos = self._exact(conn, faltantes) if exact else self._fast(conn, faltantes)
+                self._cache.update(nuevos)
+            return {t: self._cache[t] for t in tables}
+
+    def cached(self, table_name: str) -> Optional[TableCount]:
+        """Último conteo de la tabla (None si nunca se contó)"""
+        with self._lock:
+            return self._cache.get(table_name)
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None):
+        """Descarta conteos (todas las tablas si tables es None)"""
+        with self._lock:
+            if tables is None:
+                self._cache.clear()
+            else:
+                for table in tables:
+                    self._cache.pop(table, None)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Conteos en caché, serializables para el reporte"""
+        with self._lock:
+            return [
+                {
+                    "table": c.table_name,
+                    "rows": c.rows,
+                    "exact": c.exact,
+                    "error": c.error,
+                }
+                for c in self._cache.values()
+            ]
+
+    # ------------------------------------------------------------------
+    # Estrategias
+    # ------------------------------------------------------------------
+
+    def _existentes(self, cursor, tables: List[str]) -> List[str]:
+        """Tablas que existen (una tabla inexistente abortaría el UNION ALL)"""
+        cursor.execute(
+            "SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NOT NULL",
+            (tables,),
+        )
+        existen = {row[0] for row in cursor.fetchall()}
+        return [t for t in tables if t in existen]
+
+    def _exact(self, conn, tables: List[str]) -> Dict[str, TableCount]:
+        cursor = conn.cursor()
+        try:
+            existentes = self._existentes(cursor, tables)
+            resultado = self._no_existen(tables, existentes, exact=True)
+            if not existentes:
+                return resultado
+
+            consulta = "\nUNION ALL\n".join(
+                f"SELECT '{t}'::text AS tabla, COUNT(*) AS filas FROM {t}"
+                for t in existentes
+            )
+            # Las ramas del UNION ALL se reparten entre workers paralelos
+            cursor.execute(
+                "SELECT set_config('max_parallel_workers_per_gather', %s, false)",
+                (str(self.parallel_workers),),
+            )
+            try:
+                cursor.execute(consulta)
+                filas = dict(cursor.fetchall())
+            finally:
+                cursor.execute("RESET max_parallel_workers_per_gather")
+
+            for t in existentes:
+                resultado[t] = TableCount(table_name=t, rows=int(filas[t]), exact=True)
+            return resultado
+        finally:
+            cursor.close()
+
+    def _fast(self, conn, tables: List[str]) -> Dict[str, TableCount]:
+        cursor = conn.cursor()
+        try:
+            existentes = self._existentes(cursor, tables)
+            resultado = self._no_existen(tables, existentes, exact=False)
+            if not existentes:
+                return resultado
+
+            if self.analyze:
+                # Muestreo: actualiza reltuples sin leer la tabla completa
+                cursor.execute(f"ANALYZE {', '.join(existentes)}")
+
+            cursor.execute(
+                """
+                SELECT t, c.reltuples::bigint
+                FROM unnest(%s::text[]) AS t
+                JOIN pg_class c ON c.oid = to_regclass(t)
+                """,
+                (existentes,),
+            )
+            estimados = dict(cursor.fetchall())
+        finally:
+            cursor.close()
+
+        # reltuples = -1: nunca analizada; esas se cuentan exacto
+        sin_estadisticas = [t for t in existentes if estimados.get(t, -1) < 0]
+        if sin_estadisticas:
+            resultado.update(self._exact(conn, sin_estadisticas))
+
+        for t in existentes:
+            if t not in sin_estadisticas:
+                resultado[t] = TableCount(table_name=t, rows=int(estimados[t]), exact=False)
+        return resultado
+
+    def _no_existen(
+        self, tables: List[str], existentes: List[str], exact: bool
+    ) -> Dict[str, TableCount]:
+        return {
+            t: TableCount(table_name=t, rows=None, exact=exact, error="la tabla no existe")
+            for t in tables
+            if t not in existentes
+        }
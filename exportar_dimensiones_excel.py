@@ -1,18 +1,116 @@
 import psycopg2
-import pandas as pd
+from psycopg2.pool import ThreadedConnectionPool
+from openpyxl import Workbook
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, time as dtime
+from decimal import Decimal
 from dotenv import load_dotenv
-from datetime import datetime
 
 load_dotenv()
 
-conn = psycopg2.connect(
-    host=os.getenv("DW_DB_HOST"),
-    port=os.getenv("DW_DB_PORT"),
-    database=os.getenv("DW_DB_NAME"),
-    user=os.getenv("DW_DB_USER"),
-    password=os.getenv("DW_DB_PASS")
-)
+# Límite de Excel: 1,048,576 filas por hoja (una es el encabezado)
+MAX_FILAS_HOJA = 1_048_576 - 1
+# Filas por viaje del cursor del lado del servidor
+ITERSIZE = 10_000
+# Tablas extraídas en paralelo (una conexión del pool por tabla)
+MAX_WORKERS = int(os.getenv("EXCEL_EXPORT_WORKERS", "4"))
+
+# (tabla, ORDER BY, emoji, descripción de las filas)
+DIMENSIONES = [
+    ("dim_producto", "producto_id", "📦", "productos"),
+    ("dim_cliente", "cliente_id", "👥", "clientes"),
+    ("dim_usuario", "usuario_id", "👤", "usuarios"),
+    ("dim_fecha", "fecha_id", "📅", "fechas"),
+    ("dim_orden", "orden_id", "📋", "órdenes"),
+    ("dim_almacen", "almacen_id", "🏢", "almacenes"),
+    ("dim_cuenta_contable", "cuenta_id", "💰", "cuentas"),
+    ("dim_centro_costo", "centro_costo_id", "🏗️", "centros de costo"),
+    ("dim_promocion", "sk_promocion", "🎁", "promociones"),
+    ("dim_proveedor", "proveedor_id", "🚚", "proveedores"),
+    ("dim_tipo_movimiento", "tipo_movimiento_id", "🔄", "tipos de movimiento"),
+    ("dim_tipo_transaccion", "tipo_transaccion_id", "💳", "tipos de transacción"),
+    ("dim_impuestos", "impuesto_id", "📊", "impuestos"),
+]
+
+HECHOS = [
+    ("fact_ventas", "fecha_id, orden_id", "💰", "líneas de venta"),
+    ("fact_transacciones", "fecha_id, numero_asiento", "📒", "asientos contables"),
+    ("fact_balance", "periodo_id, cuenta_id", "⚖️", "balances"),
+    ("fact_inventario", "fecha_id, producto_id", "📦", "movimientos"),
+    ("fact_estado_resultados", "periodo_id", "📊", "períodos"),
+]
+
+# Tipos que openpyxl escribe tal cual; el resto (json, uuid, ...) como texto
+TIPOS_NATIVOS = (str, int, float, Decimal, bool, datetime, date, dtime)
+
+
+class HojasTabla:
+    """
+    Hojas de una tabla en el workbook write-only
+
+    Al llegar al límite de filas se abre otra hoja (fact_ventas_2, ...)
+    con el mismo encabezado. El workbook no es thread-safe: todas las
+    escrituras pasan por el mismo lock.
+    """
+
+    def __init__(self, workbook, lock, tabla):
+        self.workbook = workbook
+        self.lock = lock
+        self.tabla = tabla
+        self.encabezado = None
+        self.hojas = 0
+        self.filas_hoja = 0
+        self.total = 0
+        # La primera hoja se crea ya, para respetar el orden de las tablas
+        self.hoja = workbook.create_sheet(title=tabla)
+
+    def escribir(self, encabezado, filas):
+        with self.lock:
+            if self.encabezado is None:
+                self.encabezado = encabezado
+                self.hoja.append(encabezado)
+                self.hojas = 1
+            for fila in filas:
+                if self.filas_hoja == MAX_FILAS_HOJA:
+                    self._nueva_hoja()
+                self.hoja.append(
+                    [v if v is None or isinstance(v, TIPOS_NATIVOS) else str(v) for v in fila]
+                )
+                self.filas_hoja += 1
+                self.total += 1
+
+    def _nueva_hoja(self):
+        self.hojas += 1
+        self.hoja = self.workbook.create_sheet(title=f"{self.tabla}_{self.hojas}")
+        self.hoja.append(self.encabezado)
+        self.filas_hoja = 0
+
+
+def exportar_tabla(pool, hojas, tabla, orden):
+    """Lee la tabla con un cursor del lado del servidor y la vuelca en sus hojas"""
+    conn = pool.getconn()
+    try:
+        # Cursor con nombre: PostgreSQL entrega las filas de a ITERSIZE
+        with conn.cursor(name=f"export_{tabla}") as cur:
+            cur.itersize = ITERSIZE
+            cur.execute(f"SELECT * FROM {tabla} ORDER BY {orden}")
+            encabezado = None
+            while True:
+                filas = cur.fetchmany(ITERSIZE)
+                if encabezado is None:
+                    encabezado = [col[0] for col in cur.description]
+                    hojas.escribir(encabezado, [])
+                if not filas:
+                    break
+                hojas.escribir(encabezado, filas)
+        conn.rollback()
+    finally:
+        pool.putconn(conn)
+    return hojas
+
 
 print("\n" + "=" * 80)
 print("📊 EXPORTANDO DIMENSIONES Y HECHOS A EXCEL")
@@ -21,159 +119,60 @@ print("=" * 80)
 # Nombre del archivo
 filename = f"DataWarehouse_Completo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
-# Crear el writer de Excel
-with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-    
-    # 1. dim_producto
-    print("\n📦 Exportando dim_producto...")
-    df = pd.read_sql_query("SELECT * FROM dim_producto ORDER BY producto_id", conn)
-    df.to_excel(writer, sheet_name='dim_producto', index=False)
-    print(f"   ✓ {len(df):,} productos")
-    
-    # 2. dim_cliente
-    print("👥 Exportando dim_cliente...")
-    df = pd.read_sql_query("SELECT * FROM dim_cliente ORDER BY cliente_id", conn)
-    df.to_excel(writer, sheet_name='dim_cliente', index=False)
-    print(f"   ✓ {len(df):,} clientes")
-    
-    # 3. dim_usuario
-    print("👤 Exportando dim_usuario...")
-    df = pd.read_sql_query("SELECT * FROM dim_usuario ORDER BY usuario_id", conn)
-    df.to_excel(writer, sheet_name='dim_usuario', index=False)
-    print(f"   ✓ {len(df):,} usuarios")
-    
-    # 4. dim_fecha
-    print("📅 Exportando dim_fecha...")
-    df = pd.read_sql_query("SELECT * FROM dim_fecha ORDER BY fecha_id", conn)
-    df.to_excel(writer, sheet_name='dim_fecha', index=False)
-    print(f"   ✓ {len(df):,} fechas")
-    
-    # 5. dim_orden
-    print("📋 Exportando dim_orden...")
-    df = pd.read_sql_query("SELECT * FROM dim_orden ORDER BY orden_id", conn)
-    df.to_excel(writer, sheet_name='dim_orden', index=False)
-    print(f"   ✓ {len(df):,} órdenes")
-    
-    # 6. dim_almacen
-    print("🏢 Exportando dim_almacen...")
-    df = pd.read_sql_query("SELECT * FROM dim_almacen ORDER BY almacen_id", conn)
-    df.to_excel(writer, sheet_name='dim_almacen', index=False)
-    print(f"   ✓ {len(df):,} almacenes")
-    
-    # 7. dim_cuenta_contable
-    print("💰 Exportando dim_cuenta_contable...")
-    df = pd.read_sql_query("SELECT * FROM dim_cuenta_contable ORDER BY cuenta_id", conn)
-    df.to_excel(writer, sheet_name='dim_cuenta_contable', index=False)
-    print(f"   ✓ {len(df):,} cuentas")
-    
-    # 8. dim_centro_costo
-    print("🏗️ Exportando dim_centro_costo...")
-    df = pd.read_sql_query("SELECT * FROM dim_centro_costo ORDER BY centro_costo_id", conn)
-    df.to_excel(writer, sheet_name='dim_centro_costo', index=False)
-    print(f"   ✓ {len(df):,} centros de costo")
-    
-    # 9. dim_promocion
-    print("🎁 Exportando dim_promocion...")
-    df = pd.read_sql_query("SELECT * FROM dim_promocion ORDER BY sk_promocion", conn)
-    df.to_excel(writer, sheet_name='dim_promocion', index=False)
-    print(f"   ✓ {len(df):,} promociones")
-    
-    # 10. dim_proveedor
-    print("🚚 Exportando dim_proveedor...")
-    df = pd.read_sql_query("SELECT * FROM dim_proveedor ORDER BY proveedor_id", conn)
-    df.to_excel(writer, sheet_name='dim_proveedor', index=False)
-    print(f"   ✓ {len(df):,} proveedores")
-    
-    # 11. dim_tipo_movimiento
-    print("🔄 Exportando dim_tipo_movimiento...")
-    df = pd.read_sql_query("SELECT * FROM dim_tipo_movimiento ORDER BY tipo_movimiento_id", conn)
-    df.to_excel(writer, sheet_name='dim_tipo_movimiento', index=False)
-    print(f"   ✓ {len(df):,} tipos de movimiento")
-    
-    # 12. dim_tipo_transaccion
-    print("💳 Exportando dim_tipo_transaccion...")
-    df = pd.read_sql_query("SELECT * FROM dim_tipo_transaccion ORDER BY tipo_transaccion_id", conn)
-    df.to_excel(writer, sheet_name='dim_tipo_transaccion', index=False)
-    print(f"   ✓ {len(df):,} tipos de transacción")
-    
-    # 13. dim_impuestos
-    print("📊 Exportando dim_impuestos...")
-    df = pd.read_sql_query("SELECT * FROM dim_impuestos ORDER BY impuesto_id", conn)
-    df.to_excel(writer, sheet_name='dim_impuestos', index=False)
-    print(f"   ✓ {len(df):,} impuestos")
-    
-    # TABLAS DE HECHOS
-    print("\n" + "=" * 80)
-    print("📈 EXPORTANDO TABLAS DE HECHOS")
-    print("=" * 80)
-    
-    # 1. fact_ventas
-    print("\n💰 Exportando fact_ventas...")
-    df = pd.read_sql_query("SELECT * FROM fact_ventas ORDER BY fecha_id, orden_id", conn)
-    df.to_excel(writer, sheet_name='fact_ventas', index=False)
-    print(f"   ✓ {len(df):,} líneas de venta")
-    
-    # 2. fact_transacciones
-    print("📒 Exportando fact_transacciones...")
-    df = pd.read_sql_query("SELECT * FROM fact_transacciones ORDER BY fecha_id, numero_asiento", conn)
-    df.to_excel(writer, sheet_name='fact_transacciones', index=False)
-    print(f"   ✓ {len(df):,} asientos contables")
-    
-    # 3. fact_balance
-    print("⚖️ Exportando fact_balance...")
-    df = pd.read_sql_query("SELECT * FROM fact_balance ORDER BY periodo_id, cuenta_id", conn)
-    df.to_excel(writer, sheet_name='fact_balance', index=False)
-    print(f"   ✓ {len(df):,} balances")
-    
-    # 4. fact_inventario
-    print("📦 Exportando fact_inventario...")
-    df = pd.read_sql_query("SELECT * FROM fact_inventario ORDER BY fecha_id, producto_id", conn)
-    df.to_excel(writer, sheet_name='fact_inventario', index=False)
-    print(f"   ✓ {len(df):,} movimientos")
-    
-    # 5. fact_estado_resultados
-    print("📊 Exportando fact_estado_resultados...")
-    df = pd.read_sql_query("SELECT * FROM fact_estado_resultados ORDER BY periodo_id", conn)
-    df.to_excel(writer, sheet_name='fact_estado_resultados', index=False)
-    print(f"   ✓ {len(df):,} períodos")
-    
-    # Resumen
-    print("\n📄 Creando hoja de resumen...")
-    cur = conn.cursor()
-    resumen_data = []
-    
-    # Dimensiones
-    dimensiones = [
-        'dim_producto', 'dim_cliente', 'dim_usuario', 'dim_fecha',
-        'dim_orden', 'dim_almacen', 'dim_cuenta_contable', 'dim_centro_costo',
-        'dim_promocion', 'dim_proveedor', 'dim_tipo_movimiento',
-        'dim_tipo_transaccion', 'dim_impuestos'
-    ]
-    
-    for dim in dimensiones:
-        cur.execute(f"SELECT COUNT(*) FROM {dim}")
-        count = cur.fetchone()[0]
-        resumen_data.append({'Tipo': 'Dimensión', 'Tabla': dim, 'Registros': count})
-    
-    # Hechos
-    hechos = [
-        'fact_ventas', 'fact_transacciones', 'fact_balance', 
-        'fact_inventario', 'fact_estado_resultados'
-    ]
-    
-    for fact in hechos:
-        cur.execute(f"SELECT COUNT(*) FROM {fact}")
-        count = cur.fetchone()[0]
-        resumen_data.append({'Tipo': 'Hecho', 'Tabla': fact, 'Registros': count})
-    
-    df_resumen = pd.DataFrame(resumen_data)
-    df_resumen.to_excel(writer, sheet_name='Resumen', index=False)
-    print(f"   ✓ Resumen creado")
-
-conn.close()
+pool = ThreadedConnectionPool(
+    1,
+    MAX_WORKERS,
+    host=os.getenv("DW_DB_HOST"),
+    port=os.getenv("DW_DB_PORT"),
+    database=os.getenv("DW_DB_NAME"),
+    user=os.getenv("DW_DB_USER"),
+    password=os.getenv("DW_DB_PASS"),
+)
+
+# Workbook write-only: las filas van a disco, la memoria no crece con la tabla
+workbook = Workbook(write_only=True)
+lock = threading.Lock()
+tablas = DIMENSIONES + HECHOS
+hojas = {tabla: HojasTabla(workbook, lock, tabla) for tabla, _, _, _ in tablas}
+descripcion = {tabla: (emoji, texto) for tabla, _, emoji, texto in tablas}
+
+inicio = time.perf_counter()
+try:
+    # Hechos primero: son las tablas largas y definen el tiempo total
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futuros = {
+            executor.submit(exportar_tabla, pool, hojas[tabla], tabla, orden): tabla
+            for tabla, orden, _, _ in HECHOS + DIMENSIONES
+        }
+        for futuro in as_completed(futuros):
+            tabla = futuros[futuro]
+            resultado = futuro.result()
+            emoji, texto = descripcion[tabla]
+            extra = f" en {resultado.hojas} hojas" if resultado.hojas > 1 else ""
+            print(f"{emoji} {tabla}: {resultado.total:,} {texto}{extra}")
+finally:
+    pool.closeall()
 
+# Resumen (conteos de las filas exportadas, sin volver a consultar)
+print("\n📄 Creando hoja de resumen...")
+resumen = workbook.create_sheet(title="Resumen")
+resumen.append(["Tipo", "Tabla", "Registros", "Hojas"])
+for tabla, _, _, _ in DIMENSIONES:
+    resumen.append(["Dimensión", tabla, hojas[tabla].total, hojas[tabla].hojas])
+for tabla, _, _, _ in HECHOS:
+    resumen.append(["Hecho", tabla, hojas[tabla].total, hojas[tabla].hojas])
+print(f"   ✓ Resumen creado")
+
+print("\n💾 Guardando archivo...")
+workbook.save(filename)
+
+total_hojas = sum(h.hojas for h in hojas.values()) + 1
 print("\n" + "=" * 80)
 print(f"✅ ARCHIVO CREADO: {filename}")
 print("=" * 80)
 print(f"\n📁 Ubicación: {os.path.abspath(filename)}")
-print(f"📊 Total hojas: 19 (13 dimensiones + 5 hechos + 1 resumen)")
+print(
+    f"📊 Total hojas: {total_hojas} ({len(DIMENSIONES)} dimensiones + "
+    f"{len(HECHOS)} hechos + 1 resumen)"
+)
+print(f"⏱️  Tiempo: {time.perf_counter() - inicio:.1f} s")
@@ -6,12 +6,12 @@ Extrae datos de OroCommerce y OroCRM con procesamiento por lotes
 """
 
 import pandas as pd
-import psycopg2
 from typing import Dict, List, Any
-import os
 from pathlib import Path
 import logging
 
+from core.connection_manager import get_connection_manager
+
 
 class DatabaseExtractor:
     """Extractor de datos de bases de datos PostgreSQL"""
@@ -111,20 +111,8 @@ class DatabaseExtractor:
 
     def _get_oro_connection(self):
         """Obtiene conexión a OroCommerce"""
-        return psycopg2.connect(
-            host=os.getenv("ORO_DB_HOST"),
-            port=int(os.getenv("ORO_DB_PORT")),
-            dbname=os.getenv("ORO_DB_NAME"),
-            user=os.getenv("ORO_DB_USER"),
-            password=os.getenv("ORO_DB_PASS"),
-        )
+        return get_connection_manager(self.config).connect("oro")
 
     def _get_crm_connection(self):
         """Obtiene conexión a OroCRM"""
-        return psycopg2.connect(
-            host=os.getenv("CRM_DB_HOST"),
-            port=int(os.getenv("CRM_DB_PORT")),
-            dbname=os.getenv("CRM_DB_NAME"),
-            user=os.getenv("CRM_DB_USER"),
-            password=os.getenv("CRM_DB_PASS"),
-        )
+        return get_connection_manager(self.config).connect("crm")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+EXTRACT CACHE - CACHÉ EN DISCO DE LAS EXTRACCIONES DEL ORIGEN
+=============================================================
+Las dimensiones leen en cada corrida las mismas consultas de OroCommerce
+(oro_product, oro_customer, los promedios de oro_price_product,
+oro_promotion) y los mismos CSV aunque el origen no haya cambiado.
+
+La caché guarda cada resultado como un archivo Arrow IPC (Feather sin
+comprimir) cuyo nombre es el hash de:
+
+- Consultas: el texto SQL, sus parámetros y una huella de cada tabla
+  leída: count(*) y max(updated_at). Las tablas sin updated_at (p.ej.
+  oro_price_product) usan la suma de hashtext de cada fila, que cambia
+  con cualquier UPDATE aunque count(*) no cambie; cuesta un recorrido
+  de la tabla, pero no transfiere filas.
+- CSV: ruta, mtime, tamaño y sha256 del contenido, y los kwargs de lectura.
+
+Si el origen cambia, cambia la huella y la consulta se vuelve a ejecutar.
+Los archivos se leen con memory map: Arrow mapea el archivo sin copiarlo
+y solo la conversión a pandas materializa las columnas.
+
+Se configura en la sección optimization de etl_config.yaml:
+enable_caching, cache_ttl (antigüedad máxima de una entrada, aunque la
+huella coincida) y extract_cache_dir.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import psycopg2
+import logging
+
+
+class ExtractCache:
+    """Resultados de consultas y CSV del origen cacheados en Feather"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        optimization = self.config.get("optimization", {})
+        self.enabled = optimization.get("enable_caching", False)
+        self.ttl = optimization.get("cache_ttl", 3600)
+        self.cache_dir = Path(
+            optimization.get("extract_cache_dir", "../data/cache/extract")
+        )
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def read_sql(
+        self,
+        name: str,
+        query: str,
+        conn,
+        tables: Sequence[str],
+        params: Optional[Sequence[Any]] = None,
+    ) -> pd.DataFrame:
+        """
+        pd.read_sql_query con caché
+
+        Args:
+            name: Prefijo del archivo en la caché (p.ej. 'dim_producto')
+            query: Consulta SQL
+            conn: Conexión psycopg2 al origen
+            tables: Tablas que lee la consulta (definen la huella)
+            params: Parámetros de la consulta
+        """
+        if not self.enabled:
+            return pd.read_sql_query(query, conn, params=params)
+
+        try:
+            huella = self._huella_tablas(conn, list(tables))
+        except psycopg2.Error as e:
+            # Sin huella no hay clave confiable: se consulta directo
+            conn.rollback()
+            self.logger.debug(f"Sin huella para {name}: {e}")
+            return pd.read_sql_query(query, conn, params=params)
+
+        clave = self._clave(
+            {"sql": query, "params": list(params or []), "tablas": huella}
+        )
+        return self._cacheado(
+            name, clave, lambda: pd.read_sql_query(query, conn, params=params)
+        )
+
+    def read_csv(self, path, **kwargs) -> pd.DataFrame:
+        """pd.read_csv con caché (huella: mtime, tamaño y sha256 del archivo)"""
+        path = Path(path)
+        if not self.enabled:
+            return pd.read_csv(path, **kwargs)
+
+        estado = path.stat()
+        clave = self._clave(
+            {
+                "csv": path.resolve().as_posix(),
+                "mtime": estado.st_mtime_ns,
+                "size": estado.st_size,
+                "sha256": _sha256(path),
+                "kwargs": {k: repr(v) for k, v in sorted(kwargs.items())},
+            }
+        )
+        return self._cacheado(path.stem, clave, lambda: pd.read_csv(path, **kwargs))
+
+    def stats(self) -> Dict[str, int]:
+        """Aciertos y fallos de la caché (serializables para el reporte)"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> int:
+        """Elimina las entradas de la caché; retorna cuántas había"""
+        if not self.cache_dir.exists():
+            return 0
+        archivos = list(self.cache_dir.glob("*.feather"))
+        for archivo in archivos:
+            archivo.unlink()
+        return len(archivos)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _cacheado(self, name: str, clave: str, extraer) -> pd.DataFrame:
+        archivo = self.cache_dir / f"{name}-{clave}.feather"
+        df = self._leer(archivo)
+        if df is not None:
+            with self._lock:
+                self.hits += 1
+            self.logger.debug(f"Extracción desde caché: {archivo.name}")
+            return df
+
+        with self._lock:
+            self.misses += 1
+        df = extraer()
+        self._escribir(name, archivo, df)
+        return df
+
+    def _leer(self, archivo: Path) -> Optional[pd.DataFrame]:
+        if not archivo.exists():
+            return None
+        if self.ttl and time.time() - archivo.stat().st_mtime > self.ttl:
+            return None
+        try:
+            # memory_map: Arrow lee los buffers directo del archivo mapeado
+            return feather.read_table(archivo, memory_map=True).to_pandas()
+        except (OSError, pa.ArrowException) as e:
+            self.logger.warning(f"⚠️  Entrada de caché ilegible {archivo.name}: {e}")
+            return None
+
+    def _escribir(self, name: str, archivo: Path, df: pd.DataFrame):
+        """Guarda el resultado y elimina las entradas anteriores del mismo nombre"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            temporal = archivo.with_suffix(".tmp")
+            # Sin compresión: los buffers del archivo se mapean tal cual al leer
+            feather.write_feather(tabla, temporal, compression="uncompressed")
+            temporal.replace(archivo)
+        except (OSError, pa.ArrowException) as e:
+            # p.ej. columnas json; la caché es una optimización, no un requisito
+            self.logger.warning(f"⚠️  No se pudo cachear {name}: {e}")
+            return
+
+        for anterior in self.cache_dir.glob(f"{name}-*.feather"):
+            if anterior != archivo:
+                anterior.unlink(missing_ok=True)
+
+    def _huella_tablas(self, conn, tables: List[str]) -> Dict[str, List[Any]]:
+        """
+        Huella de cada tabla en una sola consulta
+
+        count(*) más max(updated_at) si la tabla tiene esa columna; si no,
+        la suma de hashtext de las filas (el contenido completo de la fila)
+        """
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT table_name FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                  AND column_name = 'updated_at'
+                  AND table_name = ANY(%s)
+                """,
+                (tables,),
+            )
+            con_updated_at = {row[0] for row in cursor.fetchall()}
+            cambios = {
+                t: (
+                    "MAX(updated_at)::text"
+                    if t in con_updated_at
+                    else "SUM(hashtext(fila::text))::text"
+                )
+                for t in tables
+            }
+            cursor.execute(
+                "\nUNION ALL\n".join(
+                    f"SELECT '{t}'::text, COUNT(*), {cambios[t]} FROM {t} AS fila"
+                    for t in tables
+                )
+            )
+            return {tabla: [filas, maximo] for tabla, filas, maximo in cursor.fetchall()}
+
+    def _clave(self, contenido: Dict[str, Any]) -> str:
+        texto = json.dumps(contenido, sort_keys=True, default=str)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
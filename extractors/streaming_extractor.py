@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+STREAMING EXTRACTOR - EXTRACCIÓN POR CHUNKS CON CURSORES DE SERVIDOR
+====================================================================
+Lee consultas grandes con cursores con nombre (server-side) de psycopg2
+y entrega DataFrames de tamaño acotado, sin materializar el resultado
+completo ni en el buffer del cliente ni en un único DataFrame.
+"""
+
+import pandas as pd
+from typing import Any, Dict, Iterator, Optional
+import logging
+
+
+class StreamingExtractor:
+    """Extractor de consultas por chunks usando named cursors"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+        self.itersize = self.config.get("extraction", {}).get("itersize", 50000)
+
+    def iter_chunks(
+        self,
+        conn,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        cursor_name: str = "etl_stream",
+        itersize: Optional[int] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Ejecuta la consulta en un cursor de servidor y genera DataFrames
+
+        Args:
+            conn: Conexión psycopg2 (el cursor vive en su transacción)
+            query: Consulta SQL (con ORDER BY si el consumidor depende del orden)
+            params: Parámetros de la consulta
+            cursor_name: Nombre del cursor en el servidor
+            itersize: Filas por FETCH y por chunk (por defecto extraction.itersize)
+
+        Yields:
+            DataFrames con a lo sumo itersize filas. Los NUMERIC llegan como
+            float, igual que con pd.read_sql_query.
+        """
+        itersize = itersize or self.itersize
+
+        # En autocommit el cursor debe sobrevivir fuera de una transacción
+        cursor = conn.cursor(name=cursor_name, withhold=conn.autocommit)
+        cursor.itersize = itersize
+
+        chunks = 0
+        rows_read = 0
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+
+                columns = [col[0] for col in cursor.description]
+                chunks += 1
+                rows_read += len(rows)
+                yield pd.DataFrame.from_records(
+                    rows, columns=columns, coerce_float=True
+                )
+        finally:
+            cursor.close()
+
+        self.logger.debug(
+            f"Stream {cursor_name}: {rows_read:,} filas en {chunks} chunks"
+        )
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+COPY LOADER - CARGA MASIVA CON COPY FROM STDIN
+==============================================
+Carga DataFrames al data warehouse con COPY en formato CSV.
+El buffer se arma columna por columna con Arrow (sin tuplas por fila).
+Las columnas compactadas a centavos (ver core.dtype_optimizer) se
+escriben como decimales de escala 2.
+"""
+
+import io
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import logging
+
+from core.dtype_optimizer import ATTR_CENTAVOS, centavos_a_decimal
+
+
+@dataclass
+class LoadStats:
+    """Estadísticas de carga de una tabla"""
+
+    table_name: str
+    rows: int
+    elapsed_seconds: float
+    method: str  # 'copy', 'insert', 'swap', 'merge', 'upsert'
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return float(self.rows)
+        return self.rows / self.elapsed_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "table": self.table_name,
+            "rows": self.rows,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "method": self.method,
+        }
+
+
+class CopyLoader:
+    """Loader de DataFrames a PostgreSQL usando COPY ... FROM STDIN"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+    def load(
+        self,
+        conn,
+        table_name: str,
+        df: pd.DataFrame,
+        on_conflict_do_nothing: bool = False,
+    ) -> LoadStats:
+        """
+        Carga un DataFrame completo en una tabla con COPY
+
+        Args:
+            conn: Conexión psycopg2 al DW
+            table_name: Tabla destino
+            df: DataFrame con columnas iguales a las de la tabla
+            on_conflict_do_nothing: Pasar por una tabla temporal e insertar
+                con ON CONFLICT DO NOTHING (mismo efecto que el INSERT previo)
+
+        Returns:
+            LoadStats con filas y filas/segundo
+        """
+        start = time.perf_counter()
+        columns = df.columns.tolist()
+
+        if on_conflict_do_nothing:
+            rows = self._copy_via_temp_table(conn, table_name, df, columns)
+        else:
+            rows = self.copy_dataframe(conn, table_name, df, columns)
+
+        return LoadStats(
+            table_name=table_name,
+            rows=rows,
+            elapsed_seconds=time.perf_counter() - start,
+            method="copy",
+        )
+
+    def copy_dataframe(
+        self,
+        conn,
+        table_name: str,
+        df: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+    ) -> int:
+        """Ejecuta COPY table (cols) FROM STDIN con el DataFrame serializado"""
+        if columns is None:
+            columns = df.columns.tolist()
+
+        buffer = self.dataframe_to_csv_buffer(df[columns])
+
+        cursor = conn.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table_name} ({', '.join(columns)}) "
+                f"FROM STDIN WITH (FORMAT csv, NULL '')",
+                buffer,
+            )
+        finally:
+            cursor.close()
+
+        return len(df)
+
+    def dataframe_to_csv_buffer(self, df: pd.DataFrame) -> io.BytesIO:
+        """
+        Serializa el DataFrame a CSV en memoria
+
+        Cada columna se convierte a un arreglo Arrow por separado y el
+        writer de Arrow genera el CSV en C++. Los nulos quedan como campo
+        vacío sin comillas y las cadenas vacías como "" (COPY las distingue).
+        """
+        table = self.dataframe_to_arrow(df)
+
+        buffer = io.BytesIO()
+        pacsv.write_csv(
+            table,
+            buffer,
+            write_options=pacsv.WriteOptions(
+                include_header=False, quoting_style="needed"
+            ),
+        )
+        buffer.seek(0)
+        return buffer
+
+    def dataframe_to_arrow(self, df: pd.DataFrame) -> pa.Table:
+        """Tabla Arrow del DataFrame (la misma para COPY y para parquet)"""
+        centavos = set(df.attrs.get(ATTR_CENTAVOS, []))
+        arrays = [
+            centavos_a_decimal(df[col])
+            if col in centavos
+            else self._to_arrow_column(df[col])
+            for col in df.columns
+        ]
+        return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+    def _to_arrow_column(self, serie: pd.Series) -> pa.Array:
+        """Convierte una columna de pandas a Arrow (NaN/NaT/None → null)"""
+        # Categorías: arreglo de diccionario, el writer CSV escribe los valores
+        try:
+            array = pa.array(serie, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Columnas object con tipos mezclados: serializar como texto
+            array = pa.array(
+                serie.astype(str).where(serie.notna(), None), from_pandas=True
+            )
+
+        if pa.types.is_null(array.type):
+            array = array.cast(pa.string())
+
+        return array
+
+    def merge(
+        self,
+        conn,
+        table_name: str,
+        df: pd.DataFrame,
+        key_columns: List[str],
+        scope_column: Optional[str] = None,
+    ) -> LoadStats:
+        """
+        Fusiona un delta en la tabla por clave natural (DELETE + INSERT)
+
+        Args:
+            conn: Conexión psycopg2 al DW
+            table_name: Tabla destino
+            df: Delta con columnas de la tabla
+            key_columns: Clave natural (p.ej. line_item_id_externo)
+            scope_column: Si se indica, el delta trae grupos completos
+                (p.ej. todas las líneas de cada orden): se eliminan también
+                las filas del grupo que ya no existen en origen
+
+        Returns:
+            LoadStats con las filas insertadas
+        """
+        start = time.perf_counter()
+        temp_table = f"tmp_merge_{table_name}"
+        columns = df.columns.tolist()
+        column_list = ", ".join(columns)
+        match = " AND ".join(f"t.{col} = s.{col}" for col in key_columns)
+
+        # DELETE + INSERT en una sola transacción: los lectores no ven huecos
+        previous_autocommit = conn.autocommit
+        if previous_autocommit:
+            conn.autocommit = False
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {temp_table} AS "
+                f"SELECT {column_list} FROM {table_name} WITH NO DATA"
+            )
+            self.copy_dataframe(conn, temp_table, df, columns)
+            cursor.execute(f"ANALYZE {temp_table}")
+
+            deleted = 0
+            if scope_column:
+                cursor.execute(
+                    f"DELETE FROM {table_name} t "
+                    f"WHERE t.{scope_column} IN "
+                    f"(SELECT DISTINCT {scope_column} FROM {temp_table})"
+                )
+                deleted += cursor.rowcount
+
+            cursor.execute(
+                f"DELETE FROM {table_name} t USING {temp_table} s WHERE {match}"
+            )
+            deleted += cursor.rowcount
+
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) OVERRIDING SYSTEM VALUE "
+                f"SELECT {column_list} FROM {temp_table}"
+            )
+            inserted = cursor.rowcount
+            cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+
+            if previous_autocommit:
+                conn.commit()
+        except Exception:
+            if previous_autocommit:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if previous_autocommit:
+                conn.autocommit = True
+
+        self.logger.info(
+            f"🔀 Merge {table_name}: {deleted:,} filas reemplazadas/eliminadas, "
+            f"{inserted:,} insertadas"
+        )
+
+        return LoadStats(
+            table_name=table_name,
+            rows=inserted,
+            elapsed_seconds=time.perf_counter() - start,
+            method="merge",
+        )
+
+    def upsert(
+        self,
+        conn,
+        table_name: str,
+        df: pd.DataFrame,
+        conflict_columns: Optional[List[str]] = None,
+        ignore_columns: Optional[List[str]] = None,
+    ) -> LoadStats:
+        """
+        INSERT ... ON CONFLICT DO UPDATE desde una tabla temporal cargada con COPY
+
+        Solo se escriben filas nuevas o con algún valor distinto; las filas
+        sin cambios no generan versiones nuevas (menos bloat y vacuum).
+
+        Args:
+            conn: Conexión psycopg2 al DW
+            table_name: Tabla destino
+            df: DataFrame con columnas de la tabla
+            conflict_columns: Clave del ON CONFLICT (por defecto la PK)
+            ignore_columns: Columnas de sello de carga (created_at, fecha_carga)
+                que no cuentan como cambio ni se sobrescriben
+
+        Returns:
+            LoadStats con las filas escritas (insertadas + actualizadas)
+        """
+        start = time.perf_counter()
+        temp_table = f"tmp_upsert_{table_name}"
+        columns = df.columns.tolist()
+        column_list = ", ".join(columns)
+
+        if conflict_columns is None:
+            conflict_columns = self.get_primary_key(conn, table_name)
+        if not conflict_columns:
+            raise ValueError(f"{table_name} no tiene PK para ON CONFLICT")
+
+        # ON CONFLICT DO UPDATE no admite la misma clave dos veces en un lote
+        df = df.drop_duplicates(subset=conflict_columns, keep="first")
+
+        ignore = set(ignore_columns or [])
+        update_columns = [
+            col for col in columns if col not in conflict_columns and col not in ignore
+        ]
+
+        if update_columns:
+            assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+            current = ", ".join(f"{table_name}.{col}" for col in update_columns)
+            incoming = ", ".join(f"EXCLUDED.{col}" for col in update_columns)
+            on_conflict = (
+                f"DO UPDATE SET {assignments} "
+                f"WHERE ({current}) IS DISTINCT FROM ({incoming})"
+            )
+        else:
+            on_conflict = "DO NOTHING"
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {temp_table} AS "
+                f"SELECT {column_list} FROM {table_name} WITH NO DATA"
+            )
+            self.copy_dataframe(conn, temp_table, df, columns)
+
+            # xmax = 0 distingue filas insertadas de actualizadas
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) OVERRIDING SYSTEM VALUE "
+                f"SELECT {column_list} FROM {temp_table} "
+                f"ON CONFLICT ({', '.join(conflict_columns)}) {on_conflict} "
+                f"RETURNING (xmax = 0)"
+            )
+            written = cursor.fetchall()
+            cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+        finally:
+            cursor.close()
+
+        inserted = sum(1 for (is_insert,) in written if is_insert)
+        updated = len(written) - inserted
+        self.logger.info(
+            f"🔁 Upsert {table_name}: {inserted:,} nuevas, {updated:,} actualizadas, "
+            f"{len(df) - len(written):,} sin cambios"
+        )
+
+        return LoadStats(
+            table_name=table_name,
+            rows=len(written),
+            elapsed_seconds=time.perf_counter() - start,
+            method="upsert",
+        )
+
+    def get_primary_key(self, conn, table_name: str) -> List[str]:
+        """Columnas de la PK de la tabla según pg_index"""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a
+              ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            ORDER BY array_position(i.indkey::int2[], a.attnum)
+            """,
+            (table_name,),
+        )
+        columns = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return columns
+
+    def _copy_via_temp_table(
+        self, conn, table_name: str, df: pd.DataFrame, columns: List[str]
+    ) -> int:
+        """COPY a una tabla temporal y luego INSERT ... ON CONFLICT DO NOTHING"""
+        temp_table = f"tmp_copy_{table_name}"
+        column_list = ", ".join(columns)
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {temp_table} AS "
+                f"SELECT {column_list} FROM {table_name} WITH NO DATA"
+            )
+            self.copy_dataframe(conn, temp_table, df, columns)
+            cursor.execute(
+                f"INSERT INTO {table_name} ({column_list}) OVERRIDING SYSTEM VALUE "
+                f"SELECT {column_list} FROM {temp_table} ON CONFLICT DO NOTHING"
+            )
+            inserted = cursor.rowcount
+            cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+        finally:
+            cursor.close()
+
+        return inserted
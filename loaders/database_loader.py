@@ -6,13 +6,15 @@ Carga datos procesados al data warehouse
 """
 
 import pandas as pd
-import psycopg2
 from psycopg2.extras import execute_values
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pathlib import Path
-import os
 import logging
 
+from core.connection_manager import get_connection_manager
+from loaders.copy_loader import CopyLoader
+from loaders.staging_swap_loader import StagingSwapLoader
+
 
 class DatabaseLoader:
     """Loader de datos a PostgreSQL"""
@@ -20,6 +22,8 @@ class DatabaseLoader:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.copy_loader = CopyLoader(config)
+        self.swap_loader = StagingSwapLoader(config, self.copy_loader)
 
     def load_table(
         self, file_path: Path, table_name: str, strategy: str = "truncate_and_load"
@@ -53,6 +57,8 @@ class DatabaseLoader:
                 self._incremental_load(conn, table_name, df)
             elif strategy == "upsert":
                 self._upsert_load(conn, table_name, df)
+            elif strategy == "staging_swap":
+                self._staging_swap_load(conn, table_name, df)
             else:
                 raise ValueError(f"Estrategia desconocida: {strategy}")
 
@@ -91,75 +97,13 @@ class DatabaseLoader:
             
             # Insertar datos
             if len(df) > 0:
-                # Obtener columnas de la tabla desde la base de datos
-                cursor.execute(f"""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = '{table_name}' 
-                    AND table_schema = 'public'
-                    AND column_name NOT IN ('created_at', 'updated_at')
-                    ORDER BY ordinal_position
-                """)
-                
-                db_columns = [row[0] for row in cursor.fetchall()]
-                
-                # Mapear columnas del DF a columnas de la BD
-                column_mapping = {}
-                for db_col in db_columns:
-                    if db_col in df.columns:
-                        # Coincidencia exacta - SIEMPRE preferir esto
-                        column_mapping[db_col] = db_col
-                    elif db_col.endswith('_id'):
-                        # Buscar columna extendida SOLO si no existe coincidencia exacta
-                        # Ej: cuenta_id en BD busca cuenta_contable_id, centro_costo_id
-                        base_name = db_col[:-3]  # Quitar '_id'
-                        matching_cols = [c for c in df.columns 
-                                        if c != db_col  # No auto-mapear
-                                        and base_name in c 
-                                        and c.endswith('_id')
-                                        and len(c) > len(db_col)]  # Solo columnas MÁS largas (más específicas)
-                        if matching_cols:
-                            # Preferir la columna más específica
-                            column_mapping[db_col] = max(matching_cols, key=len)
-                
-                print(f"MAPPING {table_name}: {list(column_mapping.items())[:5]}")
-                
-                if not column_mapping:
-                    self.logger.warning(f"No hay columnas coincidentes para {table_name}")
+                df_to_load = self._map_columns(cursor, table_name, df)
+
+                if df_to_load is None:
                     cursor.close()
                     return
-                
-                # Crear DataFrame con columnas renombradas
-                df_to_load = df[[column_mapping[db_col] for db_col in column_mapping.keys()]].copy()
-                df_to_load.columns = list(column_mapping.keys())  # Renombrar a nombres de BD
-                
-                # Convertir valores numpy a Python nativos
-                def convert_value(val):
-                    if pd.isna(val):
-                        return None
-                    if hasattr(val, 'item'):  # numpy types tienen .item()
-                        return val.item()
-                    return val
-                
-                values = [tuple(convert_value(v) for v in row) for row in df_to_load.values]
-
-                # Usar los nombres de columnas de BD (ya mapeados en df_to_load)
-                insert_query = f"""
-                    INSERT INTO {table_name} ({', '.join(df_to_load.columns)})
-                    VALUES %s
-                """
-
-                # Cargar en batches con commits intermedios para mejor rendimiento
-                batch_size = 10000
-                total_loaded = 0
-                
-                for i in range(0, len(values), batch_size):
-                    batch = values[i:i + batch_size]
-                    execute_values(cursor, insert_query, batch, page_size=1000)
-                    conn.commit()
-                    total_loaded += len(batch)
-                    
-                self.logger.debug(f"Cargados {total_loaded} registros en {table_name}")
+
+                self._insert_rows(conn, cursor, table_name, df_to_load)
             
             # Si es dimensión, resetear secuencia DESPUÉS de la inserción
             print(f"POST-INSERT: {table_name}, dim={table_name.startswith('dim_')}, len={len(df)}")
@@ -201,27 +145,178 @@ class DatabaseLoader:
         finally:
             cursor.close()
 
+    def _map_columns(
+        self, cursor, table_name: str, df: pd.DataFrame
+    ) -> Optional[pd.DataFrame]:
+        """Renombra las columnas del DataFrame a las columnas de la tabla destino"""
+        # Obtener columnas de la tabla desde la base de datos
+        cursor.execute(f"""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = '{table_name}' 
+            AND table_schema = 'public'
+            AND column_name NOT IN ('created_at', 'updated_at')
+            ORDER BY ordinal_position
+        """)
+        
+        db_columns = [row[0] for row in cursor.fetchall()]
+        
+        # Mapear columnas del DF a columnas de la BD
+        column_mapping = {}
+        for db_col in db_columns:
+            if db_col in df.columns:
+                # Coincidencia exacta - SIEMPRE preferir esto
+                column_mapping[db_col] = db_col
+            elif db_col.endswith('_id'):
+                # Buscar columna extendida SOLO si no existe coincidencia exacta
+                # Ej: cuenta_id en BD busca cuenta_contable_id, centro_costo_id
+                base_name = db_col[:-3]  # Quitar '_id'
+                matching_cols = [c for c in df.columns 
+                                if c != db_col  # No auto-mapear
+                                and base_name in c 
+                                and c.endswith('_id')
+                                and len(c) > len(db_col)]  # Solo columnas MÁS largas (más específicas)
+                if matching_cols:
+                    # Preferir la columna más específica
+                    column_mapping[db_col] = max(matching_cols, key=len)
+        
+        print(f"MAPPING {table_name}: {list(column_mapping.items())[:5]}")
+        
+        if not column_mapping:
+            self.logger.warning(f"No hay columnas coincidentes para {table_name}")
+            return None
+        
+        # Crear DataFrame con columnas renombradas
+        df_to_load = df[[column_mapping[db_col] for db_col in column_mapping.keys()]].copy()
+        df_to_load.columns = list(column_mapping.keys())  # Renombrar a nombres de BD
+        return df_to_load
+
+    def _insert_rows(self, conn, cursor, table_name: str, df_to_load: pd.DataFrame):
+        """Inserta filas con COPY (loading.use_copy) o execute_values por batches"""
+        # COPY FROM STDIN si está habilitado en la configuración
+        if self.config.get("loading", {}).get("use_copy", False):
+            stats = self.copy_loader.load(conn, table_name, df_to_load)
+            conn.commit()
+            self.logger.info(
+                f"Cargados {stats.rows:,} registros en {table_name} "
+                f"({stats.rows_per_second:,.0f} filas/s, copy)"
+            )
+            return
+
+        # Convertir valores numpy a Python nativos
+        def convert_value(val):
+            if pd.isna(val):
+                return None
+            if hasattr(val, 'item'):  # numpy types tienen .item()
+                return val.item()
+            return val
+
+        values = [tuple(convert_value(v) for v in row) for row in df_to_load.values]
+
+        # Usar los nombres de columnas de BD (ya mapeados en df_to_load)
+        insert_query = f"""
+            INSERT INTO {table_name} ({', '.join(df_to_load.columns)})
+            VALUES %s
+        """
+
+        # Cargar en batches con commits intermedios para mejor rendimiento
+        batch_size = 10000
+        total_loaded = 0
+
+        for i in range(0, len(values), batch_size):
+            batch = values[i:i + batch_size]
+            execute_values(cursor, insert_query, batch, page_size=1000)
+            conn.commit()
+            total_loaded += len(batch)
+
+        self.logger.debug(f"Cargados {total_loaded} registros en {table_name}")
+
+    def _staging_swap_load(self, conn, table_name: str, df: pd.DataFrame):
+        """Carga en tabla staging y la intercambia con la viva (sin DELETE ni locks largos)"""
+        cursor = conn.cursor()
+        df_to_load = self._map_columns(cursor, table_name, df)
+        cursor.close()
+
+        if df_to_load is None:
+            return
+
+        # El swap maneja sus propias transacciones
+        conn.commit()
+        stats = self.swap_loader.load(conn, table_name, df_to_load)
+        self.logger.info(
+            f"✓ {table_name}: {stats.rows:,} filas por staging swap "
+            f"({stats.rows_per_second:,.0f} filas/s)"
+        )
+
+        self.swap_loader.validate_pending(conn)
+
     def _incremental_load(self, conn, table_name: str, df: pd.DataFrame):
-        """Carga incremental (solo nuevos registros)"""
-        # TODO: Implementar lógica incremental
-        self._truncate_and_load(conn, table_name, df)
+        """
+        Carga incremental: fusiona el delta por clave natural
+
+        Las filas del delta reemplazan a las existentes con la misma clave
+        (loading.incremental.natural_keys); si la tabla tiene columna de
+        alcance (scope_columns), se eliminan también las filas del grupo que
+        ya no vienen en origen. Las tablas sin clave natural configurada se
+        recargan completas.
+        """
+        incremental_config = self.config.get("loading", {}).get("incremental", {})
+        key_columns = incremental_config.get("natural_keys", {}).get(table_name)
+
+        if not key_columns:
+            self.logger.warning(
+                f"⚠️  {table_name} sin clave natural configurada, carga completa"
+            )
+            self._truncate_and_load(conn, table_name, df)
+            return
+
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+
+        cursor = conn.cursor()
+        df_to_load = self._map_columns(cursor, table_name, df)
+        cursor.close()
+
+        if df_to_load is None:
+            return
+
+        stats = self.copy_loader.merge(
+            conn,
+            table_name,
+            df_to_load,
+            key_columns=key_columns,
+            scope_column=incremental_config.get("scope_columns", {}).get(table_name),
+        )
+        self.logger.info(
+            f"✓ {table_name}: {stats.rows:,} filas fusionadas "
+            f"({stats.rows_per_second:,.0f} filas/s)"
+        )
 
     def _upsert_load(self, conn, table_name: str, df: pd.DataFrame):
-        """Upsert (actualiza o inserta)"""
-        # TODO: Implementar lógica upsert
-        self._truncate_and_load(conn, table_name, df)
+        """Upsert (actualiza o inserta) por PK, escribiendo solo filas cambiadas"""
+        cursor = conn.cursor()
+        df_to_load = self._map_columns(cursor, table_name, df)
+        cursor.close()
 
-    def _get_dw_connection(self):
-        """Obtiene conexión al data warehouse"""
-        conn = psycopg2.connect(
-            host=os.getenv("DW_DB_HOST"),
-            port=int(os.getenv("DW_DB_PORT")),
-            dbname=os.getenv("DW_DB_NAME"),
-            user=os.getenv("DW_DB_USER"),
-            password=os.getenv("DW_DB_PASS"),
-            connect_timeout=120,
-            options="-c statement_timeout=1800000"  # 30 minutos timeout
+        if df_to_load is None:
+            return
+
+        stats = self.copy_loader.upsert(
+            conn,
+            table_name,
+            df_to_load,
+            ignore_columns=self.config.get("loading", {})
+            .get("upsert", {})
+            .get("ignore_columns", ["created_at", "fecha_carga"]),
+        )
+        self.logger.info(
+            f"✓ {table_name}: {stats.rows:,} filas nuevas o actualizadas "
+            f"({stats.rows_per_second:,.0f} filas/s)"
         )
+
+    def _get_dw_connection(self):
+        """Obtiene conexión al data warehouse (perfil de carga)"""
+        conn = get_connection_manager(self.config).connect("dw", profile="load")
         # Asegurar autocommit para evitar transacciones idle
         conn.set_session(autocommit=False)
         return conn
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+DIMENSION DIGEST STORE - HUELLAS DE CONTENIDO DE LAS DIMENSIONES
+================================================================
+Guarda en el DW un digest por dimensión (sha256 de los hashes por fila
+del DataFrame cargado) para que la siguiente corrida detecte que una
+dimensión no cambió y omita su carga y el vaciado de las facts que la
+referencian.
+
+El digest depende del orden de las filas: en las dimensiones con SK
+serial el orden de inserción define las SKs. Los sellos de carga
+(loading.upsert.ignore_columns, p.ej. created_at = NOW()) no cuentan.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import logging
+
+
+@dataclass
+class DimensionDigest:
+    """Huella del contenido de una dimensión"""
+
+    table_name: str
+    digest: str
+    rows: int
+
+
+class DimensionDigestStore:
+    """Cálculo, lectura y escritura de digests en la tabla de estado del DW"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        loading = self.config.get("loading", {})
+        digest_config = loading.get("dimension_digest", {})
+        self.enabled = digest_config.get("enabled", False)
+        self.state_table = digest_config.get("table", "etl_dimension_digest")
+        self.ignore_columns: List[str] = loading.get("upsert", {}).get(
+            "ignore_columns", ["created_at", "fecha_carga"]
+        )
+
+    def compute(self, table_name: str, df: pd.DataFrame) -> DimensionDigest:
+        """Digest de la tabla: columnas, tipos y hash de cada fila en orden"""
+        columnas = [c for c in df.columns if c not in self.ignore_columns]
+        filas = row_hashes(df[columnas])
+
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps([[c, str(df[c].dtype)] for c in columnas]).encode("utf-8")
+        )
+        digest.update(filas.tobytes())
+        return DimensionDigest(
+            table_name=table_name, digest=digest.hexdigest(), rows=len(df)
+        )
+
+    def ensure_table(self, conn):
+        """Crea la tabla de estado si no existe"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.state_table} (
+                table_name VARCHAR(100) PRIMARY KEY,
+                digest CHAR(64) NOT NULL,
+                rows_loaded BIGINT NOT NULL,
+                updated_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+        cursor.close()
+        if not conn.autocommit:
+            conn.commit()
+
+    def get(self, conn, table_name: str) -> Optional[DimensionDigest]:
+        """Digest de la última carga exitosa o None"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT digest, rows_loaded FROM {self.state_table} WHERE table_name = %s",
+            (table_name,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+
+        if row is None:
+            return None
+        return DimensionDigest(table_name=table_name, digest=row[0], rows=row[1])
+
+    def unchanged(self, conn, digest: DimensionDigest) -> bool:
+        """
+        True si la dimensión ya está cargada con el mismo contenido
+
+        Además del digest se compara COUNT(*) de la tabla, para recargar
+        si alguien la vació por fuera del ETL.
+        """
+        previo = self.get(conn, digest.table_name)
+        if previo is None or previo.digest != digest.digest:
+            return False
+
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {digest.table_name}")
+        filas = cursor.fetchone()[0]
+        cursor.close()
+        return filas == previo.rows
+
+    def set(self, conn, digest: DimensionDigest):
+        """Guarda el digest (se llama solo después de una carga exitosa)"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            INSERT INTO {self.state_table} (table_name, digest, rows_loaded, updated_at)
+            VALUES (%s, %s, %s, NOW())
+            ON CONFLICT (table_name) DO UPDATE SET
+                digest = EXCLUDED.digest,
+                rows_loaded = EXCLUDED.rows_loaded,
+                updated_at = NOW()
+            """,
+            (digest.table_name, digest.digest, digest.rows),
+        )
+        cursor.close()
+        if not conn.autocommit:
+            conn.commit()
+
+    def reset(self, conn, table_name: Optional[str] = None):
+        """Elimina digests para forzar la recarga (todas si table_name es None)"""
+        cursor = conn.cursor()
+        if table_name is None:
+            cursor.execute(f"DELETE FROM {self.state_table}")
+        else:
+            cursor.execute(
+                f"DELETE FROM {self.state_table} WHERE table_name = %s", (table_name,)
+            )
+        cursor.close()
+        if not conn.autocommit:
+            conn.commit()
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash uint64 estable de cada fila (mismo valor entre procesos)"""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+PARQUET DATASET WRITER - FACTS PARTICIONADAS EN FORMATO HIVE
+============================================================
+Escribe cada tabla de hechos como un dataset de Arrow particionado por
+período (fact_ventas/anio=2024/mes=03/part-0-0.parquet), con row groups
+de tamaño fijo, codificación de diccionario y estadísticas por columna.
+Los lectores (pyarrow.dataset, DuckDB, Spark) descartan particiones y
+row groups por período sin leer el resto.
+
+Se configura en la sección optimization de etl_config.yaml:
+parquet_compression, enable_partitioning, partition_by y
+parquet_row_group_size.
+"""
+
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import logging
+
+# Columnas de particionado derivadas del período
+COLUMNAS_PERIODO = ["anio", "mes"]
+
+
+@dataclass
+class DatasetStats:
+    """Resultado de escribir un dataset"""
+
+    table_name: str
+    rows: int = 0
+    files: int = 0
+    partitions: int = 0
+
+
+class ParquetDatasetWriter:
+    """Escritura de facts como datasets parquet (particionados o no)"""
+
+    def __init__(self, config: Dict[str, Any] = None, copy_loader=None):
+        """
+        Args:
+            config: Configuración del ETL
+            copy_loader: CopyLoader cuya conversión a Arrow se reutiliza
+                (respeta las columnas compactadas en centavos)
+        """
+        self.config = config or {}
+        self.copy_loader = copy_loader
+        self.logger = logging.getLogger(__name__)
+
+        optimization = self.config.get("optimization", {})
+        self.compression = optimization.get("parquet_compression", "snappy")
+        self.partitioning = optimization.get("enable_partitioning", False)
+        self.partition_by = optimization.get("partition_by", "fecha")
+        self.row_group_size = optimization.get("parquet_row_group_size", 131072)
+
+        self.output_dir = Path(
+            self.config.get("paths", {}).get(
+                "output_parquet", "../data/outputs/parquet"
+            )
+        )
+
+    def write(self, table_name: str, df: pd.DataFrame) -> DatasetStats:
+        """Reemplaza el dataset de la tabla con el DataFrame completo"""
+        return self.write_chunks(table_name, [df])
+
+    def write_chunks(
+        self, table_name: str, chunks: Iterable[pd.DataFrame]
+    ) -> DatasetStats:
+        """
+        Reemplaza el dataset de la tabla escribiendo chunk por chunk
+
+        Cada chunk agrega sus propios archivos (part-<chunk>-<n>.parquet) a
+        las particiones que toca; nunca se arma la tabla completa en memoria.
+        """
+        destino = self._preparar(table_name)
+        stats = DatasetStats(table_name=table_name)
+        particiones: set = set()
+        for numero, chunk in enumerate(chunks):
+            self._escribir_chunk(destino, numero, chunk, stats, particiones)
+        return self._terminar(stats, particiones)
+
+    def iter_write(
+        self, table_name: str, chunks: Iterable[pd.DataFrame]
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Escribe los chunks al dataset y los devuelve sin cambios
+
+        Permite escribir parquet mientras los mismos chunks se cargan al DW.
+        """
+        destino = self._preparar(table_name)
+        stats = DatasetStats(table_name=table_name)
+        particiones: set = set()
+        for numero, chunk in enumerate(chunks):
+            self._escribir_chunk(destino, numero, chunk, stats, particiones)
+            yield chunk
+        self._terminar(stats, particiones)
+
+    def _preparar(self, table_name: str) -> Path:
+        """
+        Vacía el directorio del dataset (se reemplaza completo)
+
+        También elimina <tabla>.parquet de corridas anteriores sin dataset,
+        para que los lectores no encuentren dos versiones de la tabla.
+        """
+        destino = self.output_dir / table_name
+        if destino.exists():
+            shutil.rmtree(destino)
+        (self.output_dir / f"{table_name}.parquet").unlink(missing_ok=True)
+        destino.mkdir(parents=True, exist_ok=True)
+        return destino
+
+    def _escribir_chunk(
+        self,
+        destino: Path,
+        numero: int,
+        chunk: Optional[pd.DataFrame],
+        stats: DatasetStats,
+        particiones: set,
+    ):
+        if chunk is None or len(chunk) == 0:
+            return
+        tabla = self._to_arrow(chunk)
+        columnas = self._columnas_particion(tabla)
+        if columnas == COLUMNAS_PERIODO:
+            tabla = self._agregar_periodo(tabla)
+        if columnas:
+            unicas = tabla.select(columnas).group_by(columnas).aggregate([])
+            particiones.update(zip(*(unicas.column(col).to_pylist() for col in columnas)))
+
+        archivos: List[str] = []
+        ds.write_dataset(
+            tabla,
+            destino,
+            format="parquet",
+            partitioning=(
+                ds.partitioning(
+                    pa.schema([tabla.schema.field(col) for col in columnas]),
+                    flavor="hive",
+                )
+                if columnas
+                else None
+            ),
+            basename_template=f"part-{numero}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=self.compression,
+                use_dictionary=True,
+                write_statistics=True,
+            ),
+            min_rows_per_group=min(self.row_group_size, tabla.num_rows),
+            max_rows_per_group=self.row_group_size,
+            file_visitor=lambda archivo: archivos.append(archivo.path),
+        )
+        stats.rows += tabla.num_rows
+        stats.files += len(archivos)
+
+    def _terminar(self, stats: DatasetStats, particiones: set) -> DatasetStats:
+        stats.partitions = len(particiones)
+        self.logger.info(
+            f"         📦 {stats.table_name}: {stats.rows:,} filas en {stats.files} "
+            f"archivos parquet ({stats.partitions} particiones)"
+        )
+        return stats
+
+    def _to_arrow(self, df: pd.DataFrame) -> pa.Table:
+        if self.copy_loader is not None:
+            return self.copy_loader.dataframe_to_arrow(df)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    def _columnas_particion(self, tabla: pa.Table) -> List[str]:
+        """Columnas de la partición (vacío si no se particiona la tabla)"""
+        if not self.partitioning:
+            return []
+        if self.partition_by == "fecha":
+            if "fecha_id" in tabla.column_names or "periodo_id" in tabla.column_names:
+                return COLUMNAS_PERIODO
+            return []
+        if self.partition_by in tabla.column_names:
+            return [self.partition_by]
+        return []
+
+    def _agregar_periodo(self, tabla: pa.Table) -> pa.Table:
+        """
+        Agrega anio y mes (texto de dos dígitos) desde fecha_id o periodo_id
+
+        Las filas sin fecha quedan en la partición nula de Hive
+        (anio=__HIVE_DEFAULT_PARTITION__).
+        """
+        if "fecha_id" in tabla.column_names:
+            periodo = _enteros(tabla.column("fecha_id")) // 100
+        else:
+            periodo = _enteros(tabla.column("periodo_id"))
+
+        sin_fecha = periodo <= 0
+        anio = (periodo // 100).astype(str)
+        mes = np.char.zfill((periodo % 100).astype(str), 2)
+        return tabla.append_column(
+            "anio", pa.array(anio, mask=sin_fecha)
+        ).append_column("mes", pa.array(mes, mask=sin_fecha))
+
+
+def _enteros(columna: pa.ChunkedArray) -> np.ndarray:
+    """Columna entera de Arrow -> int64 con 0 en los nulos"""
+    return columna.fill_null(0).cast(pa.int64()).to_numpy()
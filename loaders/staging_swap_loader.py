@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+STAGING SWAP LOADER - CARGA POR TABLA STAGING E INTERCAMBIO
+===========================================================
+Carga cada tabla en una copia UNLOGGED (*_staging), la convierte a
+LOGGED, construye ahí sus índices y constraints, y la intercambia con la
+tabla viva mediante RENAME en una transacción corta. Los lectores nunca
+ven la tabla vacía y no hace falta terminar otras sesiones para obtener
+locks.
+
+Con loading.staging_set_logged: false solo se convierten las tablas con
+FKs entrantes: las demás quedan UNLOGGED en vivo (se vacían tras una
+caída del servidor y no se replican).
+"""
+
+import time
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+import logging
+
+from loaders.copy_loader import CopyLoader, LoadStats
+
+
+class StagingSwapLoader:
+    """Loader que reemplaza tablas completas vía staging + RENAME"""
+
+    def __init__(self, config: Dict[str, Any] = None, copy_loader: CopyLoader = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+        self.copy_loader = copy_loader or CopyLoader(self.config)
+
+        loading = self.config.get("loading", {})
+        self.lock_timeout = loading.get("swap_lock_timeout", "30s")
+        self.set_logged = loading.get("staging_set_logged", True)
+        self.analyze = loading.get("analyze_after_load", True)
+
+        # FKs de otras tablas recreadas como NOT VALID, pendientes de validar
+        self.pending_validations: List[Tuple[str, str]] = []
+
+    def load(
+        self,
+        conn,
+        table_name: str,
+        df: pd.DataFrame,
+        drop_duplicate_keys: bool = False,
+    ) -> LoadStats:
+        """
+        Reemplaza el contenido de table_name por df
+
+        Args:
+            conn: Conexión psycopg2 al DW (sin transacción abierta)
+            table_name: Tabla viva a reemplazar
+            df: DataFrame con columnas de la tabla
+            drop_duplicate_keys: Conservar solo la primera fila por PK
+                (equivalente a INSERT ... ON CONFLICT DO NOTHING)
+
+        Returns:
+            LoadStats de la carga completa (staging + swap)
+        """
+        start = time.perf_counter()
+        staging = f"{table_name}_staging"
+        previous_autocommit = conn.autocommit
+        conn.autocommit = False
+        cursor = conn.cursor()
+
+        try:
+            metadata = self._read_table_metadata(cursor, table_name)
+
+            # 1. Crear staging UNLOGGED sin índices (carga sin WAL)
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            cursor.execute(
+                f"""
+                CREATE UNLOGGED TABLE {staging} (
+                    LIKE {table_name}
+                    INCLUDING DEFAULTS INCLUDING IDENTITY
+                    INCLUDING GENERATED INCLUDING STORAGE
+                )
+                """
+            )
+            conn.commit()
+
+            # 2. COPY del DataFrame a staging
+            self.copy_loader.copy_dataframe(conn, staging, df)
+            if drop_duplicate_keys and metadata["primary_key"]:
+                self._drop_duplicate_keys(cursor, staging, metadata["primary_key"])
+            conn.commit()
+
+            # La tabla viva debe sobrevivir a una caída y replicarse; además
+            # las FKs desde tablas permanentes exigen que sea LOGGED
+            if self.set_logged or metadata["incoming_fks"]:
+                cursor.execute(f"ALTER TABLE {staging} SET LOGGED")
+                conn.commit()
+
+            # 3. Índices y constraints sobre staging (fuera del lock de la viva)
+            self._build_indexes_and_constraints(cursor, table_name, staging, metadata)
+            conn.commit()
+
+            # 4. Intercambio en una transacción corta
+            self._swap(cursor, table_name, staging, metadata)
+            conn.commit()
+
+            if self.analyze:
+                cursor.execute(f"ANALYZE {table_name}")
+                conn.commit()
+
+        except Exception:
+            conn.rollback()
+            try:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.autocommit = previous_autocommit
+
+        return LoadStats(
+            table_name=table_name,
+            rows=len(df),
+            elapsed_seconds=time.perf_counter() - start,
+            method="swap",
+        )
+
+    def validate_pending(self, conn) -> List[Dict[str, Any]]:
+        """
+        Valida las FKs entrantes recreadas como NOT VALID
+
+        VALIDATE CONSTRAINT solo toma SHARE UPDATE EXCLUSIVE, así que no
+        bloquea a los lectores. Debe llamarse cuando las tablas que
+        referencian ya fueron recargadas.
+        """
+        results = []
+        previous_autocommit = conn.autocommit
+        conn.autocommit = True
+        cursor = conn.cursor()
+
+        for child_table, constraint in self.pending_validations:
+            try:
+                cursor.execute(
+                    f"ALTER TABLE {child_table} VALIDATE CONSTRAINT {constraint}"
+                )
+                results.append(
+                    {"table": child_table, "constraint": constraint, "valid": True}
+                )
+            except Exception as e:
+                self.logger.warning(
+                    f"⚠️  No se pudo validar {child_table}.{constraint}: {e}"
+                )
+                results.append(
+                    {
+                        "table": child_table,
+                        "constraint": constraint,
+                        "valid": False,
+                        "error": str(e),
+                    }
+                )
+
+        cursor.close()
+        conn.autocommit = previous_autocommit
+        self.pending_validations = []
+        return results
+
+    def _read_table_metadata(self, cursor, table_name: str) -> Dict[str, Any]:
+        """Lee constraints, índices, FKs entrantes, secuencias y grants"""
+        cursor.execute(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass
+              AND contype IN ('p', 'u', 'c', 'x', 'f')
+            ORDER BY contype = 'f', conname
+            """,
+            (table_name,),
+        )
+        constraints = cursor.fetchall()
+
+        # Índices que no respaldan una constraint
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid
+              )
+            """,
+            (table_name,),
+        )
+        indexes = cursor.fetchall()
+
+        # FKs de otras tablas que apuntan a esta
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE confrelid = %s::regclass
+              AND contype = 'f'
+              AND conrelid <> confrelid
+            """,
+            (table_name,),
+        )
+        incoming_fks = cursor.fetchall()
+
+        # Secuencias por columna: serial (compartida vía DEFAULT) o identity
+        cursor.execute(
+            """
+            SELECT a.attname,
+                   a.attidentity <> '' AS is_identity,
+                   pg_get_serial_sequence(%s, a.attname)
+            FROM pg_attribute a
+            WHERE a.attrelid = %s::regclass
+              AND a.attnum > 0
+              AND NOT a.attisdropped
+              AND pg_get_serial_sequence(%s, a.attname) IS NOT NULL
+            """,
+            (table_name, table_name, table_name),
+        )
+        sequences = cursor.fetchall()
+
+        cursor.execute(
+            """
+            SELECT grantee, privilege_type
+            FROM information_schema.role_table_grants
+            WHERE table_schema = current_schema()
+              AND table_name = %s
+            """,
+            (table_name,),
+        )
+        grants = cursor.fetchall()
+
+        cursor.execute(
+            """
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a
+              ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            """,
+            (table_name,),
+        )
+        primary_key = [row[0] for row in cursor.fetchall()]
+
+        return {
+            "primary_key": primary_key,
+            "constraints": constraints,
+            "indexes": indexes,
+            "incoming_fks": incoming_fks,
+            "sequences": sequences,
+            "grants": grants,
+        }
+
+    def _drop_duplicate_keys(self, cursor, staging: str, primary_key: List[str]):
+        """Elimina filas con PK repetida conservando la primera copiada"""
+        join = " AND ".join(f"a.{col} = b.{col}" for col in primary_key)
+        cursor.execute(
+            f"DELETE FROM {staging} a USING {staging} b "
+            f"WHERE a.ctid > b.ctid AND {join}"
+        )
+        if cursor.rowcount:
+            self.logger.warning(
+                f"⚠️  {staging}: {cursor.rowcount} filas con PK duplicada descartadas"
+            )
+
+    def _build_indexes_and_constraints(
+        self, cursor, table_name: str, staging: str, metadata: Dict[str, Any]
+    ):
+        """Replica constraints e índices de la tabla viva sobre staging"""
+        for conname, contype, definition in metadata["constraints"]:
+            if contype == "f":
+                # FKs salientes: validar ya, con la tabla aún fuera de uso
+                cursor.execute(
+                    f"ALTER TABLE {staging} ADD CONSTRAINT {conname}_stg "
+                    f"{definition} NOT VALID"
+                )
+                cursor.execute(
+                    f"ALTER TABLE {staging} VALIDATE CONSTRAINT {conname}_stg"
+                )
+            else:
+                cursor.execute(
+                    f"ALTER TABLE {staging} ADD CONSTRAINT {conname}_stg {definition}"
+                )
+
+        for index_name, definition in metadata["indexes"]:
+            definition = definition.replace(
+                f"INDEX {index_name} ON ", f"INDEX {index_name}_stg ON ", 1
+            )
+            definition = definition.replace(
+                f".{table_name} USING ", f".{staging} USING ", 1
+            ).replace(f" ON {table_name} USING ", f" ON {staging} USING ", 1)
+            cursor.execute(definition)
+
+    def _swap(self, cursor, table_name: str, staging: str, metadata: Dict[str, Any]):
+        """RENAME de staging a tabla viva y restauración de nombres y FKs"""
+        old_table = f"{table_name}_old"
+
+        cursor.execute(f"SET LOCAL lock_timeout = '{self.lock_timeout}'")
+        cursor.execute(f"DROP TABLE IF EXISTS {old_table}")
+
+        # Las FKs entrantes referencian la tabla por OID: se recrean
+        for child_table, conname, _ in metadata["incoming_fks"]:
+            cursor.execute(f"ALTER TABLE {child_table} DROP CONSTRAINT {conname}")
+
+        cursor.execute(f"ALTER TABLE {table_name} RENAME TO {old_table}")
+        cursor.execute(f"ALTER TABLE {staging} RENAME TO {table_name}")
+
+        for column, is_identity, sequence in metadata["sequences"]:
+            if is_identity:
+                continue
+            # Secuencia serial compartida: pasarla a la tabla nueva antes del DROP
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table_name}.{column}")
+
+        cursor.execute(f"DROP TABLE {old_table}")
+
+        # Restaurar nombres originales de constraints e índices
+        for conname, _, _ in metadata["constraints"]:
+            cursor.execute(
+                f"ALTER TABLE {table_name} RENAME CONSTRAINT {conname}_stg TO {conname}"
+            )
+        for index_name, _ in metadata["indexes"]:
+            cursor.execute(f"ALTER INDEX {index_name}_stg RENAME TO {index_name}")
+
+        # Secuencias identity: la de staging toma el nombre original
+        for column, is_identity, sequence in metadata["sequences"]:
+            if not is_identity:
+                continue
+            cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", (table_name, column))
+            new_sequence = cursor.fetchone()[0]
+            cursor.execute(
+                f"ALTER SEQUENCE {new_sequence} RENAME TO {sequence.split('.')[-1]}"
+            )
+
+        # COPY con valores explícitos no avanza las secuencias
+        for column, _, sequence in metadata["sequences"]:
+            cursor.execute(
+                f"SELECT setval('{sequence}', "
+                f"GREATEST((SELECT MAX({column}) FROM {table_name}), 1))"
+            )
+
+        for grantee, privilege in metadata["grants"]:
+            target = grantee if grantee == "PUBLIC" else f'"{grantee}"'
+            cursor.execute(f"GRANT {privilege} ON {table_name} TO {target}")
+
+        for child_table, conname, definition in metadata["incoming_fks"]:
+            cursor.execute(
+                f"ALTER TABLE {child_table} ADD CONSTRAINT {conname} "
+                f"{definition} NOT VALID"
+            )
+            self.pending_validations.append((child_table, conname))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+WATERMARK STORE - ESTADO DE CARGAS INCREMENTALES
+================================================
+Guarda en el DW la última marca procesada por tabla (updated_at e id
+de origen) para que la carga incremental extraiga solo el delta.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import logging
+
+
+@dataclass
+class Watermark:
+    """Marca de agua de una tabla destino"""
+
+    table_name: str
+    last_updated_at: Optional[datetime] = None
+    last_id: Optional[int] = None
+    rows_processed: int = 0
+
+
+class WatermarkStore:
+    """Lectura y escritura de marcas de agua en la tabla de estado del DW"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+        self.state_table = (
+            self.config.get("loading", {})
+            .get("incremental", {})
+            .get("watermark_table", "etl_watermark")
+        )
+
+    def ensure_table(self, conn):
+        """Crea la tabla de estado si no existe"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.state_table} (
+                table_name VARCHAR(100) PRIMARY KEY,
+                last_updated_at TIMESTAMP,
+                last_id BIGINT,
+                rows_processed BIGINT DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+        cursor.close()
+        if not conn.autocommit:
+            conn.commit()
+
+    def get(self, conn, table_name: str) -> Optional[Watermark]:
+        """Retorna la marca guardada o None si la tabla nunca se cargó"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT last_updated_at, last_id, rows_processed
+            FROM {self.state_table}
+            WHERE table_name = %s
+            """,
+            (table_name,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+
+        if row is None:
+            return None
+
+        return Watermark(
+            table_name=table_name,
+            last_updated_at=row[0],
+            last_id=row[1],
+            rows_processed=row[2] or 0,
+        )
+
+    def set(self, conn, watermark: Watermark):
+        """Guarda la marca (se llama solo después de un merge exitoso)"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            INSERT INTO {self.state_table}
+                (table_name, last_updated_at, last_id, rows_processed, updated_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            ON CONFLICT (table_name) DO UPDATE SET
+                last_updated_at = EXCLUDED.last_updated_at,
+                last_id = EXCLUDED.last_id,
+                rows_processed = EXCLUDED.rows_processed,
+                updated_at = NOW()
+            """,
+            (
+                watermark.table_name,
+                watermark.last_updated_at,
+                watermark.last_id,
+                watermark.rows_processed,
+            ),
+        )
+        cursor.close()
+        if not conn.autocommit:
+            conn.commit()
+
+        self.logger.info(
+            f"🔖 Watermark {watermark.table_name}: "
+            f"updated_at={watermark.last_updated_at}, id={watermark.last_id}"
+        )
+
+    def reset(self, conn, table_name: str):
+        """Elimina la marca para forzar una carga completa en la próxima corrida"""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"DELETE FROM {self.state_table} WHERE table_name = %s", (table_name,)
+        )
+        cursor.close()
+        if not conn.autocommit:
+            conn.commit()
@@ -0,0 +1,73 @@
+"""
+Fixtures compartidas de las pruebas
+===================================
+Las pruebas corren sin OroCommerce ni DW: las dimensiones que usan los
+fact builders se registran en memoria en la caché de surrogate keys.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Mismo arreglo de imports que main.py: paquetes desde la raíz del proyecto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transformers.complete_fact_builder import CompleteFactBuilder  # noqa: E402
+from transformers.surrogate_key_cache import SurrogateKeyCache  # noqa: E402
+
+# Plan de cuentas mínimo de las reglas de venta: código -> cuenta_id
+CUENTAS = {"1102": 11, "1103": 12, "2102": 21, "4101": 41, "5101": 51}
+
+
+@pytest.fixture
+def sk_cache():
+    """Caché de SKs con las dimensiones de las facts de ventas en memoria"""
+    cache = SurrogateKeyCache()
+    cache.register(
+        "dim_cuenta_contable",
+        pd.DataFrame({"codigo": list(CUENTAS), "cuenta_id": list(CUENTAS.values())}),
+    )
+    cache.register(
+        "dim_tipo_transaccion",
+        pd.DataFrame({"codigo": ["COMPRA", "VENTA"], "tipo_transaccion_id": [1, 2]}),
+    )
+    cache.register(
+        "dim_centro_costo", pd.DataFrame({"codigo": ["CC01"], "centro_costo_id": [7]})
+    )
+    cache.register("dim_usuario", pd.DataFrame({"usuario_id": [3, 5]}))
+    cache.register(
+        "dim_fecha",
+        pd.DataFrame(
+            {
+                "fecha": pd.to_datetime(["2024-03-01", "2024-03-02"]),
+                "fecha_id": [20240301, 20240302],
+            }
+        ),
+    )
+    cache.register(
+        "dim_almacen", pd.DataFrame({"codigo": ["ALM01"], "almacen_id": [4]})
+    )
+    cache.register(
+        "dim_promocion", pd.DataFrame({"id_promocion_source": [1], "sk_promocion": [1]})
+    )
+    # costo_estandar es un atributo: register() lo deja para leerse del DW
+    cache._guardar(
+        "dim_producto",
+        pd.DataFrame(
+            {
+                "producto_externo_id": [10, 20],
+                "producto_id": [10, 20],
+                "costo_estandar": [30.0, 0.0],
+            }
+        ),
+        "memoria",
+    )
+    return cache
+
+
+@pytest.fixture
+def fact_builder(sk_cache):
+    """CompleteFactBuilder sin conexiones (se abren solo al primer uso)"""
+    return CompleteFactBuilder(config={}, sk_cache=sk_cache)
@@ -0,0 +1,60 @@
+"""Calendario y feriados de dim_fecha (transformers/calendario.py)"""
+
+import pandas as pd
+
+from transformers.calendario import domingo_de_pascua, generar_calendario
+
+
+def test_domingo_de_pascua():
+    anios = [2000, 2019, 2024, 2025, 1818, 2038]
+    esperado = [
+        "2000-04-23",
+        "2019-04-21",
+        "2024-03-31",
+        "2025-04-20",
+        "1818-03-22",  # la más temprana posible
+        "2038-04-25",  # la más tardía posible
+    ]
+    assert domingo_de_pascua(anios).astype(str).tolist() == esperado
+
+
+def test_feriados_de_semana_santa_y_fijos():
+    calendario = generar_calendario("2024-03-27", "2025-04-21").set_index("fecha")
+
+    def festivo(fecha):
+        fila = calendario.loc[pd.Timestamp(fecha)]
+        return bool(fila["es_festivo"]), fila["nombre_festivo"]
+
+    assert festivo("2024-03-27") == (False, "")
+    assert festivo("2024-03-28") == (True, "Jueves Santo")
+    assert festivo("2024-03-29") == (True, "Viernes Santo")
+    assert festivo("2024-03-30") == (True, "Sábado Santo")
+    # El Domingo de Pascua no es feriado
+    assert festivo("2024-03-31") == (False, "")
+    assert festivo("2024-09-15") == (True, "Día de la Independencia")
+    assert festivo("2024-12-25") == (True, "Navidad")
+    assert festivo("2025-01-01") == (True, "Año Nuevo")
+    # Semana Santa del segundo año del rango
+    assert festivo("2025-04-18") == (True, "Viernes Santo")
+    assert festivo("2025-04-21") == (False, "")
+
+    assert calendario["es_festivo"].sum() == 3 + 8 + 3
+    assert (calendario["es_festivo"] == (calendario["nombre_festivo"] != "")).all()
+
+
+def test_atributos_de_fecha():
+    calendario = generar_calendario("2024-12-29", "2025-01-01")
+
+    assert calendario["fecha_id"].tolist() == [20241229, 20241230, 20241231, 20250101]
+    assert calendario["dia_semana"].tolist() == [7, 1, 2, 3]
+    assert calendario["dia_semana_nombre"].tolist() == [
+        "Domingo",
+        "Lunes",
+        "Martes",
+        "Miércoles",
+    ]
+    assert calendario["es_fin_semana"].tolist() == [True, False, False, False]
+    # Semana ISO: el 30/12/2024 ya es la semana 1 de 2025
+    assert calendario["semana_anio"].tolist() == [52, 1, 1, 1]
+    assert calendario["trimestre"].tolist() == [4, 4, 4, 1]
+    assert calendario["mes_nombre"].tolist() == ["Diciembre"] * 3 + ["Enero"]
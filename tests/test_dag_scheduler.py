@@ -0,0 +1,90 @@
+"""Ejecución por grafo de dependencias de core/dag_scheduler.py"""
+
+import threading
+
+import pytest
+
+from core.dag_scheduler import DAGScheduler
+
+
+def _falla():
+    raise RuntimeError("origen caído")
+
+
+def test_dependientes_de_una_falla_se_omiten():
+    ejecutadas = []
+    scheduler = DAGScheduler(max_workers=2)
+    scheduler.add_task("dim_producto", _falla)
+    scheduler.add_task("dim_cliente", lambda: ejecutadas.append("dim_cliente"))
+    scheduler.add_task(
+        "fact_ventas",
+        lambda: ejecutadas.append("fact_ventas"),
+        upstream=["dim_producto", "dim_cliente"],
+    )
+    scheduler.add_task(
+        "fact_balance",
+        lambda: ejecutadas.append("fact_balance"),
+        upstream=["fact_ventas"],
+    )
+
+    resultados = scheduler.run()
+
+    assert {n: r.status for n, r in resultados.items()} == {
+        "dim_producto": "failed",
+        "dim_cliente": "success",
+        "fact_ventas": "skipped",
+        "fact_balance": "skipped",
+    }
+    assert resultados["dim_producto"].error == "origen caído"
+    assert "dim_producto" in resultados["fact_ventas"].error
+    assert ejecutadas == ["dim_cliente"]
+
+
+def test_dependencia_inexistente():
+    scheduler = DAGScheduler()
+    scheduler.add_task("fact_ventas", lambda: None, upstream=["dim_fecha"])
+
+    with pytest.raises(ValueError, match="inexistentes.*dim_fecha"):
+        scheduler.run()
+
+
+def test_ciclo():
+    scheduler = DAGScheduler()
+    scheduler.add_task("a", lambda: None, upstream=["c"])
+    scheduler.add_task("b", lambda: None, upstream=["a"])
+    scheduler.add_task("c", lambda: None, upstream=["b"])
+
+    with pytest.raises(ValueError, match="Ciclo en el grafo: a -> c -> b -> a"):
+        scheduler.run()
+
+
+def test_tarea_duplicada():
+    scheduler = DAGScheduler()
+    scheduler.add_task("a", lambda: None)
+
+    with pytest.raises(ValueError, match="duplicada"):
+        scheduler.add_task("a", lambda: None)
+
+
+def test_independientes_se_solapan():
+    # Ninguna de las dos termina hasta que la otra también esté corriendo
+    juntas = threading.Barrier(2, timeout=5)
+    scheduler = DAGScheduler(max_workers=2)
+    scheduler.add_task("dim_cliente", juntas.wait)
+    scheduler.add_task("dim_producto", juntas.wait)
+    scheduler.add_task(
+        "fact_ventas", lambda: "ok", upstream=["dim_cliente", "dim_producto"]
+    )
+
+    resultados = scheduler.run()
+
+    assert {r.status for r in resultados.values()} == {"success"}
+    cliente, producto = resultados["dim_cliente"], resultados["dim_producto"]
+    assert cliente.started_at < producto.finished_at
+    assert producto.started_at < cliente.finished_at
+    assert resultados["fact_ventas"].started_at >= max(
+        cliente.finished_at, producto.finished_at
+    )
+
+    ruta, _ = scheduler.critical_path()
+    assert ruta[-1] == "fact_ventas" and len(ruta) == 2
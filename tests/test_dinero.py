@@ -0,0 +1,99 @@
+"""Aritmética en centavos de transformers/dinero.py"""
+
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transformers.dinero import (
+    a_centavos,
+    a_montos,
+    aplicar_porcentaje,
+    multiplicar,
+    separar_iva,
+)
+
+
+def test_a_centavos_redondea_como_numeric():
+    valores = [1.005, -1.005, 0.125, "2.345", Decimal("10.10"), 0]
+    assert a_centavos(valores).tolist() == [101, -101, 13, 235, 1010, 0]
+    assert a_centavos(valores).dtype == np.int64
+
+
+@pytest.mark.parametrize(
+    "valores",
+    [[1.0, None], [np.nan], pd.Series([1.5, pd.NA], dtype="Float64"), ["abc"]],
+)
+def test_a_centavos_rechaza_nulos(valores):
+    with pytest.raises(ValueError, match="nulos o no numéricos"):
+        a_centavos(valores)
+
+
+def test_separar_iva_cuadra_exacto():
+    con_iva = a_centavos([113.00, 0.01, 99.99, -56.50])
+    base, iva = separar_iva(con_iva)
+    assert base.tolist() == [10000, 1, 8849, -5000]
+    assert (base + iva == con_iva).all()
+
+
+def test_porcentaje_y_multiplicar():
+    assert aplicar_porcentaje([1001, 250], 40).tolist() == [400, 100]
+    assert multiplicar(a_centavos([3.33]), [1.5]).tolist() == [500]
+    assert a_montos([12345]).tolist() == [123.45]
+
+
+def test_transacciones_linea_sin_precio_suma_cero(fact_builder):
+    lineas = pd.DataFrame(
+        {
+            "orden_id": [1, 1, 2],
+            "fecha": pd.to_datetime(["2024-03-01"] * 3),
+            "usuario_id": [3, 3, 5],
+            "line_item_id": [10, 11, 12],
+            # oli.value NULL -> subtotal_bruto NULL
+            "subtotal_bruto": [113.00, None, None],
+            "descuento_total": [0.0, 0.0, 0.0],
+        }
+    )
+
+    df, siguiente = fact_builder._transformar_transacciones(lineas)
+
+    cobros = df[df["tipo_movimiento"].eq("DEBITO") & df["cuenta_id"].eq(11)]
+    assert cobros.set_index("orden_id")["monto"].to_dict() == {1: 113.0, 2: 0.0}
+    assert siguiente == 3
+
+
+def test_ventas_linea_sin_precio_queda_null(fact_builder):
+    lineas = pd.DataFrame(
+        {
+            "fecha": ["2024-03-01", "2024-03-02"],
+            "orden_id": [1, 2],
+            "cliente_id": [7, 8],
+            "usuario_id": [3, None],
+            "producto_id": [10, 20],
+            "line_item_id_externo": [100, 101],
+            "cantidad": [2.0, 1.0],
+            "precio_unitario": [56.50, None],
+            "subtotal_bruto": [113.00, None],
+            "envio": [0.0, 0.0],
+            "descuento_total": [0.0, 0.0],
+            "promocion_id_externo": [None, None],
+        }
+    )
+
+    df = fact_builder._transformar_ventas(lineas, detalle=False).set_index(
+        "line_item_id_externo"
+    )
+
+    con_precio = df.loc[100]
+    assert (con_precio["subtotal"], con_precio["impuesto"], con_precio["total"]) == (
+        100.0,
+        13.0,
+        113.0,
+    )
+    assert (con_precio["costo_total"], con_precio["margen"]) == (60.0, 40.0)
+    assert con_precio["impuesto_id"] == 1
+
+    sin_precio = df.loc[101]
+    assert sin_precio[["subtotal", "impuesto", "total", "margen"]].isna().all()
+    assert sin_precio["impuesto_id"] == 3
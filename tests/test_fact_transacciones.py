@@ -0,0 +1,94 @@
+"""Asientos de fact_transacciones generados por CompleteFactBuilder"""
+
+import pandas as pd
+import pytest
+
+from transformers.posting_rules import verificar_partida_doble
+
+# Piernas del loop original: (asiento, cuenta_id, lado, monto, usuario_id)
+ESPERADO = [
+    ("AST-000001", 11, "DEBITO", 169.50, 3),
+    ("AST-000001", 41, "CREDITO", 150.00, 3),
+    ("AST-000001", 21, "CREDITO", 19.50, 3),
+    ("AST-000001", 51, "DEBITO", 60.00, 3),
+    ("AST-000001", 12, "CREDITO", 60.00, 3),
+    # Un centavo: sin IVA ni costo; sin usuario -> MIN(usuario_id)
+    ("AST-000002", 11, "DEBITO", 0.01, 3),
+    ("AST-000002", 41, "CREDITO", 0.01, 3),
+    ("AST-000003", 11, "DEBITO", 11.30, 5),
+    ("AST-000003", 41, "CREDITO", 10.00, 5),
+    ("AST-000003", 21, "CREDITO", 1.30, 5),
+    ("AST-000003", 51, "DEBITO", 4.00, 5),
+    ("AST-000003", 12, "CREDITO", 4.00, 5),
+]
+COLUMNAS = ["numero_asiento", "cuenta_id", "tipo_movimiento", "monto", "usuario_id"]
+
+
+def _lineas():
+    """Line items ordenados por orden, como los lee iter_fact_transacciones"""
+    return pd.DataFrame(
+        {
+            "orden_id": [1, 1, 2, 3],
+            "fecha": pd.to_datetime(
+                ["2024-03-01", "2024-03-01", "2024-03-02", "2024-03-02"]
+            ),
+            "usuario_id": [3, 3, None, 5],
+            "line_item_id": [10, 11, 12, 13],
+            "subtotal_bruto": [113.00, 56.50, 0.01, 22.60],
+            "descuento_total": [0.0, 0.0, 0.0, 11.30],
+        }
+    )
+
+
+def _centavos(df):
+    return (df["monto"] * 100).round().astype("int64")
+
+
+def test_asientos_de_ventas(fact_builder):
+    df, siguiente = fact_builder._transformar_transacciones(_lineas())
+
+    assert list(df[COLUMNAS].itertuples(index=False, name=None)) == ESPERADO
+    assert siguiente == 4
+    assert df["documento_referencia"].iloc[0] == "ORD-1"
+    assert df["descripcion"].iloc[2] == "IVA venta orden #1"
+    assert set(df["tipo_transaccion_id"]) == {2}
+    assert set(df["centro_costo_id"]) == {7}
+    assert df["periodo_id"].eq(202403).all()
+    assert verificar_partida_doble(
+        df["numero_asiento"], df["tipo_movimiento"], _centavos(df)
+    ).empty
+
+
+def test_asiento_inicial(fact_builder):
+    df, siguiente = fact_builder._transformar_transacciones(
+        _lineas(), asiento_inicial=41
+    )
+
+    assert df["numero_asiento"].unique().tolist() == [
+        "AST-000041",
+        "AST-000042",
+        "AST-000043",
+    ]
+    assert siguiente == 44
+
+
+@pytest.mark.parametrize("cortes", [[1], [2, 3], [1, 2, 3]])
+def test_streaming_arrastra_ordenes_y_numeracion(fact_builder, monkeypatch, cortes):
+    lineas = _lineas()
+    limites = [0, *cortes, len(lineas)]
+    chunks = [lineas.iloc[a:b] for a, b in zip(limites, limites[1:])]
+
+    monkeypatch.setattr(
+        fact_builder.stream_extractor,
+        "iter_chunks",
+        lambda conn, query, **kwargs: (chunk.copy() for chunk in chunks),
+    )
+    fact_builder._oro_conn = object()  # no se usa: los chunks vienen del stub
+
+    df = pd.concat(list(fact_builder.iter_fact_transacciones()), ignore_index=True)
+
+    # La orden 1 partida entre chunks sigue siendo un solo asiento cuadrado
+    assert list(df[COLUMNAS].itertuples(index=False, name=None)) == ESPERADO
+    debitos = df.loc[df["tipo_movimiento"] == "DEBITO", "monto"].sum()
+    creditos = df.loc[df["tipo_movimiento"] == "CREDITO", "monto"].sum()
+    assert round(debitos, 2) == round(creditos, 2) == 244.81
@@ -0,0 +1,37 @@
+"""Datasets particionados de loaders/parquet_dataset_writer.py"""
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from loaders.parquet_dataset_writer import ParquetDatasetWriter
+
+
+def _writer(tmp_path):
+    return ParquetDatasetWriter(
+        {
+            "paths": {"output_parquet": str(tmp_path)},
+            "optimization": {"enable_partitioning": True, "partition_by": "fecha"},
+        }
+    )
+
+
+def test_particiona_por_periodo_y_reemplaza_archivo_anterior(tmp_path):
+    # Salida de una corrida anterior sin dataset
+    pd.DataFrame({"fecha_id": [20230101]}).to_parquet(tmp_path / "fact_ventas.parquet")
+    ventas = pd.DataFrame(
+        {"fecha_id": [20240301, 20240415, 20240420], "total": [1.0, 2.0, 3.0]}
+    )
+
+    stats = _writer(tmp_path).write_chunks(
+        "fact_ventas", [ventas.iloc[:2], ventas.iloc[2:]]
+    )
+
+    assert not (tmp_path / "fact_ventas.parquet").exists()
+    assert (stats.rows, stats.partitions) == (3, 2)
+    anio = tmp_path / "fact_ventas" / "anio=2024"
+    assert sorted(p.name for p in anio.iterdir()) == ["mes=03", "mes=04"]
+    # La poda por partición lee solo mes=04 (Hive infiere mes como entero)
+    leido = ds.dataset(
+        tmp_path / "fact_ventas", format="parquet", partitioning="hive"
+    ).to_table(filter=ds.field("mes") == 4)
+    assert sorted(leido.column("fecha_id").to_pylist()) == [20240415, 20240420]
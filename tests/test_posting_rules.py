@@ -0,0 +1,165 @@
+"""Reglas de partida doble de transformers/posting_rules.py"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transformers.posting_rules import (
+    REGLAS_VENTA,
+    PostingEngine,
+    PostingRule,
+    calcular_saldos,
+    clasificar_resultados,
+    combinar_movimientos,
+    movimientos_por_cuenta,
+    verificar_partida_doble,
+)
+
+CUENTAS = {"1102": 11, "1103": 12, "2102": 21, "4101": 41, "5101": 51}
+
+
+def _motor(reglas=REGLAS_VENTA):
+    return PostingEngine(reglas, lambda codigos: [CUENTAS[c] for c in codigos])
+
+
+def _ventas():
+    """Órdenes en centavos: completa, sin IVA ni costo, y con descuento"""
+    return pd.DataFrame(
+        {
+            "orden_id": [1, 2, 3],
+            "total": [16950, 1, 1130],
+            "subtotal": [15000, 1, 1000],
+            "iva": [1950, 0, 130],
+            "costo_venta": [6000, 0, 400],
+        }
+    )
+
+
+def test_piernas_de_venta():
+    ventas = _ventas()
+    piernas = _motor().aplicar(ventas, referencia=ventas["orden_id"])
+
+    esperado = [
+        (0, 11, "DEBITO", 16950, "Cobro orden #1"),
+        (0, 41, "CREDITO", 15000, "Ingreso venta orden #1"),
+        (0, 21, "CREDITO", 1950, "IVA venta orden #1"),
+        (0, 51, "DEBITO", 6000, "Costo de venta orden #1"),
+        (0, 12, "CREDITO", 6000, "Salida inventario orden #1"),
+        # iva == 0 y costo_venta == 0: solo cobro e ingreso
+        (1, 11, "DEBITO", 1, "Cobro orden #2"),
+        (1, 41, "CREDITO", 1, "Ingreso venta orden #2"),
+        (2, 11, "DEBITO", 1130, "Cobro orden #3"),
+        (2, 41, "CREDITO", 1000, "Ingreso venta orden #3"),
+        (2, 21, "CREDITO", 130, "IVA venta orden #3"),
+        (2, 51, "DEBITO", 400, "Costo de venta orden #3"),
+        (2, 12, "CREDITO", 400, "Salida inventario orden #3"),
+    ]
+    columnas = ["fila", "cuenta_id", "tipo_movimiento", "monto", "descripcion"]
+    assert list(piernas[columnas].itertuples(index=False, name=None)) == esperado
+    # Las medidas en centavos no pasan por float
+    assert piernas["monto"].dtype == np.int64
+
+
+def test_partida_doble_cuadra_y_detecta_descuadre():
+    ventas = _ventas()
+    piernas = _motor().aplicar(ventas, referencia=ventas["orden_id"])
+    asientos = ventas["orden_id"].to_numpy()[piernas["fila"]]
+
+    assert verificar_partida_doble(
+        asientos, piernas["tipo_movimiento"], piernas["monto"]
+    ).empty
+
+    montos = piernas["monto"].to_numpy().copy()
+    montos[2] += 1  # IVA de la orden 1 con un centavo de más
+    descuadrados = verificar_partida_doble(asientos, piernas["tipo_movimiento"], montos)
+    assert descuadrados.to_dict("records") == [
+        {"numero_asiento": 1, "diferencia": -0.01}
+    ]
+
+
+def test_lado_desconocido():
+    with pytest.raises(ValueError, match="Lado contable"):
+        _motor((PostingRule("1102", "HABER", "total", "Cobro #"),))
+
+
+def test_movimientos_por_chunks_igual_al_total():
+    transacciones = pd.DataFrame(
+        {
+            "fecha_id": [20240301, 20240301, 20240415, 20240415, None],
+            "cuenta_id": [11, 41, 11, 41, 11],
+            "centro_costo_id": [7, 7, 7, 7, 7],
+            "tipo_movimiento": ["DEBITO", "CREDITO", "DEBITO", "CREDITO", "DEBITO"],
+            "monto": [0.1, 0.1, 0.2, 0.2, 99.0],
+        }
+    )
+
+    completo = movimientos_por_cuenta(transacciones)
+    por_chunks = combinar_movimientos(
+        [
+            movimientos_por_cuenta(transacciones.iloc[:3]),
+            movimientos_por_cuenta(transacciones.iloc[3:]),
+        ]
+    )
+
+    pd.testing.assert_frame_equal(completo, por_chunks)
+    # Las filas sin fecha_id no entran al balance
+    assert list(completo.itertuples(index=False, name=None)) == [
+        (202403, 11, 7, 0.1, 0.0),
+        (202403, 41, 7, 0.0, 0.1),
+        (202404, 11, 7, 0.2, 0.0),
+        (202404, 41, 7, 0.0, 0.2),
+    ]
+
+
+def test_calcular_saldos_acumula_por_cuenta():
+    movimientos = pd.DataFrame(
+        {
+            "periodo_id": [202402, 202401, 202401, 202403],
+            "cuenta_id": [11, 11, 41, 11],
+            "centro_costo_id": [7, 7, 7, 7],
+            "debitos": [0.2, 0.1, 0.0, 0.3],
+            "creditos": [0.0, 0.0, 5.0, 0.0],
+        }
+    )
+
+    saldos = calcular_saldos(movimientos)
+    columnas = ["cuenta_id", "periodo_id", "saldo_inicial", "saldo_final"]
+    assert list(saldos[columnas].itertuples(index=False, name=None)) == [
+        (11, 202401, 0.0, 0.1),
+        (11, 202402, 0.1, 0.3),
+        (11, 202403, 0.3, 0.6),
+        (41, 202401, 0.0, -5.0),
+    ]
+
+    # Un período cerrado ancla el acumulado y no se retorna
+    anclas = pd.DataFrame(
+        {
+            "periodo_id": [202402],
+            "cuenta_id": [11],
+            "centro_costo_id": [7],
+            "saldo_final": [100.0],
+        }
+    )
+    recalculado = calcular_saldos(
+        movimientos[movimientos["periodo_id"] != 202402], anclas
+    )
+    assert list(recalculado[columnas].itertuples(index=False, name=None)) == [
+        (11, 202401, 0.0, 0.1),
+        (11, 202403, 100.0, 100.3),
+        (41, 202401, 0.0, -5.0),
+    ]
+
+
+def test_clasificar_resultados():
+    saldos = pd.DataFrame(
+        {
+            "codigo": ["4101", "5101", "6101", "1102"],
+            "debitos": [1.0, 60.0, 5.0, 169.5],
+            "creditos": [150.0, 0.0, 0.0, 0.0],
+        }
+    )
+
+    tipos, montos = clasificar_resultados(saldos)
+
+    assert tipos.tolist() == ["ingreso", "costo", "gasto", "otro"]
+    assert montos.tolist() == [150.0, 60.0, 5.0, 0.0]
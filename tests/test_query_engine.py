@@ -0,0 +1,27 @@
+"""Catálogo y consultas de core/query_engine.py sobre parquet locales"""
+
+import pandas as pd
+
+from core.query_engine import QueryEngine
+
+
+def test_directorio_manda_sobre_archivo_suelto(tmp_path):
+    # Archivo de una corrida anterior y el dataset particionado actual
+    pd.DataFrame({"fecha_id": [20230101], "total": [1.0]}).to_parquet(
+        tmp_path / "fact_ventas.parquet"
+    )
+    particion = tmp_path / "fact_ventas" / "anio=2024" / "mes=03"
+    particion.mkdir(parents=True)
+    pd.DataFrame({"fecha_id": [20240301, 20240302], "total": [2.0, 3.0]}).to_parquet(
+        particion / "part-0-0.parquet"
+    )
+    pd.DataFrame({"producto_id": [10]}).to_parquet(tmp_path / "dim_producto.parquet")
+
+    engine = QueryEngine({"query": {"cache_enabled": False}}, root=tmp_path)
+
+    assert engine.tables() == {
+        "dim_producto": tmp_path / "dim_producto.parquet",
+        "fact_ventas": tmp_path / "fact_ventas",
+    }
+    ventas = engine.dataset("fact_ventas").to_table().to_pandas()
+    assert sorted(ventas["fecha_id"]) == [20240301, 20240302]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+CALENDARIO - GENERADOR VECTORIZADO DE FECHAS Y FERIADOS
+=======================================================
+Genera los atributos de dim_fecha para cualquier rango con aritmética
+entera sobre arrays (sin strftime ni apply por fila) y marca los
+feriados de El Salvador, incluidos los de Semana Santa, que se mueven
+con el Domingo de Pascua.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DIAS = np.array(
+    ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"],
+    dtype=object,
+)
+
+MESES = np.array(
+    [
+        "Enero",
+        "Febrero",
+        "Marzo",
+        "Abril",
+        "Mayo",
+        "Junio",
+        "Julio",
+        "Agosto",
+        "Septiembre",
+        "Octubre",
+        "Noviembre",
+        "Diciembre",
+    ],
+    dtype=object,
+)
+
+# Feriados de fecha fija: (mes, día) -> nombre
+FERIADOS_FIJOS = {
+    (1, 1): "Año Nuevo",
+    (5, 1): "Día del Trabajo",
+    (5, 10): "Día de la Madre",
+    (6, 17): "Día del Padre",
+    (8, 6): "Fiestas Patronales",
+    (9, 15): "Día de la Independencia",
+    (11, 2): "Día de los Difuntos",
+    (12, 25): "Navidad",
+}
+
+# Feriados móviles: días relativos al Domingo de Pascua -> nombre
+FERIADOS_PASCUA = {
+    -3: "Jueves Santo",
+    -2: "Viernes Santo",
+    -1: "Sábado Santo",
+}
+
+
+def domingo_de_pascua(anios) -> np.ndarray:
+    """Domingo de Pascua (calendario gregoriano) para un array de años"""
+    y = np.asarray(anios, dtype=np.int64)
+
+    # Algoritmo anónimo gregoriano (Meeus/Jones/Butcher), todo en enteros
+    a = y % 19
+    b = y // 100
+    c = y % 100
+    d = b // 4
+    e = b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i = c // 4
+    k = c % 4
+    el = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * el) // 451
+    mes = (h + el - 7 * m + 114) // 31
+    dia = (h + el - 7 * m + 114) % 31 + 1
+
+    return _fechas(y, mes, dia)
+
+
+@lru_cache(maxsize=32)
+def indice_feriados(anio_inicio: int, anio_fin: int) -> pd.Series:
+    """
+    Feriados de los años [anio_inicio, anio_fin], indexados por fecha
+
+    Returns:
+        Series fecha (datetime64) -> nombre del feriado, ordenada por fecha
+    """
+    anios = np.arange(anio_inicio, anio_fin + 1, dtype=np.int64)
+    fechas = []
+    nombres = []
+
+    for (mes, dia), nombre in FERIADOS_FIJOS.items():
+        fechas.append(_fechas(anios, mes, dia))
+        nombres.append(np.full(len(anios), nombre, dtype=object))
+
+    pascua = domingo_de_pascua(anios)
+    for desplazamiento, nombre in FERIADOS_PASCUA.items():
+        fechas.append(pascua + np.timedelta64(desplazamiento, "D"))
+        nombres.append(np.full(len(anios), nombre, dtype=object))
+
+    indice = pd.Series(
+        np.concatenate(nombres),
+        index=pd.DatetimeIndex(np.concatenate(fechas), name="fecha"),
+    ).sort_index()
+    # Si dos feriados caen el mismo día se conserva el primero
+    return indice[~indice.index.duplicated(keep="first")]
+
+
+def nombres_feriado(fechas) -> np.ndarray:
+    """Nombre del feriado de cada fecha ('' si no es feriado)"""
+    fechas = pd.DatetimeIndex(fechas).normalize()
+    if len(fechas) == 0:
+        return np.array([], dtype=object)
+
+    indice = indice_feriados(int(fechas.year.min()), int(fechas.year.max()))
+    posiciones = indice.index.get_indexer(fechas)
+    nombres = indice.to_numpy()[np.maximum(posiciones, 0)]
+    return np.where(posiciones >= 0, nombres, "").astype(object)
+
+
+def generar_calendario(inicio, fin) -> pd.DataFrame:
+    """
+    Atributos de dim_fecha para cada día de [inicio, fin]
+
+    Returns:
+        DataFrame con fecha_id (YYYYMMDD), fecha, anio, mes, dia, trimestre,
+        semana_anio, dia_semana (1=lunes), nombres de día y mes, es_fin_semana,
+        es_festivo y nombre_festivo
+    """
+    fechas = pd.date_range(start=inicio, end=fin, freq="D")
+    anio = fechas.year
+    mes = fechas.month
+    dia = fechas.day
+    dia_semana = fechas.dayofweek + 1
+    nombre_festivo = nombres_feriado(fechas)
+
+    return pd.DataFrame(
+        {
+            "fecha_id": (anio * 10000 + mes * 100 + dia).astype("int64"),
+            "fecha": fechas,
+            "anio": anio,
+            "mes": mes,
+            "dia": dia,
+            "trimestre": fechas.quarter,
+            "semana_anio": fechas.isocalendar().week.to_numpy().astype(int),
+            "dia_semana": dia_semana,
+            "dia_semana_nombre": DIAS[dia_semana - 1],
+            "mes_nombre": MESES[mes - 1],
+            "es_fin_semana": dia_semana >= 6,
+            "es_festivo": nombre_festivo != "",
+            "nombre_festivo": nombre_festivo,
+        }
+    )
+
+
+def _fechas(anios: np.ndarray, meses, dias) -> np.ndarray:
+    """datetime64[D] desde arrays de año, mes y día"""
+    inicio_anio = (anios - 1970).astype("datetime64[Y]")
+    inicio_mes = inicio_anio.astype("datetime64[M]") + (np.asarray(meses) - 1)
+    return inicio_mes.astype("datetime64[D]") + (np.asarray(dias) - 1)
@@ -5,13 +5,15 @@ Puebla dimensiones con datos reales desde OroCommerce, OroCRM y CSVs
 """
 
 import pandas as pd
-import psycopg2
-import os
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import logging
 from pathlib import Path
 
+from core.connection_manager import get_connection_manager
+from extractors.extract_cache import ExtractCache
+from transformers.calendario import generar_calendario
+
 logger = logging.getLogger(__name__)
 
 # ROOT del proyecto (Data_Warehouse_Punta_Fina)
@@ -21,9 +23,37 @@ ROOT = Path(__file__).resolve().parent.parent
 class CompleteDimensionBuilder:
     """Constructor completo de todas las dimensiones del DW"""
 
-    def __init__(self):
-        self.oro_conn = self._get_oro_connection()
-        self.crm_conn = self._get_crm_connection()
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        # Conexiones perezosas: se abren al construir la primera dimensión
+        self._oro_conn = None
+        self._crm_conn = None
+        # Consultas y CSV del origen que no cambian entre corridas
+        self.extract_cache = ExtractCache(self.config)
+
+    @property
+    def oro_conn(self):
+        if self._oro_conn is None:
+            self._oro_conn = self._get_oro_connection()
+        return self._oro_conn
+
+    @property
+    def crm_conn(self):
+        if self._crm_conn is None:
+            self._crm_conn = self._get_crm_connection()
+        return self._crm_conn
+
+    def close(self):
+        """Cierra las conexiones que se llegaron a abrir"""
+        # getattr: __del__ también corre si __init__ falló a medias
+        for conn in (getattr(self, "_oro_conn", None), getattr(self, "_crm_conn", None)):
+            try:
+                if conn is not None:
+                    conn.close()
+            except Exception:
+                pass
+        self._oro_conn = None
+        self._crm_conn = None
 
     def build(
         self, dimension_name: str, dimension_config: Dict[str, Any] = None
@@ -52,23 +82,11 @@ class CompleteDimensionBuilder:
 
     def _get_oro_connection(self):
         """Conexión a OroCommerce"""
-        return psycopg2.connect(
-            host=os.getenv("ORO_DB_HOST"),
-            port=int(os.getenv("ORO_DB_PORT")),
-            dbname=os.getenv("ORO_DB_NAME"),
-            user=os.getenv("ORO_DB_USER"),
-            password=os.getenv("ORO_DB_PASS"),
-        )
+        return get_connection_manager(self.config).connect("oro")
 
     def _get_crm_connection(self):
         """Conexión a OroCRM"""
-        return psycopg2.connect(
-            host=os.getenv("CRM_DB_HOST"),
-            port=int(os.getenv("CRM_DB_PORT")),
-            dbname=os.getenv("CRM_DB_NAME"),
-            user=os.getenv("CRM_DB_USER"),
-            password=os.getenv("CRM_DB_PASS"),
-        )
+        return get_connection_manager(self.config).connect("crm")
 
     # ==================== DIMENSIONES CONFORMADAS ====================
 
@@ -76,47 +94,8 @@ class CompleteDimensionBuilder:
         """Construir dim_fecha completa"""
         logger.info("📅 Construyendo dim_fecha...")
 
-        date_range = pd.date_range(start="2020-01-01", end="2030-12-31", freq="D")
-        df = pd.DataFrame({"fecha": date_range})
-
-        df["fecha_id"] = df["fecha"].apply(lambda x: int(x.strftime("%Y%m%d")))
-        df["anio"] = df["fecha"].dt.year
-        df["mes"] = df["fecha"].dt.month
-        df["dia"] = df["fecha"].dt.day
-        df["trimestre"] = df["fecha"].dt.quarter
-        df["semana_anio"] = df["fecha"].dt.isocalendar().week.astype(int)
-        df["dia_semana"] = df["fecha"].dt.dayofweek + 1
-
-        dias = [
-            "Lunes",
-            "Martes",
-            "Miércoles",
-            "Jueves",
-            "Viernes",
-            "Sábado",
-            "Domingo",
-        ]
-        df["dia_semana_nombre"] = df["dia_semana"].apply(lambda x: dias[x - 1])
-
-        meses = [
-            "Enero",
-            "Febrero",
-            "Marzo",
-            "Abril",
-            "Mayo",
-            "Junio",
-            "Julio",
-            "Agosto",
-            "Septiembre",
-            "Octubre",
-            "Noviembre",
-            "Diciembre",
-        ]
-        df["mes_nombre"] = df["mes"].apply(lambda x: meses[x - 1])
-
-        df["es_fin_semana"] = df["dia_semana"].isin([6, 7])
-        df["es_festivo"] = False  # Se puede enriquecer con días festivos reales
-        df["nombre_festivo"] = ""  # String vacío en lugar de NULL
+        # Calendario vectorizado con feriados de El Salvador (incluye Semana Santa)
+        df = generar_calendario("2020-01-01", "2030-12-31")
         df["created_at"] = pd.Timestamp.now()
 
         # Schema: fecha_id, fecha, anio, mes, dia, trimestre, semana_anio, dia_semana,
@@ -214,7 +193,9 @@ class CompleteDimensionBuilder:
         ORDER BY p.id
         """
 
-        df = pd.read_sql_query(query, self.oro_conn)
+        df = self.extract_cache.read_sql(
+            "dim_producto", query, self.oro_conn, ["oro_product", "oro_catalog_category"]
+        )
 
         # Limpiar NULLs en nombre
         df["nombre"] = df["nombre"].fillna(
@@ -243,7 +224,9 @@ class CompleteDimensionBuilder:
         """
 
         try:
-            df_precios = pd.read_sql_query(query_precios, self.oro_conn)
+            df_precios = self.extract_cache.read_sql(
+                "precios_producto", query_precios, self.oro_conn, ["oro_price_product"]
+            )
             df = df.merge(
                 df_precios,
                 left_on="producto_id",
@@ -260,7 +243,7 @@ class CompleteDimensionBuilder:
         logger.info("   📦 Obteniendo costos desde CSV de compras...")
         try:
             csv_compras = ROOT / "Compras_Productos_PuntaFina.csv"
-            df_compras = pd.read_csv(csv_compras)
+            df_compras = self.extract_cache.read_csv(csv_compras)
 
             # Calcular costo promedio por producto
             df_costos = (
@@ -363,7 +346,9 @@ class CompleteDimensionBuilder:
         ORDER BY c.id
         """
 
-        df = pd.read_sql_query(query, self.oro_conn)
+        df = self.extract_cache.read_sql(
+            "dim_cliente", query, self.oro_conn, ["oro_customer", "oro_customer_user"]
+        )
 
         # Eliminar duplicados por cliente (puede haber múltiples usuarios por cliente)
         df = df.drop_duplicates(subset=["cliente_id"], keep="first")
@@ -409,7 +394,7 @@ class CompleteDimensionBuilder:
         try:
             # Primero intentar desde CSV
             csv_path = "/root/PuntaFina_DW_Oro/data/inputs/ventas/sitios_web.csv"
-            df = pd.read_csv(csv_path)
+            df = self.extract_cache.read_csv(csv_path)
 
             # Renombrar columnas para match con DW
             df = df.rename(columns={"sitio_web_id": "sitio_externo_id"})
@@ -501,11 +486,17 @@ class CompleteDimensionBuilder:
         logger.info(f"✓ dim_direccion: {len(df):,} registros desde oro_order_address")
         return df
 
-    def build_dim_orden(self) -> pd.DataFrame:
-        """Construir dim_orden (lookup table para atributos degenerados)"""
+    def build_dim_orden(self, ordenes: Optional[List[int]] = None) -> pd.DataFrame:
+        """
+        Construir dim_orden (lookup table para atributos degenerados)
+
+        Args:
+            ordenes: Solo estas órdenes (micro-lotes de CDC); None = todas
+        """
         logger.info("📋 Construyendo dim_orden...")
 
-        query = """
+        filtro = "WHERE id = ANY(%(ordenes)s)" if ordenes is not None else ""
+        query = f"""
         SELECT 
             id as orden_id,
             id as orden_externo_id,
@@ -513,10 +504,15 @@ class CompleteDimensionBuilder:
             COALESCE(currency, 'USD') as moneda,
             created_at
         FROM oro_order
+        {filtro}
         ORDER BY id
         """
 
-        df = pd.read_sql_query(query, self.oro_conn)
+        df = pd.read_sql_query(
+            query,
+            self.oro_conn,
+            params={"ordenes": [int(o) for o in ordenes]} if ordenes is not None else None,
+        )
         df["tipo_orden"] = "Venta"
         df["canal"] = "E-Commerce"
         df["tasa_cambio"] = 1.0
@@ -625,7 +621,7 @@ class CompleteDimensionBuilder:
         logger.info("🚚 Construyendo dim_envio desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "ventas" / "metodos_envio.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Extraer ID numérico de ENV001 -> 1
         df["envio_externo_id"] = df["id_envio"].str.extract(r"(\d+)").astype(int)
@@ -657,7 +653,7 @@ class CompleteDimensionBuilder:
         logger.info("📊 Construyendo dim_estado_orden desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "ventas" / "estados_orden.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
         df = df.rename(
             columns={
                 "id_estado_orden": "estado_orden_externo_id",
@@ -675,7 +671,7 @@ class CompleteDimensionBuilder:
         logger.info("💳 Construyendo dim_estado_pago desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "ventas" / "estados_pago.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapeo correcto: estado_pago es el código, metodo_pago es el nombre
         df = df.rename(
@@ -782,7 +778,9 @@ class CompleteDimensionBuilder:
         """
 
         try:
-            df_promos = pd.read_sql_query(query, self.oro_conn)
+            df_promos = self.extract_cache.read_sql(
+                "dim_promocion", query, self.oro_conn, ["oro_promotion"]
+            )
             logger.info(
                 f"   📥 Extraídas {len(df_promos)} promociones desde OroCommerce"
             )
@@ -821,7 +819,7 @@ class CompleteDimensionBuilder:
         logger.info("🏪 Construyendo dim_almacen desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "inventario" / "almacenes.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapear columnas del CSV al schema de DB
         # CSV: id_almacen, nombre_almacen, tipo_almacen, ciudad, departamento, direccion, capacidad_m3, ...
@@ -874,7 +872,7 @@ class CompleteDimensionBuilder:
         logger.info("🏭 Construyendo dim_proveedor desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "inventario" / "proveedores.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapear columnas del CSV al schema de DB
         # CSV: id_proveedor, nombre_proveedor, razon_social, nit, pais_origen, ciudad, direccion, telefono, email, contacto_principal, ...
@@ -919,7 +917,7 @@ class CompleteDimensionBuilder:
         logger.info("📦 Construyendo dim_tipo_movimiento desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "inventario" / "tipos_movimiento.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapear columnas del CSV al schema de DB
         # CSV: id_tipo_movimiento, nombre_tipo, categoria, afecta_stock, descripcion
@@ -1015,7 +1013,7 @@ class CompleteDimensionBuilder:
         logger.info("💼 Construyendo dim_cuenta_contable desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "finanzas" / "cuentas_contables.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapear columnas CSV a esquema de DW
         df = df.rename(
@@ -1068,7 +1066,7 @@ class CompleteDimensionBuilder:
         logger.info("🏢 Construyendo dim_centro_costo desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "finanzas" / "centros_costo.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapear columnas del CSV al schema de DB
         # CSV: id_centro_costo, nombre_centro, tipo_centro, responsable, activo
@@ -1104,7 +1102,7 @@ class CompleteDimensionBuilder:
         logger.info("📋 Construyendo dim_tipo_transaccion desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "finanzas" / "tipos_transaccion.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
 
         # Mapear columnas del CSV al schema de DB
         # CSV: id_tipo_transaccion, nombre_tipo, categoria, descripcion
@@ -1172,8 +1170,4 @@ class CompleteDimensionBuilder:
 
     def __del__(self):
         """Cerrar conexiones"""
-        try:
-            self.oro_conn.close()
-            self.crm_conn.close()
-        except:
-            pass
+        self.close()
@@ -4,14 +4,33 @@ FACT TRANSFORMERS - Transformadores completos para todas las tablas de hechos
 Puebla facts con datos reales desde OroCommerce y CSVs
 """
 
+import numpy as np
 import pandas as pd
-import psycopg2
-import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
 from pathlib import Path
 
+from core.connection_manager import get_connection_manager
+from extractors.extract_cache import ExtractCache
+from extractors.parallel_extractor import ParallelRangeExtractor
+from extractors.streaming_extractor import StreamingExtractor
+from transformers.dinero import (
+    a_centavos,
+    a_montos,
+    aplicar_porcentaje,
+    multiplicar,
+    separar_iva,
+)
+from transformers.posting_rules import (
+    REGLAS_VENTA,
+    PostingEngine,
+    calcular_saldos,
+    clasificar_resultados,
+    verificar_partida_doble,
+)
+from transformers.surrogate_key_cache import SurrogateKeyCache
+
 logger = logging.getLogger(__name__)
 
 # ROOT del proyecto (Data_Warehouse_Punta_Fina)
@@ -21,12 +40,63 @@ ROOT = Path(__file__).resolve().parent.parent
 class CompleteFactBuilder:
     """Constructor completo de todas las tablas de hechos"""
 
-    def __init__(self, dw_conn=None):
-        self.oro_conn = self._get_oro_connection()
+    def __init__(
+        self,
+        dw_conn=None,
+        config: Dict[str, Any] = None,
+        sk_cache: Optional[SurrogateKeyCache] = None,
+    ):
+        self.config = config or {}
+        # Conexiones perezosas: se abren al primer uso
+        self._oro_conn = None
         # Usar conexión proporcionada o crear una nueva
-        self.dw_conn = dw_conn if dw_conn is not None else self._get_dw_connection()
+        self._dw_conn = dw_conn
         self._owns_dw_conn = dw_conn is None  # Para saber si debemos cerrarla
 
+        # Extracción por chunks con cursores de servidor (extraction.streaming)
+        self.streaming = self.config.get("extraction", {}).get("streaming", False)
+        self.stream_extractor = StreamingExtractor(self.config)
+        # Lectura de line items por rangos de oli.id (extraction.parallel)
+        self.parallel_extractor = ParallelRangeExtractor(self.config)
+        # CSV del origen cacheados entre corridas (optimization.enable_caching)
+        self.extract_cache = ExtractCache(self.config)
+        # Dimensiones en memoria (llenada por el orchestrator o leída una vez)
+        self._sk_cache = sk_cache
+
+    @property
+    def oro_conn(self):
+        if self._oro_conn is None:
+            self._oro_conn = self._get_oro_connection()
+        return self._oro_conn
+
+    @property
+    def dw_conn(self):
+        if self._dw_conn is None:
+            self._dw_conn = self._get_dw_connection()
+        return self._dw_conn
+
+    @property
+    def sk_cache(self) -> SurrogateKeyCache:
+        if self._sk_cache is None:
+            self._sk_cache = SurrogateKeyCache(self.dw_conn, self.config)
+        return self._sk_cache
+
+    def close(self):
+        """Cierra la conexión a Oro y la del DW si la abrió el builder"""
+        # getattr: __del__ también corre si __init__ falló a medias
+        conexiones = [getattr(self, "_oro_conn", None)]
+        if getattr(self, "_owns_dw_conn", False):
+            conexiones.append(getattr(self, "_dw_conn", None))
+        for conn in conexiones:
+            try:
+                if conn is not None:
+                    conn.close()
+            except Exception:
+                pass
+        self._oro_conn = None
+        if getattr(self, "_owns_dw_conn", False):
+            self._dw_conn = None
+
     def build(self, fact_name: str, fact_config: Dict[str, Any] = None) -> pd.DataFrame:
         """
         Método genérico para construir cualquier fact table
@@ -52,162 +122,110 @@ class CompleteFactBuilder:
 
     def _get_oro_connection(self):
         """Conexión a OroCommerce"""
-        return psycopg2.connect(
-            host=os.getenv("ORO_DB_HOST"),
-            port=int(os.getenv("ORO_DB_PORT")),
-            dbname=os.getenv("ORO_DB_NAME"),
-            user=os.getenv("ORO_DB_USER"),
-            password=os.getenv("ORO_DB_PASS"),
-        )
+        return get_connection_manager(self.config).connect("oro")
 
     def _get_dw_connection(self):
         """Conexión al Data Warehouse"""
-        return psycopg2.connect(
-            host=os.getenv("DW_DB_HOST"),
-            port=int(os.getenv("DW_DB_PORT")),
-            dbname=os.getenv("DW_DB_NAME"),
-            user=os.getenv("DW_DB_USER"),
-            password=os.getenv("DW_DB_PASS"),
-            connect_timeout=120,
-            options="-c statement_timeout=1800000",
-        )
+        return get_connection_manager(self.config).connect("dw")
 
-    def _resolve_surrogate_keys(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Resolver Surrogate Keys de dimensiones desde el DW"""
+    def get_ventas_watermark(self) -> Dict[str, Any]:
+        """
+        Marca alta actual de OroCommerce para fact_ventas
 
-        # Lookup dim_cliente
-        query_cliente = "SELECT cliente_id, cliente_externo_id FROM dim_cliente"
-        dim_cliente = pd.read_sql_query(query_cliente, self.dw_conn)
-        df = df.merge(
-            dim_cliente[["cliente_id", "cliente_externo_id"]],
-            on="cliente_externo_id",
-            how="left",
-        )
-        df["cliente_id"] = df["cliente_id"].fillna(1).astype(int)
-
-        # Lookup dim_usuario - convertir ambos a string para el merge
-        query_usuario = "SELECT usuario_id, usuario_externo_id FROM dim_usuario"
-        dim_usuario = pd.read_sql_query(query_usuario, self.dw_conn)
-        df["usuario_id_str"] = df["usuario_id"].astype(str)
-        dim_usuario["usuario_externo_id_str"] = dim_usuario[
-            "usuario_externo_id"
-        ].astype(str)
-
-        df = df.merge(
-            dim_usuario[["usuario_id", "usuario_externo_id_str"]],
-            left_on="usuario_id_str",
-            right_on="usuario_externo_id_str",
-            how="left",
-            suffixes=("_orig", "_sk"),
-        )
-        df["usuario_id"] = df["usuario_id_sk"].fillna(1).astype(int)
-        df = df.drop(
-            columns=[
-                "usuario_id_str",
-                "usuario_externo_id_str",
-                "usuario_id_orig",
-                "usuario_id_sk",
-            ],
-            errors="ignore",
+        Debe tomarse ANTES de extraer el delta: lo que cambie durante la
+        extracción queda por encima de la marca y entra en la siguiente corrida.
+        """
+        cursor = self.oro_conn.cursor()
+        cursor.execute(
+            """
+            SELECT (SELECT MAX(updated_at) FROM oro_order),
+                   (SELECT MAX(id) FROM oro_order_line_item)
+            """
         )
+        updated_at, line_item_id = cursor.fetchone()
+        cursor.close()
+        return {"updated_at": updated_at, "line_item_id": line_item_id}
+
+    def _filtro_ordenes_delta(
+        self,
+        desde_updated_at: Optional[datetime],
+        desde_line_item_id: Optional[int],
+        ordenes: Optional[List[int]] = None,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Filtro SQL de órdenes del delta (vacío si no hay marcas ni órdenes)"""
+        if ordenes is not None:
+            # Órdenes puntuales (micro-lotes de CDC)
+            return "\n          AND o.id = ANY(%(ordenes)s)", {
+                "ordenes": [int(orden) for orden in ordenes]
+            }
+        if desde_updated_at is None and desde_line_item_id is None:
+            return "", None
+
+        filtro_ordenes = """
+          AND o.id IN (
+              SELECT id FROM oro_order WHERE updated_at >= %(desde_updated_at)s
+              UNION
+              SELECT order_id FROM oro_order_line_item WHERE id > %(desde_line_item_id)s
+          )"""
+        params = {
+            "desde_updated_at": desde_updated_at or datetime(1900, 1, 1),
+            "desde_line_item_id": desde_line_item_id or 0,
+        }
+        return filtro_ordenes, params
+
+    def build_fact_ventas(
+        self,
+        desde_updated_at: Optional[datetime] = None,
+        desde_line_item_id: Optional[int] = None,
+        ordenes: Optional[List[int]] = None,
+    ) -> pd.DataFrame:
+        """
+        Construir fact_ventas desde oro_order + oro_order_line_item
+        SIN DUPLICADOS - Cada line_item genera exactamente UN registro
+        Usa datos 100% reales de OroCommerce
 
-        # Lookup dim_producto
-        query_producto = "SELECT producto_id, producto_externo_id FROM dim_producto"
-        dim_producto = pd.read_sql_query(query_producto, self.dw_conn)
-        df["product_id"] = df["product_id"].astype(int)
-        dim_producto["producto_externo_id"] = dim_producto[
-            "producto_externo_id"
-        ].astype(int)
-
-        df = df.merge(
-            dim_producto[["producto_id", "producto_externo_id"]],
-            left_on="product_id",
-            right_on="producto_externo_id",
-            how="left",
-        )
-        df["producto_id"] = df["producto_id"].fillna(1).astype(int)
-        df = df.drop(columns=["producto_externo_id", "product_id"], errors="ignore")
-
-        # Lookup dim_direccion
-        query_direccion = "SELECT direccion_id, direccion_externo_id FROM dim_direccion"
-        dim_direccion = pd.read_sql_query(query_direccion, self.dw_conn)
-        df["direccion_id"] = df["direccion_id"].astype(int)
-        dim_direccion["direccion_externo_id"] = dim_direccion[
-            "direccion_externo_id"
-        ].astype(int)
-
-        df = df.merge(
-            dim_direccion[["direccion_id", "direccion_externo_id"]],
-            left_on="direccion_id",
-            right_on="direccion_externo_id",
-            how="left",
-            suffixes=("_orig", "_sk"),
-        )
-        df["direccion_id"] = df["direccion_id_sk"].fillna(1).astype(int)
-        df = df.drop(
-            columns=["direccion_externo_id", "direccion_id_orig", "direccion_id_sk"],
-            errors="ignore",
-        )
+        Args:
+            desde_updated_at: Solo órdenes con updated_at >= esta marca
+            desde_line_item_id: ...o con line items de id mayor a esta marca
+            ordenes: Solo estas órdenes (ignora las marcas; lo usa el CDC)
 
-        # Lookup dim_orden
-        query_orden = "SELECT orden_id, orden_externo_id FROM dim_orden"
-        dim_orden = pd.read_sql_query(query_orden, self.dw_conn)
-        df["orden_id"] = df["orden_id"].astype(int)
-        dim_orden["orden_externo_id"] = dim_orden["orden_externo_id"].astype(int)
-
-        df = df.merge(
-            dim_orden[["orden_id", "orden_externo_id"]],
-            left_on="orden_id",
-            right_on="orden_externo_id",
-            how="left",
-            suffixes=("_orig", "_sk"),
-        )
-        df["orden_id"] = df["orden_id_sk"].fillna(1).astype(int)
-        df = df.drop(
-            columns=["orden_externo_id", "orden_id_orig", "orden_id_sk"],
-            errors="ignore",
+        Con alguna marca se extrae el delta por órdenes completas (todas
+        sus líneas), para que el merge también elimine líneas borradas.
+        """
+        incremental = (
+            desde_updated_at is not None
+            or desde_line_item_id is not None
+            or ordenes is not None
         )
 
-        # Lookup dim_line_item
-        query_line_item = "SELECT line_item_id, line_item_externo_id FROM dim_line_item"
-        dim_line_item = pd.read_sql_query(query_line_item, self.dw_conn)
-        df["line_item_id"] = df["line_item_id"].astype(int)
-        dim_line_item["line_item_externo_id"] = dim_line_item[
-            "line_item_externo_id"
-        ].astype(int)
-
-        df = df.merge(
-            dim_line_item[["line_item_id", "line_item_externo_id"]],
-            left_on="line_item_id",
-            right_on="line_item_externo_id",
-            how="left",
-            suffixes=("_orig", "_sk"),
-        )
-        df["line_item_id"] = df["line_item_id_sk"].fillna(1).astype(int)
-        df = df.drop(
-            columns=["line_item_externo_id", "line_item_id_orig", "line_item_id_sk"],
-            errors="ignore",
-        )
+        if self.streaming:
+            chunks = list(
+                self.iter_fact_ventas(desde_updated_at, desde_line_item_id, ordenes)
+            )
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
 
         logger.info(
-            f"✓ SKs resueltas: clientes={df['cliente_id'].nunique()}, productos={df['producto_id'].nunique()}, ordenes={df['orden_id'].nunique()}"
+            "💰 Construyendo fact_ventas"
+            + (" (incremental)..." if incremental else "...")
         )
 
-        return df
+        filtro_ordenes, params = self._filtro_ordenes_delta(
+            desde_updated_at, desde_line_item_id, ordenes
+        )
 
-    def build_fact_ventas(self) -> pd.DataFrame:
-        """
-        Construir fact_ventas desde oro_order + oro_order_line_item
-        SIN DUPLICADOS - Cada line_item genera exactamente UN registro
-        Usa datos 100% reales de OroCommerce
-        """
-        logger.info("💰 Construyendo fact_ventas...")
+        # El delta incremental es chico: particionar solo la carga completa
+        paralelo = self.parallel_extractor.enabled and not incremental
+        filtro_rango = (
+            "\n          AND oli.id >= %(rango_desde)s AND oli.id < %(rango_hasta)s"
+            if paralelo
+            else ""
+        )
 
         # =====================================================================
         # PASO 1: Extraer line items base (1 registro por line_item)
         # Esta es la fuente de verdad: oro_order_line_item
         # =====================================================================
-        query_base = """
+        query_base = f"""
         SELECT 
             o.created_at::date as fecha,
             o.id as orden_id,
@@ -223,12 +241,21 @@ class CompleteFactBuilder:
         INNER JOIN oro_order_line_item oli ON o.id = oli.order_id
         WHERE o.created_at IS NOT NULL 
           AND oli.product_id IS NOT NULL
-          AND oli.quantity > 0
+          AND oli.quantity > 0{filtro_ordenes}{filtro_rango}
         ORDER BY oli.id
         """
 
         logger.info("   📥 Extrayendo line items desde OroCommerce...")
-        df = pd.read_sql_query(query_base, self.oro_conn)
+        if paralelo:
+            df = self.parallel_extractor.extract(
+                self.oro_conn,
+                self._get_oro_connection,
+                query_base,
+                bounds_query="SELECT MIN(id), MAX(id) FROM oro_order_line_item",
+                params=params,
+            )
+        else:
+            df = pd.read_sql_query(query_base, self.oro_conn, params=params)
         total_line_items = len(df)
         logger.info(f"   ✓ Extraídos {total_line_items:,} line items únicos")
 
@@ -244,17 +271,29 @@ class CompleteFactBuilder:
         # =====================================================================
         # PASO 2: Obtener descuentos por line item (agregados, sin duplicar)
         # =====================================================================
-        query_descuentos = """
+        # En modo incremental, limitar a las líneas de las órdenes del delta
+        filtro_lineas = ""
+        if incremental:
+            filtro_lineas = f"""
+          AND d.line_item_id IN (
+              SELECT oli.id FROM oro_order_line_item oli
+              JOIN oro_order o ON o.id = oli.order_id
+              WHERE TRUE{filtro_ordenes}
+          )"""
+
+        query_descuentos = f"""
         SELECT 
             d.line_item_id as line_item_id_externo,
             CAST(SUM(COALESCE(d.amount, 0.0)) AS NUMERIC(10,2)) as descuento_total
         FROM oro_promotion_applied_discount d
-        WHERE d.line_item_id IS NOT NULL
+        WHERE d.line_item_id IS NOT NULL{filtro_lineas}
         GROUP BY d.line_item_id
         """
 
         try:
-            df_descuentos = pd.read_sql_query(query_descuentos, self.oro_conn)
+            df_descuentos = pd.read_sql_query(
+                query_descuentos, self.oro_conn, params=params
+            )
             logger.info(
                 f"   ✓ Descuentos: {len(df_descuentos):,} line items con descuento"
             )
@@ -269,18 +308,20 @@ class CompleteFactBuilder:
         # =====================================================================
         # PASO 3: Obtener promoción principal por line item (solo 1 por línea)
         # =====================================================================
-        query_promociones = """
+        query_promociones = f"""
         SELECT DISTINCT ON (d.line_item_id)
             d.line_item_id as line_item_id_externo,
             pa.source_promotion_id as promocion_id_externo
         FROM oro_promotion_applied_discount d
         JOIN oro_promotion_applied pa ON d.applied_promotion_id = pa.id
-        WHERE d.line_item_id IS NOT NULL
+        WHERE d.line_item_id IS NOT NULL{filtro_lineas}
         ORDER BY d.line_item_id, d.amount DESC
         """
 
         try:
-            df_promociones = pd.read_sql_query(query_promociones, self.oro_conn)
+            df_promociones = pd.read_sql_query(
+                query_promociones, self.oro_conn, params=params
+            )
             logger.info(
                 f"   ✓ Promociones: {len(df_promociones):,} line items con promoción"
             )
@@ -306,27 +347,43 @@ class CompleteFactBuilder:
             logger.warning("   ⚠️  No hay datos en oro_order/oro_order_line_item")
             return pd.DataFrame()
 
-        iva_rate = 0.13
+        return self._transformar_ventas(df)
 
-        # Calcular subtotal después de descuento (ya incluye IVA en precios origen)
-        df["subtotal_incl_iva"] = df["subtotal_bruto"] - df["descuento_total"]
+    def _transformar_ventas(
+        self, df: pd.DataFrame, detalle: bool = True
+    ) -> pd.DataFrame:
+        """
+        Calcula IVA, costos y SKs de un lote de line items de fact_ventas
 
-        # Extraer IVA en vez de adicionarlo: precios ya vienen con IVA incluido
-        # Los datos de origen ya están en 2 decimales, redondear inmediatamente
-        df["subtotal"] = (df["subtotal_incl_iva"] / (1 + iva_rate)).round(2)
-        df["impuesto"] = (df["subtotal_incl_iva"] - df["subtotal"]).round(2)
-        df["total"] = df["subtotal_incl_iva"] + df["envio"]
+        Args:
+            df: Line items con descuento_total y promocion_id_externo
+            detalle: Loguear el detalle (False en chunks posteriores al primero)
+        """
+        log = logger.info if detalle else logger.debug
 
-        # Cargar dimensiones en memoria desde la base de datos DW
-        logger.info("   🔗 Cargando dimensiones desde DW...")
+        # Líneas sin precio (oli.value NULL): sus montos quedan NULL en
+        # fact_ventas, como antes; se calculan en 0 y se enmascaran
+        sin_precio = df["subtotal_bruto"].isna().to_numpy()
+        if sin_precio.any():
+            logger.warning(
+                f"   ⚠️  {int(sin_precio.sum()):,} líneas sin precio: montos NULL"
+            )
 
-        dim_fecha = pd.read_sql_query(
-            "SELECT fecha_id, fecha FROM dim_fecha", self.dw_conn
+        # Montos en centavos enteros: sin redondeos intermedios
+        subtotal_incl_iva = a_centavos(df["subtotal_bruto"].fillna(0.0)) - a_centavos(
+            df["descuento_total"]
         )
-        dim_impuestos = pd.read_sql_query(
-            "SELECT impuesto_id, codigo FROM dim_impuestos", self.dw_conn
-        )
-        # Note: dim_promocion uses sk_promocion as PK
+
+        # Extraer IVA en vez de adicionarlo: precios ya vienen con IVA incluido
+        subtotal, impuesto = separar_iva(subtotal_incl_iva)
+        total = subtotal_incl_iva + a_centavos(df["envio"])
+
+        df["subtotal"] = np.where(sin_precio, np.nan, a_montos(subtotal))
+        df["impuesto"] = np.where(sin_precio, np.nan, a_montos(impuesto))
+        df["total"] = np.where(sin_precio, np.nan, a_montos(total))
+
+        # Dimensiones desde la caché de surrogate keys (sin ida al DW por lote)
+        log("   🔗 Resolviendo dimensiones desde la caché de SKs...")
 
         # Para dimensiones que fallaron, usar IDs por defecto
         cliente_id_default = 1
@@ -335,45 +392,35 @@ class CompleteFactBuilder:
         usuario_id_default = 1
         line_item_id_default = 1
 
-        logger.info("   🔗 Resolviendo surrogate keys...")
-
-        # Convertir fechas a mismo tipo para merge
-        df["fecha"] = pd.to_datetime(df["fecha"])
-        dim_fecha["fecha"] = pd.to_datetime(dim_fecha["fecha"])
+        log("   🔗 Resolviendo surrogate keys...")
 
         # Resolver fecha_id
-        df = df.merge(
-            dim_fecha[["fecha_id", "fecha"]],
-            left_on="fecha",
-            right_on="fecha",
-            how="left",
-        )
-        df["fecha_id"] = df["fecha_id"].fillna(1).astype(int)
+        df["fecha"] = pd.to_datetime(df["fecha"])
+        df["fecha_id"] = self.sk_cache.lookup("dim_fecha", df["fecha"], default=1)
 
-        # Cargar dim_producto para obtener costos (producto_id ya es el de OroCommerce)
-        logger.info("   📦 Cargando dim_producto para costos...")
+        # Costos de dim_producto (producto_id ya es el de OroCommerce)
+        log("   📦 Resolviendo costos de dim_producto...")
         try:
-            dim_producto = pd.read_sql_query(
-                "SELECT producto_id, costo_estandar, precio_base FROM dim_producto",
-                self.dw_conn,
-            )
-
-            # Merge directo con producto_id (ya es el mismo que OroCommerce)
-            df = df.merge(
-                dim_producto[["producto_id", "costo_estandar"]],
-                on="producto_id",
-                how="left",
-            )
+            df["costo_estandar"] = self.sk_cache.lookup(
+                "dim_producto",
+                df["producto_id"],
+                key_column="producto_id",
+                value_column="costo_estandar",
+            ).astype(float)
 
             # Calcular costo_unitario, costo_total y margen basado en costo_estandar
-            df["costo_unitario"] = df["costo_estandar"].fillna(0.0)
-            df["costo_total"] = df["costo_unitario"] * df["cantidad"]
-            df["margen"] = df["subtotal"] - df["costo_total"]
+            costo_unitario = a_centavos(df["costo_estandar"].fillna(0.0))
+            costo_total = multiplicar(costo_unitario, df["cantidad"])
+            df["costo_unitario"] = a_montos(costo_unitario)
+            df["costo_total"] = a_montos(costo_total)
+            df["margen"] = np.where(
+                sin_precio, np.nan, a_montos(subtotal - costo_total)
+            )
 
-            logger.info(
+            log(
                 f"   ✓ Productos resueltos: {(df['producto_id'] > 1).sum():,} con ID real"
             )
-            logger.info(
+            log(
                 f"   ✓ Costos asignados: {(df['costo_unitario'] > 0).sum():,} registros con costo"
             )
 
@@ -388,13 +435,13 @@ class CompleteFactBuilder:
             df["margen"] = df["subtotal"]
 
         # ✅ orden_id ya es el ID de OroCommerce directamente
-        logger.info("   📋 orden_id ya es el de OroCommerce (sin merge necesario)")
-        logger.info(
+        log("   📋 orden_id ya es el de OroCommerce (sin merge necesario)")
+        log(
             f"   ✓ Ordenes: {df['orden_id'].nunique():,} únicas (ID = OroCommerce)"
         )
 
         # ✅ cliente_id ya es el ID de OroCommerce directamente
-        logger.info("   👥 cliente_id ya es el de OroCommerce (sin merge necesario)")
+        log("   👥 cliente_id ya es el de OroCommerce (sin merge necesario)")
         # Verificar que no haya NULLs (no deberían existir según oro_order)
         nulls_cliente = df["cliente_id"].isnull().sum()
         if nulls_cliente > 0:
@@ -405,65 +452,45 @@ class CompleteFactBuilder:
                 f"   ⚠️  Registros eliminados con cliente_id NULL: {nulls_cliente}"
             )
         df["cliente_id"] = df["cliente_id"].astype(int)
-        logger.info(
+        log(
             f"   ✓ Clientes: {df['cliente_id'].nunique():,} únicos (ID = OroCommerce)"
         )
 
         # ✅ usuario_id ya es el ID de OroCommerce directamente
-        logger.info("   👤 usuario_id ya es el de OroCommerce (sin merge necesario)")
+        log("   👤 usuario_id ya es el de OroCommerce (sin merge necesario)")
         # Asegurar que no haya NULLs
         df["usuario_id"] = df["usuario_id"].fillna(1).astype(int)
-        logger.info(
+        log(
             f"   ✓ Usuarios: {df['usuario_id'].nunique():,} únicos (ID = OroCommerce)"
         )
 
         # Resolver almacen_id - usar el primero disponible
-        logger.info("   🏪 Resolviendo almacen_id desde dim_almacen...")
+        log("   🏪 Resolviendo almacen_id desde dim_almacen...")
         try:
-            dim_almacen = pd.read_sql_query(
-                "SELECT almacen_id FROM dim_almacen LIMIT 1",
-                self.dw_conn,
-            )
-            almacen_default = (
-                dim_almacen["almacen_id"].iloc[0] if len(dim_almacen) > 0 else 1
-            )
-            df["almacen_id"] = almacen_default
+            df["almacen_id"] = self.sk_cache.first("dim_almacen")
         except Exception as e:
             logger.warning(f"   ⚠️  No se pudo resolver almacen_id: {e}")
             df["almacen_id"] = 1
 
         # Asignar impuesto_id (1=IVA 13%, 3=EXENTO)
-        df["impuesto_id"] = df["impuesto"].apply(lambda x: 1 if x > 0 else 3)
+        df["impuesto_id"] = np.where(df["impuesto"] > 0, 1, 3)
 
         # Renombrar columna de descuento para que coincida con el esquema
         df["descuento"] = df["descuento_total"]
 
         # Resolver sk_promocion desde dim_promocion
-        logger.info("   🎁 Resolviendo promociones desde dim_promocion...")
+        log("   🎁 Resolviendo promociones desde dim_promocion...")
         try:
-            dim_promocion = pd.read_sql_query(
-                "SELECT sk_promocion, id_promocion_source FROM dim_promocion",
-                self.dw_conn,
-            )
-
-            # Merge con las promociones
-            df = df.merge(
-                dim_promocion,
-                left_on="promocion_id_externo",
-                right_on="id_promocion_source",
-                how="left",
-            )
-
             # Si no hay promoción, usar 1 (Sin Promoción)
-            df["sk_promocion"] = df["sk_promocion"].fillna(1).astype(int)
+            df["sk_promocion"] = self.sk_cache.lookup(
+                "dim_promocion", df["promocion_id_externo"], default=1
+            )
 
             # Limpiar columnas temporales
-            df = df.drop(
-                columns=["promocion_id_externo", "id_promocion_source"], errors="ignore"
-            )
+            df = df.drop(columns=["promocion_id_externo"], errors="ignore")
 
             tiene_promocion = df["sk_promocion"] > 1
-            logger.info(
+            log(
                 f"   ✓ Promociones: {(~tiene_promocion).sum():,} sin promoción, {tiene_promocion.sum():,} con promoción"
             )
         except Exception as e:
@@ -508,19 +535,8 @@ class CompleteFactBuilder:
         df_final = df[fact_cols].copy()
         df_final["created_at"] = datetime.now()
 
-        # =====================================================================
-        # REDONDEO FINAL: Redondear columnas monetarias a 2 decimales
-        # Solo al final para minimizar errores de redondeo acumulados
-        # =====================================================================
-        columnas_monetarias = [
-            'cantidad', 'precio_unitario', 'subtotal', 'descuento', 
-            'impuesto', 'envio', 'total', 'costo_unitario', 'costo_total', 'margen'
-        ]
-        for col in columnas_monetarias:
-            if col in df_final.columns:
-                df_final[col] = df_final[col].round(2)
-        
-        logger.info("   ✓ Valores monetarios redondeados a 2 decimales")
+        # Los montos calculados ya son centavos exactos; las columnas que vienen
+        # directo de origen (NUMERIC(10,2)) no necesitan redondeo
 
         # =====================================================================
         # VALIDACIÓN FINAL: Verificar que no hay duplicados
@@ -533,28 +549,103 @@ class CompleteFactBuilder:
             df_final = df_final.drop_duplicates(
                 subset=["line_item_id_externo"], keep="first"
             )
-            logger.info(
+            log(
                 f"   ⚠️  Después de limpiar duplicados finales: {len(df_final):,} registros"
             )
 
         # Validar integridad: cada orden_id (OroCommerce ID) puede tener múltiples líneas
         # pero cada line_item_id_externo debe ser único
-        logger.info(f"   🔍 Validación de integridad:")
-        logger.info(
+        log(f"   🔍 Validación de integridad:")
+        log(
             f"      - Line items únicos: {df_final['line_item_id_externo'].nunique():,}"
         )
-        logger.info(
+        log(
             f"      - Órdenes únicas: {df_final['orden_id'].nunique():,} (ID OroCommerce)"
         )
-        logger.info(f"      - Productos únicos: {df_final['producto_id'].nunique():,}")
+        log(f"      - Productos únicos: {df_final['producto_id'].nunique():,}")
 
-        logger.info(f"   ✅ fact_ventas: {len(df_final):,} registros construidos")
-        logger.info(
+        log(f"   ✅ fact_ventas: {len(df_final):,} registros construidos")
+        log(
             f"   📊 IDs únicos: clientes={df_final['cliente_id'].nunique()}, productos={df_final['producto_id'].nunique()}, ordenes={df_final['orden_id'].nunique()}"
         )
 
         return df_final
 
+    def iter_fact_ventas(
+        self,
+        desde_updated_at: Optional[datetime] = None,
+        desde_line_item_id: Optional[int] = None,
+        ordenes: Optional[List[int]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Genera fact_ventas por chunks leyendo OroCommerce con cursor de servidor
+
+        Descuentos y promoción principal se resuelven en la misma consulta,
+        así cada chunk llega completo y la memoria depende de
+        extraction.itersize y no del histórico de órdenes.
+        """
+        logger.info("💰 Construyendo fact_ventas (streaming)...")
+
+        filtro_ordenes, params = self._filtro_ordenes_delta(
+            desde_updated_at, desde_line_item_id, ordenes
+        )
+
+        query = f"""
+        SELECT 
+            o.created_at::date as fecha,
+            o.id as orden_id,
+            o.customer_id as cliente_id,
+            o.user_owner_id as usuario_id,
+            oli.product_id as producto_id,
+            oli.id as line_item_id_externo,
+            CAST(oli.quantity AS NUMERIC(10,2)) as cantidad,
+            CAST(oli.value AS NUMERIC(10,2)) as precio_unitario,
+            CAST(oli.quantity * oli.value AS NUMERIC(10,2)) as subtotal_bruto,
+            CAST(0.0 AS NUMERIC(10,2)) as envio,
+            COALESCE(d.descuento_total, 0.0) as descuento_total,
+            p.promocion_id_externo
+        FROM oro_order o
+        INNER JOIN oro_order_line_item oli ON o.id = oli.order_id
+        LEFT JOIN (
+            SELECT 
+                line_item_id,
+                CAST(SUM(COALESCE(amount, 0.0)) AS NUMERIC(10,2)) as descuento_total
+            FROM oro_promotion_applied_discount
+            WHERE line_item_id IS NOT NULL
+            GROUP BY line_item_id
+        ) d ON d.line_item_id = oli.id
+        LEFT JOIN (
+            SELECT DISTINCT ON (d.line_item_id)
+                d.line_item_id,
+                pa.source_promotion_id as promocion_id_externo
+            FROM oro_promotion_applied_discount d
+            JOIN oro_promotion_applied pa ON d.applied_promotion_id = pa.id
+            WHERE d.line_item_id IS NOT NULL
+            ORDER BY d.line_item_id, d.amount DESC
+        ) p ON p.line_item_id = oli.id
+        WHERE o.created_at IS NOT NULL 
+          AND oli.product_id IS NOT NULL
+          AND oli.quantity > 0{filtro_ordenes}
+        ORDER BY oli.id
+        """
+
+        total = 0
+        chunks = 0
+        for chunk in self.stream_extractor.iter_chunks(
+            self.oro_conn, query, params, cursor_name="stream_fact_ventas"
+        ):
+            # Un chunk sin promociones llega como object: igualar al merge completo
+            chunk["promocion_id_externo"] = pd.to_numeric(
+                chunk["promocion_id_externo"]
+            )
+            df = self._transformar_ventas(chunk, detalle=chunks == 0)
+            chunks += 1
+            total += len(df)
+            logger.info(f"   📦 Chunk {chunks}: {total:,} line items acumulados")
+            yield df
+
+        logger.info(f"   ✅ fact_ventas: {total:,} registros en {chunks} chunks")
+
     def build_fact_inventario(self) -> pd.DataFrame:
         """
         Construir fact_inventario desde CSV movimientos_inventario.csv
@@ -563,69 +654,28 @@ class CompleteFactBuilder:
         logger.info("📦 Construyendo fact_inventario desde CSV...")
 
         csv_path = ROOT / "data" / "inputs" / "inventario" / "movimientos_inventario.csv"
-        df = pd.read_csv(csv_path)
+        df = self.extract_cache.read_csv(csv_path)
         logger.info(f"   📥 {len(df):,} movimientos cargados desde CSV")
 
         # Convertir fecha a fecha_id
         df["fecha_id"] = pd.to_datetime(df["fecha_movimiento"]).dt.strftime("%Y%m%d").astype(int)
         
-        # Cargar dimensiones
-        dim_producto = pd.read_sql_query(
-            "SELECT producto_id, producto_externo_id FROM dim_producto", self.dw_conn
-        )
-        dim_almacen = pd.read_sql_query(
-            "SELECT almacen_id, codigo FROM dim_almacen", self.dw_conn
+        # Resolver SKs desde la caché de dimensiones
+        usuario_default = int(self.sk_cache.minimum("dim_usuario"))
+        df["producto_id"] = self.sk_cache.lookup(
+            "dim_producto", df["id_producto"], default=1
         )
-        dim_proveedor = pd.read_sql_query(
-            "SELECT proveedor_id, codigo FROM dim_proveedor", self.dw_conn
+        df["almacen_id"] = self.sk_cache.lookup(
+            "dim_almacen", df["id_almacen"], default=1
         )
-        dim_tipo_mov = pd.read_sql_query(
-            "SELECT tipo_movimiento_id, codigo FROM dim_tipo_movimiento", self.dw_conn
+        # proveedor_id puede ser NULL: dejar NULL donde no aplica
+        df["proveedor_id"] = self.sk_cache.lookup(
+            "dim_proveedor", df["id_proveedor"].fillna("")
         )
-        dim_usuario = pd.read_sql_query(
-            "SELECT MIN(usuario_id) as usuario_id FROM dim_usuario", self.dw_conn
-        )
-        usuario_default = int(dim_usuario["usuario_id"].iloc[0])
-        
-        # Resolver producto_id
-        df["id_producto"] = df["id_producto"].astype(int)
-        dim_producto["producto_externo_id"] = dim_producto["producto_externo_id"].astype(int)
-        df = df.merge(
-            dim_producto.rename(columns={"producto_id": "producto_id_dim"}),
-            left_on="id_producto",
-            right_on="producto_externo_id",
-            how="left"
+        df["tipo_movimiento_id"] = self.sk_cache.lookup(
+            "dim_tipo_movimiento", df["id_tipo_movimiento"], default=1
         )
-        df["producto_id"] = df["producto_id_dim"].fillna(1).astype(int)
-        
-        # Resolver almacen_id
-        df = df.merge(
-            dim_almacen.rename(columns={"almacen_id": "almacen_id_dim"}),
-            left_on="id_almacen",
-            right_on="codigo",
-            how="left"
-        )
-        df["almacen_id"] = df["almacen_id_dim"].fillna(1).astype(int)
-        
-        # Resolver proveedor_id (puede ser NULL)
-        df["proveedor_codigo"] = df["id_proveedor"].fillna("")
-        df = df.merge(
-            dim_proveedor.rename(columns={"proveedor_id": "proveedor_id_dim"}),
-            left_on="proveedor_codigo",
-            right_on="codigo",
-            how="left"
-        )
-        df["proveedor_id"] = df["proveedor_id_dim"]  # Dejar NULL donde no aplica
-        
-        # Resolver tipo_movimiento_id
-        df = df.merge(
-            dim_tipo_mov.rename(columns={"tipo_movimiento_id": "tipo_mov_id_dim"}),
-            left_on="id_tipo_movimiento",
-            right_on="codigo",
-            how="left"
-        )
-        df["tipo_movimiento_id"] = df["tipo_mov_id_dim"].fillna(1).astype(int)
-        
+
         # Usuario y documento
         df["usuario_id"] = usuario_default
         df["documento"] = df["numero_documento"]
@@ -652,6 +702,10 @@ class CompleteFactBuilder:
         
         Lee desde OroCommerce, calcula IVA por línea, luego suma por orden.
         """
+        if self.streaming:
+            chunks = list(self.iter_fact_transacciones())
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
         logger.info("💳 Construyendo fact_transacciones desde OroCommerce...")
 
         # Leer líneas individuales de órdenes desde OroCommerce
@@ -696,54 +750,67 @@ class CompleteFactBuilder:
             logger.warning(f"   ⚠️ No se pudieron obtener descuentos: {e}")
             df_lineas["descuento_total"] = 0.0
 
-        # Calcular IVA POR LÍNEA usando la misma fórmula que fact_ventas
-        iva_rate = 0.13
-        df_lineas["subtotal_incl_iva"] = df_lineas["subtotal_bruto"] - df_lineas["descuento_total"]
-        df_lineas["subtotal"] = (df_lineas["subtotal_incl_iva"] / (1 + iva_rate)).round(2)
-        df_lineas["iva"] = (df_lineas["subtotal_incl_iva"] - df_lineas["subtotal"]).round(2)
-        df_lineas["total"] = df_lineas["subtotal_incl_iva"]
+        df, _ = self._transformar_transacciones(df_lineas)
+        return df
+
+    def _transformar_transacciones(
+        self, df_lineas: pd.DataFrame, asiento_inicial: int = 1, detalle: bool = True
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        Genera los asientos contables de un lote de líneas (órdenes completas)
+
+        Args:
+            df_lineas: Líneas con subtotal_bruto y descuento_total
+            asiento_inicial: Número del primer asiento del lote
+            detalle: Loguear el detalle (False en chunks posteriores al primero)
+
+        Returns:
+            (asientos, número del siguiente asiento)
+        """
+        log = logger.info if detalle else logger.debug
+
+        # Calcular IVA POR LÍNEA usando la misma fórmula que fact_ventas,
+        # en centavos enteros: las sumas por orden son exactas. Una línea sin
+        # precio suma 0 a su orden (la suma por orden ya omitía los NULL)
+        total = a_centavos(df_lineas["subtotal_bruto"].fillna(0.0)) - a_centavos(
+            df_lineas["descuento_total"]
+        )
+        subtotal, iva = separar_iva(total)
+        df_lineas["total"] = total
+        df_lineas["subtotal"] = subtotal
+        df_lineas["iva"] = iva
         
         # Convertir usuario_id a Int64 (nullable)
         df_lineas["usuario_id"] = df_lineas["usuario_id"].astype('Int64')
 
-        # AHORA agrupar por orden (sumando valores YA redondeados por línea)
+        # AHORA agrupar por orden (sumando centavos de cada línea)
         df_ventas = df_lineas.groupby(['orden_id', 'fecha', 'usuario_id'], dropna=False).agg({
             'total': 'sum',
             'subtotal': 'sum',
             'iva': 'sum'
         }).reset_index()
         
-        logger.info(f"   📊 Órdenes agrupadas: {len(df_ventas):,}")
+        log(f"   📊 Órdenes agrupadas: {len(df_ventas):,}")
 
         # Estimar costo (40% del subtotal - margen aproximado 60%)
-        df_ventas["costo_venta"] = (df_ventas["subtotal"] * 0.40).round(2)
+        df_ventas["costo_venta"] = aplicar_porcentaje(df_ventas["subtotal"], 40)
 
-        # Convertir fecha a fecha_id
+        # Convertir fecha a fecha_id (YYYYMMDD aritmético, sin strftime)
+        fechas = pd.to_datetime(df_ventas["fecha"]).dt
         df_ventas["fecha_id"] = (
-            pd.to_datetime(df_ventas["fecha"]).dt.strftime("%Y%m%d").astype(int)
-        )
-
-        # Cargar cuentas contables desde DW
-        dim_cuenta = pd.read_sql_query(
-            "SELECT cuenta_id, codigo, nombre FROM dim_cuenta_contable", self.dw_conn
+            fechas.year * 10000 + fechas.month * 100 + fechas.day
+        ).astype(int)
+
+        # Reglas de partida doble compiladas contra dim_cuenta_contable
+        motor = PostingEngine(
+            REGLAS_VENTA,
+            lambda codigos: self.sk_cache.lookup(
+                "dim_cuenta_contable", codigos, default=1
+            ),
         )
 
-        # Mapear cuentas por código (usar IDs existentes o defaults)
-        cuenta_map = {}
-        for _, row in dim_cuenta.iterrows():
-            cuenta_map[row["codigo"]] = row["cuenta_id"]
-
-        # Cuentas para asientos de ventas:
-        cuenta_ventas = cuenta_map.get("4101", 1)      # Ventas (Ingreso)
-        cuenta_bancos = cuenta_map.get("1102", 1)      # Bancos (Activo)
-        cuenta_iva = cuenta_map.get("2102", 1)         # IVA por Pagar (Pasivo)
-        cuenta_costo = cuenta_map.get("5101", 1)       # Costo de Ventas (Gasto)
-        cuenta_inventario = cuenta_map.get("1103", 1)  # Inventario (Activo)
-
-        # Cargar tipo_transaccion desde DW
-        dim_tipo = pd.read_sql_query(
-            "SELECT tipo_transaccion_id, codigo FROM dim_tipo_transaccion", self.dw_conn
-        )
+        # Tipo de transacción de venta (o el primero disponible)
+        dim_tipo = self.sk_cache.frame("dim_tipo_transaccion")
         tipo_venta = dim_tipo[
             dim_tipo["codigo"].str.contains("VENTA", case=False, na=False)
         ]
@@ -753,183 +820,164 @@ class CompleteFactBuilder:
             else int(dim_tipo["tipo_transaccion_id"].iloc[0])
         )
 
-        # Cargar centro de costo desde DW
-        dim_centro = pd.read_sql_query(
-            "SELECT centro_costo_id FROM dim_centro_costo LIMIT 1", self.dw_conn
+        centro_costo_id = int(self.sk_cache.first("dim_centro_costo"))
+        usuario_default = int(self.sk_cache.minimum("dim_usuario"))
+
+        # Generar asientos contables: una pierna por regla, todas las órdenes a la vez
+        piernas = motor.aplicar(df_ventas, referencia=df_ventas["orden_id"])
+        fila = piernas["fila"].to_numpy()
+        orden_txt = df_ventas["orden_id"].astype(str).to_numpy(dtype=object)
+        numeros = np.arange(asiento_inicial, asiento_inicial + len(df_ventas))
+        asiento_num = asiento_inicial + len(df_ventas)
+
+        df = pd.DataFrame(
+            {
+                "fecha_id": df_ventas["fecha_id"].to_numpy()[fila],
+                "cuenta_id": piernas["cuenta_id"].to_numpy(),
+                "centro_costo_id": centro_costo_id,
+                "tipo_transaccion_id": tipo_venta_id,
+                "usuario_id": df_ventas["usuario_id"]
+                .fillna(usuario_default)
+                .to_numpy(dtype="int64")[fila],
+                "numero_asiento": (
+                    "AST-" + pd.Series(numeros).astype(str).str.zfill(6)
+                ).to_numpy(dtype=object)[fila],
+                "tipo_movimiento": piernas["tipo_movimiento"].to_numpy(dtype=object),
+                "monto": a_montos(piernas["monto"]),
+                "documento_referencia": ("ORD-" + orden_txt)[fila],
+                "descripcion": piernas["descripcion"].to_numpy(dtype=object),
+                "orden_id": df_ventas["orden_id"].to_numpy()[fila],
+                "movimiento_inventario_id": None,
+            }
         )
-        centro_costo_id = int(dim_centro["centro_costo_id"].iloc[0])
 
-        # Cargar usuario desde DW
-        dim_usuario = pd.read_sql_query(
-            "SELECT MIN(usuario_id) as usuario_id FROM dim_usuario", self.dw_conn
+        # Débitos == créditos por asiento (número AST como entero), en centavos
+        descuadrados = verificar_partida_doble(
+            numeros[fila], df["tipo_movimiento"], piernas["monto"]
         )
-        usuario_default = int(dim_usuario["usuario_id"].iloc[0])
-
-        # Generar asientos contables
-        transacciones = []
-        asiento_num = 1
-
-        for _, venta in df_ventas.iterrows():
-            fecha_id = venta["fecha_id"]
-            orden_id = venta["orden_id"]
-            usuario_id = (
-                venta["usuario_id"]
-                if pd.notna(venta["usuario_id"])
-                else usuario_default
-            )
-
-            # Asiento 1: Débito a Bancos (entrada de efectivo)
-            transacciones.append(
-                {
-                    "fecha_id": fecha_id,
-                    "cuenta_id": cuenta_bancos,
-                    "centro_costo_id": centro_costo_id,
-                    "tipo_transaccion_id": tipo_venta_id,
-                    "usuario_id": usuario_id,
-                    "numero_asiento": f"AST-{asiento_num:06d}",
-                    "tipo_movimiento": "DEBITO",
-                    "monto": float(venta["total"]),
-                    "documento_referencia": f"ORD-{orden_id}",
-                    "descripcion": f"Cobro orden #{orden_id}",
-                    "orden_id": orden_id,
-                    "movimiento_inventario_id": None,
-                }
-            )
-
-            # Asiento 2: Crédito a Ventas (ingreso)
-            transacciones.append(
-                {
-                    "fecha_id": fecha_id,
-                    "cuenta_id": cuenta_ventas,
-                    "centro_costo_id": centro_costo_id,
-                    "tipo_transaccion_id": tipo_venta_id,
-                    "usuario_id": usuario_id,
-                    "numero_asiento": f"AST-{asiento_num:06d}",
-                    "tipo_movimiento": "CREDITO",
-                    "monto": float(venta["subtotal"]),
-                    "documento_referencia": f"ORD-{orden_id}",
-                    "descripcion": f"Ingreso venta orden #{orden_id}",
-                    "orden_id": orden_id,
-                    "movimiento_inventario_id": None,
-                }
+        if len(descuadrados) > 0:
+            logger.warning(
+                f"   ⚠️  {len(descuadrados):,} asientos con débitos != créditos "
+                f"(diferencia total {descuadrados['diferencia'].sum():,.2f})"
             )
 
-            # Asiento 3: Crédito a IVA por Pagar
-            if venta["iva"] > 0:
-                transacciones.append(
-                    {
-                        "fecha_id": fecha_id,
-                        "cuenta_id": cuenta_iva,
-                        "centro_costo_id": centro_costo_id,
-                        "tipo_transaccion_id": tipo_venta_id,
-                        "usuario_id": usuario_id,
-                        "numero_asiento": f"AST-{asiento_num:06d}",
-                        "tipo_movimiento": "CREDITO",
-                        "monto": float(venta["iva"]),
-                        "documento_referencia": f"ORD-{orden_id}",
-                        "descripcion": f"IVA venta orden #{orden_id}",
-                        "orden_id": orden_id,
-                        "movimiento_inventario_id": None,
-                    }
-                )
-
-            # Asiento 4: Débito a Costo de Ventas (reconocer el costo)
-            if venta["costo_venta"] > 0:
-                transacciones.append(
-                    {
-                        "fecha_id": fecha_id,
-                        "cuenta_id": cuenta_costo,
-                        "centro_costo_id": centro_costo_id,
-                        "tipo_transaccion_id": tipo_venta_id,
-                        "usuario_id": usuario_id,
-                        "numero_asiento": f"AST-{asiento_num:06d}",
-                        "tipo_movimiento": "DEBITO",
-                        "monto": float(venta["costo_venta"]),
-                        "documento_referencia": f"ORD-{orden_id}",
-                        "descripcion": f"Costo de venta orden #{orden_id}",
-                        "orden_id": orden_id,
-                        "movimiento_inventario_id": None,
-                    }
-                )
-
-            # Asiento 5: Crédito a Inventario (salida de inventario)
-            if venta["costo_venta"] > 0:
-                transacciones.append(
-                    {
-                        "fecha_id": fecha_id,
-                        "cuenta_id": cuenta_inventario,
-                        "centro_costo_id": centro_costo_id,
-                        "tipo_transaccion_id": tipo_venta_id,
-                        "usuario_id": usuario_id,
-                        "numero_asiento": f"AST-{asiento_num:06d}",
-                        "tipo_movimiento": "CREDITO",
-                        "monto": float(venta["costo_venta"]),
-                        "documento_referencia": f"ORD-{orden_id}",
-                        "descripcion": f"Salida inventario orden #{orden_id}",
-                        "orden_id": orden_id,
-                        "movimiento_inventario_id": None,
-                    }
-                )
-
-            asiento_num += 1
-
-        df = pd.DataFrame(transacciones)
         df["created_at"] = pd.Timestamp.now()
         
         # Calcular periodo_id desde fecha_id (YYYYMMDD -> YYYYMM)
         df["periodo_id"] = (df["fecha_id"] // 100).astype(int)
 
-        logger.info(f"   ✅ fact_transacciones: {len(df):,} asientos generados")
-        logger.info(
+        log(f"   ✅ fact_transacciones: {len(df):,} asientos generados")
+        log(
             f"   📊 Tipo movimiento: {df['tipo_movimiento'].value_counts().to_dict()}"
         )
-        logger.info(f"   📊 Cuentas únicas: {df['cuenta_id'].nunique()}")
+        log(f"   📊 Cuentas únicas: {df['cuenta_id'].nunique()}")
 
         # Seleccionar columnas del esquema (sin transaccion_id, es SERIAL)
-        return df[
-            [
-                "fecha_id",
-                "cuenta_id",
-                "centro_costo_id",
-                "tipo_transaccion_id",
-                "usuario_id",
-                "numero_asiento",
-                "tipo_movimiento",
-                "monto",
-                "documento_referencia",
-                "descripcion",
-                "orden_id",
-                "movimiento_inventario_id",
-                "created_at",
-                "periodo_id",
-            ]
+        columnas = [
+            "fecha_id",
+            "cuenta_id",
+            "centro_costo_id",
+            "tipo_transaccion_id",
+            "usuario_id",
+            "numero_asiento",
+            "tipo_movimiento",
+            "monto",
+            "documento_referencia",
+            "descripcion",
+            "orden_id",
+            "movimiento_inventario_id",
+            "created_at",
+            "periodo_id",
         ]
+        return df[columnas], asiento_num
+
+    def iter_fact_transacciones(self) -> Iterator[pd.DataFrame]:
+        """
+        Genera fact_transacciones por chunks leyendo con cursor de servidor
 
-    def build_fact_balance(self) -> pd.DataFrame:
+        Las líneas llegan ordenadas por orden; la última orden de cada chunk
+        se arrastra al siguiente para no partir sus asientos, y la numeración
+        AST-nnnnnn continúa entre chunks.
+        """
+        logger.info("💳 Construyendo fact_transacciones (streaming)...")
+
+        query = """
+        SELECT 
+            o.id as orden_id,
+            o.created_at::date as fecha,
+            o.user_owner_id as usuario_id,
+            oli.id as line_item_id,
+            CAST(oli.quantity * oli.value AS NUMERIC(10,2)) as subtotal_bruto,
+            COALESCE(d.descuento_total, 0.0) as descuento_total
+        FROM oro_order o
+        INNER JOIN oro_order_line_item oli ON o.id = oli.order_id
+        LEFT JOIN (
+            SELECT 
+                line_item_id,
+                CAST(SUM(COALESCE(amount, 0.0)) AS NUMERIC(10,2)) as descuento_total
+            FROM oro_promotion_applied_discount
+            WHERE line_item_id IS NOT NULL
+            GROUP BY line_item_id
+        ) d ON d.line_item_id = oli.id
+        WHERE o.created_at IS NOT NULL
+          AND oli.product_id IS NOT NULL
+          AND oli.quantity > 0
+        ORDER BY o.id
+        """
+
+        pendiente = None
+        asiento_num = 1
+        chunks = 0
+        total = 0
+        for chunk in self.stream_extractor.iter_chunks(
+            self.oro_conn, query, cursor_name="stream_fact_transacciones"
+        ):
+            if pendiente is not None:
+                chunk = pd.concat([pendiente, chunk], ignore_index=True)
+
+            # La última orden puede continuar en el siguiente chunk
+            en_curso = chunk["orden_id"] == chunk["orden_id"].iloc[-1]
+            pendiente = chunk[en_curso]
+            completas = chunk[~en_curso].reset_index(drop=True)
+            if completas.empty:
+                continue
+
+            df, asiento_num = self._transformar_transacciones(
+                completas, asiento_num, detalle=chunks == 0
+            )
+            chunks += 1
+            total += len(df)
+            yield df
+
+        if pendiente is not None and not pendiente.empty:
+            df, asiento_num = self._transformar_transacciones(
+                pendiente.reset_index(drop=True), asiento_num, detalle=chunks == 0
+            )
+            chunks += 1
+            total += len(df)
+            yield df
+
+        logger.info(
+            f"   ✅ fact_transacciones: {total:,} asientos en {chunks} chunks"
+        )
+
+    def build_fact_balance(
+        self, movimientos: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
         """
         Construir fact_balance desde fact_transacciones.
         Agrega movimientos contables por período y cuenta para generar Balance General.
         
         La cadena de datos es: OroCommerce → fact_transacciones → fact_balance
-        """
-        logger.info("📊 Construyendo fact_balance desde fact_transacciones...")
 
-        # Leer transacciones del DW y agrupar por período/cuenta
-        query = """
-        SELECT 
-            fecha_id / 100 as periodo_id,
-            cuenta_id,
-            centro_costo_id,
-            SUM(CASE WHEN tipo_movimiento = 'DEBITO' THEN monto ELSE 0 END) as debitos,
-            SUM(CASE WHEN tipo_movimiento = 'CREDITO' THEN monto ELSE 0 END) as creditos
-        FROM fact_transacciones
-        WHERE fecha_id IS NOT NULL
-        GROUP BY fecha_id / 100, cuenta_id, centro_costo_id
-        ORDER BY cuenta_id, periodo_id
+        Args:
+            movimientos: movimientos_por_cuenta de las transacciones recién
+                construidas; si es None se agregan leyendo fact_transacciones
         """
+        logger.info("📊 Construyendo fact_balance desde fact_transacciones...")
 
         try:
-            df = pd.read_sql_query(query, self.dw_conn)
+            df = self._movimientos_balance(movimientos)
             
             if df.empty:
                 logger.warning("   ⚠️ No hay datos en fact_transacciones")
@@ -937,47 +985,21 @@ class CompleteFactBuilder:
 
             logger.info(f"   📥 Registros agregados: {len(df):,} (cuenta/período)")
 
-            # Calcular saldos acumulativos por cuenta
-            df = df.sort_values(["cuenta_id", "periodo_id"])
-            
-            # Movimiento neto del período
-            df["movimiento_neto"] = df["debitos"] - df["creditos"]
-            
-            # Saldo acumulativo por cuenta
-            df["saldo_final"] = df.groupby("cuenta_id")["movimiento_neto"].cumsum()
-            df["saldo_inicial"] = df.groupby("cuenta_id")["saldo_final"].shift(1).fillna(0)
-            
-            # Redondear
-            for col in ["debitos", "creditos", "saldo_inicial", "saldo_final"]:
-                df[col] = df[col].round(2)
-
-            # Convertir tipos
-            df["periodo_id"] = df["periodo_id"].astype(int)
-            df["cuenta_id"] = df["cuenta_id"].astype(int)
-            df["centro_costo_id"] = df["centro_costo_id"].fillna(19).astype(int)
-            
-            # Generar fecha_id (YYYYMM → YYYYMM01)
-            df["fecha_id"] = (df["periodo_id"] * 100 + 1).astype(int)
-            df["created_at"] = pd.Timestamp.now()
-            
-            # Eliminar columna temporal
-            df = df.drop(columns=["movimiento_neto"])
-
-            result = df[["periodo_id", "cuenta_id", "centro_costo_id", "saldo_inicial", 
-                        "debitos", "creditos", "saldo_final", "fecha_id", "created_at"]]
+            # Saldo acumulativo por cuenta (saldo_inicial = saldo_final anterior)
+            result = self._formatear_balance(calcular_saldos(df))
 
             logger.info(f"   ✓ fact_balance: {len(result):,} registros construidos")
             logger.info(f"   Períodos: {result['periodo_id'].nunique()}, Cuentas: {result['cuenta_id'].nunique()}")
             
-            # Verificar balance
-            total_debitos = result["debitos"].sum()
-            total_creditos = result["creditos"].sum()
+            # Verificar balance (exacto, en centavos)
+            total_debitos = int(a_centavos(result["debitos"]).sum())
+            total_creditos = int(a_centavos(result["creditos"]).sum())
             diferencia = total_debitos - total_creditos
             
-            if abs(diferencia) < 0.01:
-                logger.info(f"   ✅ Balance verificado: Débitos=${total_debitos:,.2f} = Créditos=${total_creditos:,.2f}")
+            if diferencia == 0:
+                logger.info(f"   ✅ Balance verificado: Débitos=${total_debitos / 100:,.2f} = Créditos=${total_creditos / 100:,.2f}")
             else:
-                logger.warning(f"   ⚠️ Desbalance: ${diferencia:,.2f}")
+                logger.warning(f"   ⚠️ Desbalance: ${diferencia / 100:,.2f}")
 
             return result
 
@@ -987,29 +1009,175 @@ class CompleteFactBuilder:
             traceback.print_exc()
             return pd.DataFrame()
 
-        except Exception as e:
-            logger.error(f"❌ Error construyendo fact_balance: {e}")
-            import traceback
+    def build_fact_balance_incremental(
+        self, movimientos: Optional[pd.DataFrame] = None
+    ) -> Tuple[pd.DataFrame, List[int]]:
+        """
+        Recalcula fact_balance solo desde el primer período que cambió
 
-            traceback.print_exc()
-            df = pd.DataFrame(
-                columns=[
-                    "periodo_id",
-                    "cuenta_id",
-                    "centro_costo_id",
-                    "saldo_inicial",
-                    "debitos",
-                    "creditos",
-                    "saldo_final",
-                    "fecha_id",
-                    "created_at"
-                ]
+        Compara los débitos/créditos por período, cuenta y centro de costo
+        con los ya guardados en fact_balance. Desde el primer período
+        abierto con diferencias se recalcula todo hacia adelante, partiendo
+        del último saldo_final guardado de cada cuenta. Los períodos
+        cerrados en dim_periodo_contable no se reescriben: su saldo guardado
+        se arrastra como saldo_inicial del período siguiente.
+
+        Args:
+            movimientos: movimientos_por_cuenta de las transacciones recién
+                construidas; si es None se agregan leyendo fact_transacciones
+
+        Returns:
+            (filas recalculadas, períodos a reemplazar en fact_balance)
+        """
+        logger.info("📊 Actualizando fact_balance por período...")
+
+        actual = self._movimientos_balance(movimientos)
+        actual["centro_costo_id"] = actual["centro_costo_id"].fillna(19)
+        guardado = pd.read_sql_query(
+            """
+            SELECT periodo_id, cuenta_id, centro_costo_id, debitos, creditos, saldo_final
+            FROM fact_balance
+            """,
+            self.dw_conn,
+        )
+        for col in ["debitos", "creditos", "saldo_final"]:
+            guardado[col] = pd.to_numeric(guardado[col]).astype(float)
+        cerrados = self._periodos_cerrados()
+
+        # Períodos con alguna fila nueva, borrada o con otros montos
+        claves = ["periodo_id", "cuenta_id", "centro_costo_id"]
+        comparado = actual.merge(
+            guardado[claves + ["debitos", "creditos"]],
+            on=claves,
+            how="outer",
+            suffixes=("", "_guardado"),
+        )
+        distinto = np.zeros(len(comparado), dtype=bool)
+        for col in ["debitos", "creditos"]:
+            nuevo = np.rint(comparado[col].fillna(0).to_numpy(dtype=float) * 100)
+            previo = np.rint(
+                comparado[f"{col}_guardado"].fillna(0).to_numpy(dtype=float) * 100
+            )
+            distinto |= nuevo != previo
+        distinto |= comparado["debitos"].isna() != comparado["debitos_guardado"].isna()
+        tocados = set(comparado.loc[distinto, "periodo_id"].astype(int))
+
+        ignorados = sorted(tocados & cerrados)
+        if ignorados:
+            logger.warning(
+                f"   ⚠️  Cambios en períodos cerrados, se conservan: {ignorados}"
+            )
+        abiertos = tocados - cerrados
+        if not abiertos:
+            logger.info("   ✓ fact_balance: sin cambios en períodos abiertos")
+            return pd.DataFrame(), []
+
+        desde = min(abiertos)
+        periodos = sorted(
+            p
+            for p in set(actual["periodo_id"].astype(int))
+            | set(guardado["periodo_id"].astype(int))
+            if p >= desde and p not in cerrados
+        )
+
+        # Anclas: último saldo guardado antes de `desde` y períodos cerrados
+        previo = guardado[guardado["periodo_id"] < desde].sort_values(claves)
+        anclas = pd.concat(
+            [
+                previo.groupby("cuenta_id").tail(1),
+                guardado[
+                    (guardado["periodo_id"] >= desde)
+                    & guardado["periodo_id"].isin(cerrados)
+                ],
+            ]
+        )[claves + ["saldo_final"]]
+
+        recalcular = actual[
+            (actual["periodo_id"] >= desde) & ~actual["periodo_id"].isin(cerrados)
+        ]
+        result = self._formatear_balance(calcular_saldos(recalcular, anclas))
+
+        logger.info(
+            f"   ✓ fact_balance: {len(result):,} registros recalculados en "
+            f"{len(periodos)} períodos desde {desde} "
+            f"({len(guardado):,} guardados, {len(cerrados)} períodos cerrados)"
+        )
+        return result, periodos
+
+    def _movimientos_balance(
+        self, movimientos: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """Débitos y créditos por período/cuenta: en memoria o desde el DW"""
+        if movimientos is not None:
+            logger.info("   🧮 Agregando transacciones en memoria (sin releer el DW)")
+            return movimientos.copy()
+
+        # Leer transacciones del DW y agrupar por período/cuenta
+        query = """
+        SELECT 
+            fecha_id / 100 as periodo_id,
+            cuenta_id,
+            centro_costo_id,
+            SUM(CASE WHEN tipo_movimiento = 'DEBITO' THEN monto ELSE 0 END) as debitos,
+            SUM(CASE WHEN tipo_movimiento = 'CREDITO' THEN monto ELSE 0 END) as creditos
+        FROM fact_transacciones
+        WHERE fecha_id IS NOT NULL
+        GROUP BY fecha_id / 100, cuenta_id, centro_costo_id
+        ORDER BY cuenta_id, periodo_id
+        """
+        df = pd.read_sql_query(query, self.dw_conn)
+        for col in ["debitos", "creditos"]:
+            df[col] = pd.to_numeric(df[col]).astype(float)
+        return df
+
+    def _periodos_cerrados(self) -> set:
+        """periodo_id (YYYYMM) marcados como cerrados en dim_periodo_contable"""
+        tabla = (
+            self.config.get("loading", {})
+            .get("incremental", {})
+            .get("periodos_table", "dim_periodo_contable")
+        )
+        try:
+            df = pd.read_sql_query(
+                f"SELECT periodo_id FROM {tabla} WHERE cerrado", self.dw_conn
+            )
+            return set(df["periodo_id"].astype(int))
+        except Exception as e:
+            if not self.dw_conn.autocommit:
+                self.dw_conn.rollback()
+            logger.warning(
+                f"   ⚠️  Sin períodos cerrados ({tabla} no disponible): {e}"
             )
+            return set()
+
+    def _formatear_balance(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Redondeo, tipos y columnas finales de fact_balance"""
+        # Redondear
+        for col in ["debitos", "creditos", "saldo_inicial", "saldo_final"]:
+            df[col] = df[col].round(2)
+
+        # Convertir tipos
+        df["periodo_id"] = df["periodo_id"].astype(int)
+        df["cuenta_id"] = df["cuenta_id"].astype(int)
+        df["centro_costo_id"] = df["centro_costo_id"].fillna(19).astype(int)
+        
+        # Generar fecha_id (YYYYMM → YYYYMM01)
+        df["fecha_id"] = (df["periodo_id"] * 100 + 1).astype(int)
+        df["created_at"] = pd.Timestamp.now()
 
-        return df[["periodo_id", "cuenta_id", "centro_costo_id", "saldo_inicial", "debitos", "creditos", "saldo_final", "fecha_id", "created_at"]]
+        return df[["periodo_id", "cuenta_id", "centro_costo_id", "saldo_inicial", 
+                   "debitos", "creditos", "saldo_final", "fecha_id", "created_at"]]
+
+    def build_fact_estado_resultados(
+        self, movimientos: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """
+        Construir fact_estado_resultados desde CSV o fact_transacciones
 
-    def build_fact_estado_resultados(self) -> pd.DataFrame:
-        """Construir fact_estado_resultados desde CSV o fact_transacciones"""
+        Args:
+            movimientos: movimientos_por_cuenta de las transacciones recién
+                construidas; si es None se agregan leyendo fact_transacciones
+        """
         logger.info("📈 Construyendo fact_estado_resultados...")
 
         # Primero intentar cargar desde CSV
@@ -1017,7 +1185,7 @@ class CompleteFactBuilder:
         if csv_path.exists():
             logger.info(f"   📂 Cargando desde CSV: {csv_path}")
             try:
-                df = pd.read_csv(csv_path)
+                df = self.extract_cache.read_csv(csv_path)
 
                 # Eliminar fecha_id del CSV si existe (lo recalcularemos)
                 if "fecha_id" in df.columns:
@@ -1096,38 +1264,30 @@ class CompleteFactBuilder:
         """
 
         try:
-            df = pd.read_sql_query(query, self.dw_conn)
+            if movimientos is not None:
+                # Mismo INNER JOIN con dim_cuenta_contable, contra la caché de SKs
+                logger.info("   🧮 Agregando transacciones en memoria (sin releer el DW)")
+                df_codigos = self.sk_cache.frame("dim_cuenta_contable")
+                df_codigos = df_codigos.loc[
+                    df_codigos["codigo"].notna(), ["cuenta_id", "codigo"]
+                ]
+                df = movimientos[movimientos["cuenta_id"].notna()].merge(
+                    df_codigos, on="cuenta_id", how="inner"
+                )
+            else:
+                df = pd.read_sql_query(query, self.dw_conn)
 
-            # Agregar código de cuenta para clasificación
-            query_codigos = """
-            SELECT cuenta_id, codigo 
-            FROM dim_cuenta_contable
-            """
-            df_codigos = pd.read_sql_query(query_codigos, self.dw_conn)
-            df = df.merge(df_codigos, on='cuenta_id', how='left')
-
-            # Clasificar cuentas por código contable
-            # 4101 = Ventas (ingresos - CRÉDITO)
-            # 5101 = Costo de Ventas (costos - DÉBITO) 
-            # 6xxx = Gastos operativos (gastos - DÉBITO)
-            def clasificar_y_calcular_monto(row):
-                codigo = str(row['codigo'])
-                
-                # Ingresos: cuenta 4xxx - usar CRÉDITOS
-                if codigo.startswith('4'):
-                    return 'ingreso', row['creditos']
-                # Costos: cuenta 5xxx - usar DÉBITOS
-                elif codigo.startswith('5'):
-                    return 'costo', row['debitos']
-                # Gastos: cuenta 6xxx - usar DÉBITOS  
-                elif codigo.startswith('6'):
-                    return 'gasto', row['debitos']
-                else:
-                    return 'otro', 0
-            
-            df[['tipo_cuenta', 'monto_clasificado']] = df.apply(
-                clasificar_y_calcular_monto, axis=1, result_type='expand'
-            )
+                # Agregar código de cuenta para clasificación
+                query_codigos = """
+                SELECT cuenta_id, codigo 
+                FROM dim_cuenta_contable
+                """
+                df_codigos = pd.read_sql_query(query_codigos, self.dw_conn)
+                df = df.merge(df_codigos, on='cuenta_id', how='left')
+
+            # Clasificar cuentas por código contable (CLASIFICACION_RESULTADOS):
+            # 4xxx ingresos por créditos, 5xxx costos y 6xxx gastos por débitos
+            df["tipo_cuenta"], df["monto_clasificado"] = clasificar_resultados(df)
 
             # Agrupar SOLO por período y centro de costo (CONSOLIDANDO todas las cuentas)
             agrupado = df.groupby(['periodo_id', 'centro_costo_id', 'tipo_cuenta']).agg({
@@ -1152,16 +1312,10 @@ class CompleteFactBuilder:
 
             # Obtener el cuenta_id de cualquier cuenta de ingresos (4101 - Ventas)
             # Ya que consolidamos, usamos la cuenta de ingresos como referencia
-            query_cuenta_ref = """
-            SELECT cuenta_id FROM dim_cuenta_contable 
-            WHERE codigo = '4101' LIMIT 1
-            """
-            cuenta_ref_df = pd.read_sql_query(query_cuenta_ref, self.dw_conn)
-            if len(cuenta_ref_df) > 0:
-                cuenta_id_ref = int(cuenta_ref_df['cuenta_id'].iloc[0])
-            else:
-                # Fallback: usar la primera cuenta disponible
-                cuenta_id_ref = 1850
+            # (si no existe: fallback a la primera cuenta disponible)
+            cuenta_id_ref = int(
+                self.sk_cache.lookup("dim_cuenta_contable", ["4101"], default=1850)[0]
+            )
             
             pivot['cuenta_id'] = cuenta_id_ref  # Usar cuenta de Ventas como referencia
 
@@ -1233,8 +1387,4 @@ class CompleteFactBuilder:
 
     def __del__(self):
         """Cerrar conexiones"""
-        try:
-            self.oro_conn.close()
-            self.dw_conn.close()
-        except:
-            pass
+        self.close()
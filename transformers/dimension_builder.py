@@ -11,6 +11,8 @@ from pathlib import Path
 import logging
 from datetime import datetime, timedelta
 
+from transformers.calendario import nombres_feriado
+
 
 class DimensionBuilder:
     """Constructor de dimensiones del data warehouse"""
@@ -113,7 +115,9 @@ class DimensionBuilder:
         df = pd.DataFrame({"fecha": date_range})
 
         # Calcular campos
-        df["id_fecha"] = df["fecha"].dt.strftime("%Y%m%d").astype(int)
+        df["id_fecha"] = (
+            df["fecha"].dt.year * 10000 + df["fecha"].dt.month * 100 + df["fecha"].dt.day
+        ).astype(int)
         df["año"] = df["fecha"].dt.year
         df["mes"] = df["fecha"].dt.month
         df["dia"] = df["fecha"].dt.day
@@ -123,25 +127,10 @@ class DimensionBuilder:
         df["trimestre"] = df["fecha"].dt.quarter
         df["semestre"] = (df["mes"] - 1) // 6 + 1
         df["es_fin_semana"] = df["dia_semana"].isin([5, 6])
-        df["es_feriado"] = df["fecha"].apply(self._is_holiday)
+        df["es_feriado"] = nombres_feriado(df["fecha"]) != ""
 
         return df
 
-    def _is_holiday(self, date: pd.Timestamp) -> bool:
-        """Determina si una fecha es feriado de El Salvador"""
-        feriados = [
-            (1, 1),  # Año Nuevo
-            (5, 1),  # Día del Trabajo
-            (5, 10),  # Día de la Madre
-            (6, 17),  # Día del Padre
-            (8, 6),  # Fiestas Patronales
-            (9, 15),  # Día de la Independencia
-            (11, 2),  # Día de los Difuntos
-            (12, 25),  # Navidad
-        ]
-
-        return (date.month, date.day) in feriados
-
     def _build_dim_detalle_venta(self) -> pd.DataFrame:
         """Construye dimensión de detalle de venta"""
         self.logger.info("Construyendo dim_detalle_venta...")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+DINERO - ARITMÉTICA DE PUNTO FIJO EN CENTAVOS
+=============================================
+Los montos se llevan una sola vez a enteros int64 en centavos y todo el
+cálculo (IVA incluido, descuentos, costos, sumas por orden) se hace con
+aritmética entera vectorizada. No hay redondeos intermedios ni errores
+de punto flotante: la suma de las partes es exactamente el total.
+
+Los redondeos son "mitad lejos de cero", como NUMERIC en PostgreSQL.
+"""
+
+import numpy as np
+import pandas as pd
+
+# IVA de El Salvador (porcentaje entero)
+IVA_PORCENTAJE = 13
+
+
+def a_centavos(valores) -> np.ndarray:
+    """
+    Montos (float, Decimal o texto numérico) -> int64 en centavos
+
+    PostgreSQL redondea sobre el texto del número (1.005 -> 1.01), no sobre
+    su binario (1.00499...): el margen de 1e-6 centavos absorbe ese error
+    de representación.
+
+    Raises:
+        ValueError: Si hay nulos o valores no numéricos; el llamador decide
+            cómo resolverlos (fillna, filtro) antes de convertir
+    """
+    montos = pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(dtype=float)
+    nulos = np.isnan(montos)
+    if nulos.any():
+        raise ValueError(
+            f"a_centavos: {int(nulos.sum())} montos nulos o no numéricos "
+            f"(primera posición {int(np.argmax(nulos))})"
+        )
+    return (np.sign(montos) * np.floor(np.abs(montos) * 100 + 0.5 + 1e-6)).astype(
+        np.int64
+    )
+
+
+def a_montos(centavos) -> np.ndarray:
+    """int64 en centavos -> float64 con dos decimales"""
+    return np.asarray(centavos, dtype=np.int64) / 100
+
+
+def dividir_redondeando(numerador, denominador: int) -> np.ndarray:
+    """Cociente entero redondeado mitad lejos de cero (denominador > 0)"""
+    numerador = np.asarray(numerador, dtype=np.int64)
+    cociente = (np.abs(numerador) * 2 + denominador) // (2 * denominador)
+    return np.sign(numerador) * cociente
+
+
+def separar_iva(con_iva, porcentaje: int = IVA_PORCENTAJE):
+    """
+    Separa un precio con IVA incluido en base e impuesto
+
+    base = round(con_iva / 1.13), en enteros: round(c * 100 / 113)
+
+    Returns:
+        (base, iva) en centavos; base + iva == con_iva exactamente
+    """
+    con_iva = np.asarray(con_iva, dtype=np.int64)
+    base = dividir_redondeando(con_iva * 100, 100 + porcentaje)
+    return base, con_iva - base
+
+
+def aplicar_porcentaje(centavos, porcentaje: int) -> np.ndarray:
+    """Porcentaje entero de un monto, redondeado al centavo"""
+    return dividir_redondeando(np.asarray(centavos, dtype=np.int64) * porcentaje, 100)
+
+
+def multiplicar(centavos, cantidad) -> np.ndarray:
+    """Monto unitario por una cantidad con hasta dos decimales"""
+    return dividir_redondeando(
+        np.asarray(centavos, dtype=np.int64) * a_centavos(cantidad), 100
+    )
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+POSTING RULES - REGLAS DE PARTIDA DOBLE
+=======================================
+Tabla declarativa de las piernas contables que genera cada venta y de la
+clasificación de cuentas del estado de resultados. Las reglas se compilan
+una vez a arreglos y se aplican a todas las filas con operaciones
+vectorizadas: agregar una regla no agrega un loop en Python.
+
+También agrega los asientos por período y cuenta para el balance y el
+estado de resultados sin releerlos del DW.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PostingRule:
+    """Una pierna de asiento: medida de origen, cuenta, lado y condición"""
+
+    cuenta_codigo: str
+    lado: str  # DEBITO o CREDITO
+    medida: str  # Columna del DataFrame de origen con el monto
+    descripcion: str  # Prefijo; se completa con la referencia de la fila
+    condicion: Optional[str] = None  # Expresión de DataFrame.eval (p.ej. "iva > 0")
+
+
+# Asiento de una venta: cobro, ingreso, IVA y salida de inventario al costo
+REGLAS_VENTA: Tuple[PostingRule, ...] = (
+    PostingRule("1102", "DEBITO", "total", "Cobro orden #"),
+    PostingRule("4101", "CREDITO", "subtotal", "Ingreso venta orden #"),
+    PostingRule("2102", "CREDITO", "iva", "IVA venta orden #", "iva > 0"),
+    PostingRule(
+        "5101", "DEBITO", "costo_venta", "Costo de venta orden #", "costo_venta > 0"
+    ),
+    PostingRule(
+        "1103",
+        "CREDITO",
+        "costo_venta",
+        "Salida inventario orden #",
+        "costo_venta > 0",
+    ),
+)
+
+# Estado de resultados: prefijo de código -> (tipo de cuenta, columna del monto)
+CLASIFICACION_RESULTADOS: Tuple[Tuple[str, str, str], ...] = (
+    ("4", "ingreso", "creditos"),  # Ingresos: créditos
+    ("5", "costo", "debitos"),  # Costo de ventas: débitos
+    ("6", "gasto", "debitos"),  # Gastos operativos: débitos
+)
+
+
+class PostingEngine:
+    """Aplica un conjunto de PostingRule a un DataFrame de origen"""
+
+    def __init__(
+        self,
+        reglas: Sequence[PostingRule],
+        resolver_cuentas: Callable[[Sequence[str]], np.ndarray],
+    ):
+        """
+        Args:
+            reglas: Piernas en el orden en que se generan dentro de un asiento
+            resolver_cuentas: Función código -> cuenta_id (vectorizada)
+        """
+        lados = {regla.lado for regla in reglas}
+        if not lados <= {"DEBITO", "CREDITO"}:
+            raise ValueError(f"Lado contable desconocido: {lados}")
+
+        self.reglas = tuple(reglas)
+
+        # Compilar una sola vez: una entrada por regla
+        self._cuentas = np.asarray(
+            resolver_cuentas([regla.cuenta_codigo for regla in self.reglas])
+        )
+        self._lados = np.array([regla.lado for regla in self.reglas], dtype=object)
+        self._descripciones = np.array(
+            [regla.descripcion for regla in self.reglas], dtype=object
+        )
+
+    def aplicar(self, df: pd.DataFrame, referencia: pd.Series) -> pd.DataFrame:
+        """
+        Genera las piernas de todas las filas de df
+
+        Args:
+            df: Una fila por asiento, con las columnas de medida de las reglas
+            referencia: Texto que completa la descripción de cada fila
+
+        Returns:
+            DataFrame con fila (posición en df), cuenta_id, tipo_movimiento,
+            monto y descripcion, ordenado por fila y luego por regla
+        """
+        genera = np.column_stack(
+            [self._condicion(df, regla) for regla in self.reglas]
+        ).reshape(len(df), len(self.reglas))
+        montos = np.column_stack(
+            # Sin forzar float: medidas en centavos int64 se conservan exactas
+            [df[regla.medida].to_numpy() for regla in self.reglas]
+        ).reshape(len(df), len(self.reglas))
+
+        # nonzero recorre por filas: asiento y luego regla
+        fila, regla = np.nonzero(genera)
+        referencia = referencia.astype(str).to_numpy(dtype=object)
+
+        return pd.DataFrame(
+            {
+                "fila": fila,
+                "cuenta_id": self._cuentas[regla],
+                "tipo_movimiento": self._lados[regla],
+                "monto": montos[fila, regla],
+                "descripcion": self._descripciones[regla] + referencia[fila],
+            }
+        )
+
+    def _condicion(self, df: pd.DataFrame, regla: PostingRule) -> np.ndarray:
+        if regla.condicion is None:
+            return np.ones(len(df), dtype=bool)
+        return df.eval(regla.condicion).to_numpy(dtype=bool)
+
+
+def verificar_partida_doble(asientos, tipo_movimiento, centavos) -> pd.DataFrame:
+    """
+    Verifica débitos == créditos por asiento, en bloque
+
+    Args:
+        centavos: Monto de cada pierna en centavos enteros (comparación exacta)
+
+    Returns:
+        Asientos descuadrados con su diferencia (vacío si todo cuadra)
+    """
+    codigos, unicos = pd.factorize(np.asarray(asientos))
+    centavos = np.asarray(centavos, dtype=np.int64)
+    signo = np.where(np.asarray(tipo_movimiento) == "DEBITO", 1, -1)
+
+    # bincount suma en float; np.add.at mantiene enteros
+    saldo = np.zeros(len(unicos), dtype=np.int64)
+    np.add.at(saldo, codigos, centavos * signo)
+    descuadre = saldo != 0
+
+    return pd.DataFrame(
+        {
+            "numero_asiento": np.asarray(unicos)[descuadre],
+            "diferencia": saldo[descuadre] / 100,
+        }
+    )
+
+
+def movimientos_por_cuenta(transacciones: pd.DataFrame) -> pd.DataFrame:
+    """
+    Débitos y créditos por período, cuenta y centro de costo
+
+    Equivale al GROUP BY fecha_id / 100, cuenta_id, centro_costo_id sobre
+    fact_transacciones, pero sobre el DataFrame que se acaba de cargar.
+    Suma en centavos enteros, como NUMERIC(., 2) en el DW.
+
+    Args:
+        transacciones: Filas de fact_transacciones (o un chunk de ellas)
+
+    Returns:
+        DataFrame con periodo_id, cuenta_id, centro_costo_id, debitos y creditos
+    """
+    df = transacciones[transacciones["fecha_id"].notna()]
+    centavos = np.rint(df["monto"].to_numpy(dtype=float) * 100).astype(np.int64)
+    es_debito = df["tipo_movimiento"].to_numpy() == "DEBITO"
+
+    agregado = (
+        pd.DataFrame(
+            {
+                "periodo_id": df["fecha_id"].to_numpy(dtype=np.int64) // 100,
+                "cuenta_id": df["cuenta_id"].to_numpy(),
+                "centro_costo_id": df["centro_costo_id"].to_numpy(),
+                "debitos": np.where(es_debito, centavos, 0),
+                "creditos": np.where(es_debito, 0, centavos),
+            }
+        )
+        .groupby(["periodo_id", "cuenta_id", "centro_costo_id"], dropna=False)
+        .sum()
+        .reset_index()
+    )
+    return _a_montos(agregado)
+
+
+def combinar_movimientos(partes: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Suma los movimientos_por_cuenta de varios chunks en uno solo"""
+    partes = [parte for parte in partes if len(parte) > 0]
+    if not partes:
+        return pd.DataFrame(
+            columns=["periodo_id", "cuenta_id", "centro_costo_id", "debitos", "creditos"]
+        )
+
+    df = pd.concat(partes, ignore_index=True)
+    for columna in ("debitos", "creditos"):
+        df[columna] = np.rint(df[columna].to_numpy(dtype=float) * 100).astype(np.int64)
+
+    agregado = (
+        df.groupby(["periodo_id", "cuenta_id", "centro_costo_id"], dropna=False)
+        .sum()
+        .reset_index()
+    )
+    return _a_montos(agregado)
+
+
+def calcular_saldos(
+    movimientos: pd.DataFrame, anclas: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Saldos acumulados por cuenta (orden: cuenta, período, centro de costo)
+
+    saldo_final acumula débitos - créditos de la cuenta y saldo_inicial es
+    el saldo_final de la fila anterior de la misma cuenta. Las anclas son
+    filas con saldo_final ya fijado (último saldo antes del primer período
+    a recalcular, o períodos cerrados): el acumulado se reinicia en su valor
+    y no se retornan.
+
+    Args:
+        movimientos: periodo_id, cuenta_id, centro_costo_id, debitos, creditos
+        anclas: periodo_id, cuenta_id, centro_costo_id, saldo_final
+
+    Returns:
+        movimientos ordenados con saldo_inicial y saldo_final
+    """
+    df = movimientos.assign(_ancla=False)
+    if anclas is not None and len(anclas) > 0:
+        df = pd.concat([df, anclas.assign(_ancla=True)], ignore_index=True)
+    df = df.sort_values(["cuenta_id", "periodo_id", "centro_costo_id"], kind="stable")
+
+    # En centavos enteros: el acumulado no arrastra error de punto flotante
+    ancla = df["_ancla"].to_numpy(dtype=bool)
+    neto = df["debitos"].to_numpy(dtype=float) - df["creditos"].to_numpy(dtype=float)
+    if "saldo_final" in df.columns:
+        valor = np.where(ancla, df["saldo_final"].to_numpy(dtype=float), neto)
+    else:
+        valor = neto
+    centavos = pd.Series(np.rint(valor * 100).astype(np.int64), index=df.index)
+
+    # Cada ancla abre un tramo nuevo del acumulado de su cuenta
+    tramo = df.groupby("cuenta_id")["_ancla"].cumsum()
+    saldo_final = centavos.groupby([df["cuenta_id"], tramo]).cumsum()
+    saldo_inicial = saldo_final.groupby(df["cuenta_id"]).shift(1).fillna(0)
+
+    df["saldo_final"] = saldo_final.to_numpy(dtype=float) / 100
+    df["saldo_inicial"] = saldo_inicial.to_numpy(dtype=float) / 100
+    return df[~ancla].drop(columns=["_ancla"])
+
+
+def _a_montos(agregado: pd.DataFrame) -> pd.DataFrame:
+    """Centavos -> montos con dos decimales"""
+    for columna in ("debitos", "creditos"):
+        agregado[columna] = agregado[columna].to_numpy(dtype=float) / 100
+    return agregado
+
+
+def clasificar_resultados(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clasifica cuentas del estado de resultados por prefijo de código
+
+    Args:
+        df: Saldos por cuenta con columnas codigo, debitos y creditos
+
+    Returns:
+        (tipo_cuenta, monto_clasificado); las cuentas sin regla quedan
+        como 'otro' con monto 0
+    """
+    codigo = df["codigo"].astype(str)
+    condiciones = [
+        codigo.str.startswith(prefijo, na=False).to_numpy()
+        for prefijo, _, _ in CLASIFICACION_RESULTADOS
+    ]
+    tipos = np.select(
+        condiciones, [tipo for _, tipo, _ in CLASIFICACION_RESULTADOS], "otro"
+    )
+    montos = np.select(
+        condiciones,
+        [
+            df[columna].to_numpy(dtype=float)
+            for _, _, columna in CLASIFICACION_RESULTADOS
+        ],
+        0.0,
+    )
+    return tipos, montos
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+SURROGATE KEY CACHE - LOOKUPS DE DIMENSIONES EN MEMORIA
+=======================================================
+Guarda una vez por corrida las columnas de cada dimensión que usan los
+fact builders (clave natural, surrogate key y atributos) e indexa la
+clave con un hash index de pandas. Las facts resuelven sus SKs con
+lookups vectorizados en lugar de volver a consultar el DW.
+
+Las dimensiones se registran desde los DataFrames recién cargados
+cuando estos ya traen la SK (carga completa); el resto se lee del DW
+una sola vez, la primera vez que se piden. Es seguro compartirla entre
+los hilos que cargan dimensiones y los que construyen facts.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+
+# Dimensión -> (clave natural, surrogate key, atributos usados por las facts)
+DIMENSIONES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "dim_fecha": ("fecha", "fecha_id", ()),
+    # costo_estandar se lee del DW: la escala NUMERIC de la columna manda
+    "dim_producto": ("producto_externo_id", "producto_id", ("costo_estandar",)),
+    "dim_usuario": ("usuario_id", "usuario_id", ()),
+    "dim_almacen": ("codigo", "almacen_id", ()),
+    "dim_proveedor": ("codigo", "proveedor_id", ()),
+    "dim_tipo_movimiento": ("codigo", "tipo_movimiento_id", ()),
+    "dim_cuenta_contable": ("codigo", "cuenta_id", ()),
+    "dim_tipo_transaccion": ("codigo", "tipo_transaccion_id", ()),
+    "dim_centro_costo": ("codigo", "centro_costo_id", ()),
+    "dim_promocion": ("id_promocion_source", "sk_promocion", ()),
+}
+
+
+class SurrogateKeyCache:
+    """Caché de dimensiones con lookups vectorizados de surrogate keys"""
+
+    def __init__(self, dw_conn=None, config: Dict[str, Any] = None):
+        self.dw_conn = dw_conn
+        self.config = config or {}
+        self.logger = logging.getLogger(__name__)
+
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._origen: Dict[str, str] = {}
+        # (dimensión, columna clave) -> (índice hash, posiciones en el frame)
+        self._indices: Dict[Tuple[str, str], Tuple[pd.Index, np.ndarray]] = {}
+        self._lock = threading.RLock()
+
+    def register(self, dim_name: str, df: pd.DataFrame) -> bool:
+        """
+        Registra una dimensión desde el DataFrame que se acaba de cargar
+
+        Solo aplica si df trae todas las columnas del catálogo y ningún
+        atributo (los atributos se leen con el tipo del DW).
+
+        Returns:
+            True si quedó registrada; False si debe leerse del DW
+        """
+        if dim_name not in DIMENSIONES:
+            return False
+
+        natural, sk, atributos = DIMENSIONES[dim_name]
+        columnas = list(dict.fromkeys([natural, sk]))
+        if atributos or not set(columnas).issubset(df.columns):
+            self.invalidate(dim_name)
+            return False
+
+        # Con ON CONFLICT DO NOTHING gana la primera fila de cada clave
+        frame = df[columnas].drop_duplicates(subset=[sk], keep="first")
+        self._guardar(dim_name, frame.reset_index(drop=True), "memoria")
+        return True
+
+    def load(self, dim_name: str) -> pd.DataFrame:
+        """Lee del DW las columnas del catálogo de una dimensión (una consulta)"""
+        if self.dw_conn is None:
+            raise ValueError(f"Sin conexión al DW para leer {dim_name}")
+
+        natural, sk, atributos = DIMENSIONES[dim_name]
+        columnas = list(dict.fromkeys([natural, sk, *atributos]))
+        frame = pd.read_sql_query(
+            f"SELECT {', '.join(columnas)} FROM {dim_name}", self.dw_conn
+        )
+        self._guardar(dim_name, frame, "dw")
+        return frame
+
+    def invalidate(self, dim_name: Optional[str] = None):
+        """Descarta una dimensión (o todas) para releerla en el próximo uso"""
+        with self._lock:
+            nombres = [dim_name] if dim_name else list(self._frames)
+            for nombre in nombres:
+                self._frames.pop(nombre, None)
+                self._origen.pop(nombre, None)
+                for clave in [k for k in self._indices if k[0] == nombre]:
+                    del self._indices[clave]
+
+    def frame(self, dim_name: str) -> pd.DataFrame:
+        """Copia de las columnas guardadas de la dimensión"""
+        return self._frame(dim_name).copy()
+
+    def lookup(
+        self,
+        dim_name: str,
+        natural_keys,
+        key_column: Optional[str] = None,
+        value_column: Optional[str] = None,
+        default=None,
+    ) -> np.ndarray:
+        """
+        Resuelve claves contra una dimensión
+
+        Args:
+            dim_name: Dimensión del catálogo
+            natural_keys: Claves a resolver (Series, array o lista)
+            key_column: Columna de búsqueda (por defecto la clave natural)
+            value_column: Columna a retornar (por defecto la surrogate key)
+            default: Valor para claves sin match; si es None quedan NaN
+
+        Returns:
+            Array alineado con natural_keys
+        """
+        natural, sk, _ = DIMENSIONES[dim_name]
+        key_column = key_column or natural
+        value_column = value_column or sk
+
+        with self._lock:
+            frame = self._frame(dim_name)
+            indice, posiciones_frame = self._indice(dim_name, key_column)
+        claves = self._normalizar(natural_keys, frame[key_column])
+
+        posiciones = indice.get_indexer(claves)
+        encontrados = posiciones >= 0
+        valores = frame[value_column].to_numpy()
+
+        if len(valores) == 0:
+            tomados = np.zeros(len(posiciones), dtype="float64")
+        else:
+            tomados = valores[posiciones_frame[np.where(encontrados, posiciones, 0)]]
+
+        if default is None:
+            if tomados.dtype.kind in "iub":
+                tomados = tomados.astype("float64")
+            relleno = np.nan if tomados.dtype.kind == "f" else None
+            return np.where(encontrados, tomados, relleno)
+
+        return np.where(encontrados, tomados, default)
+
+    def first(self, dim_name: str, column: Optional[str] = None, default=1):
+        """Valor de la primera fila (equivale a SELECT ... LIMIT 1)"""
+        frame = self._frame(dim_name)
+        column = column or DIMENSIONES[dim_name][1]
+        if len(frame) == 0:
+            return default
+        return frame[column].iloc[0]
+
+    def minimum(self, dim_name: str, column: Optional[str] = None, default=1):
+        """Mínimo de una columna (equivale a SELECT MIN(...))"""
+        frame = self._frame(dim_name)
+        column = column or DIMENSIONES[dim_name][1]
+        valor = frame[column].min()
+        return default if pd.isna(valor) else valor
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Filas y origen (memoria/dw) de cada dimensión cargada"""
+        with self._lock:
+            return {
+                nombre: {"rows": len(frame), "source": self._origen[nombre]}
+                for nombre, frame in self._frames.items()
+            }
+
+    def _frame(self, dim_name: str) -> pd.DataFrame:
+        # Un solo hilo lee la dimensión del DW; los demás esperan el resultado
+        with self._lock:
+            if dim_name not in self._frames:
+                self.load(dim_name)
+            return self._frames[dim_name]
+
+    def _guardar(self, dim_name: str, frame: pd.DataFrame, origen: str):
+        with self._lock:
+            self.invalidate(dim_name)
+            self._frames[dim_name] = frame
+            self._origen[dim_name] = origen
+        self.logger.debug(f"🗂️  {dim_name}: {len(frame):,} filas en caché ({origen})")
+
+    def _indice(self, dim_name: str, key_column: str) -> Tuple[pd.Index, np.ndarray]:
+        """Hash index sobre la columna clave (primera fila por clave)"""
+        clave = (dim_name, key_column)
+        with self._lock:
+            if clave not in self._indices:
+                columna = self._frame(dim_name)[key_column]
+                normalizada = pd.Series(self._normalizar(columna, columna))
+                unicos = ~normalizada.duplicated(keep="first").to_numpy()
+                self._indices[clave] = (
+                    pd.Index(normalizada[unicos]),
+                    np.flatnonzero(unicos),
+                )
+            return self._indices[clave]
+
+    def _normalizar(self, claves, referencia: pd.Series) -> np.ndarray:
+        """Lleva las claves al tipo de la columna de la dimensión"""
+        claves = pd.Series(claves)
+        muestra = referencia.dropna()
+
+        if pd.api.types.is_datetime64_any_dtype(referencia) or (
+            len(muestra) > 0 and hasattr(muestra.iloc[0], "isoformat")
+        ):
+            return pd.to_datetime(claves).to_numpy()
+        if pd.api.types.is_numeric_dtype(referencia):
+            return pd.to_numeric(claves, errors="coerce").astype("float64").to_numpy()
+        return claves.to_numpy(dtype=object)